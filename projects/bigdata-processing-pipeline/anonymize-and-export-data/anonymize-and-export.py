@@ -23,6 +23,17 @@ import argparse
 import hashlib
 import ast
 import time
+import importlib
+
+# load tidals package locally if it does not exist globally
+if importlib.util.find_spec("tidals") is None:
+    tidalsPath = os.path.abspath(
+                    os.path.join(
+                    os.path.dirname(__file__),
+                    "..", "..", "..", "tidepool-analysis-tools"))
+    if tidalsPath not in sys.path:
+        sys.path.insert(0, tidalsPath)
+import tidals as td
 
 
 # %% USER INPUTS
@@ -210,64 +221,22 @@ def sortColumns(df):
     return df
 
 
-def tempRemoveFields(df):
-    removeFields = ["basalSchedules",
-                    "bgTarget",
-                    "bgTargets",
-                    "carbRatio",
-                    "carbRatios",
-                    "insulinSensitivity",
-                    "insulinSensitivities"]
-
-    tempRemoveFields = list(set(df) & set(removeFields))
-    tempDf = df[tempRemoveFields]
-    df = df.drop(columns=tempRemoveFields)
-
-    return df, tempDf
-
-
-def removeBrackets(df, fieldName):
-    if fieldName in list(df):
-        df.loc[df[fieldName].notnull(), fieldName] = \
-            df.loc[df[fieldName].notnull(), fieldName].str[0]
-
-    return df
-
-
 def flattenJson(df, dataFieldsForExport):
-
-    # remove fields that we don't want to flatten
-    df, holdData = tempRemoveFields(df)
-
-    # remove [] from annotations field
-    df = removeBrackets(df, "annotations")
-
-    # get a list of data types of column headings
-    columnHeadings = list(df)  # ["payload", "suppressed"]
-
-    # loop through each columnHeading
-    newDataFrame = pd.DataFrame()
-
-    for colHead in columnHeadings:
-        # if the df field has embedded json
-        if any(isinstance(item, dict) for item in df[colHead]):
-            # grab the data that is in brackets
-            jsonBlob = df[colHead][df[colHead].astype(str).str[0] == "{"]
-
-            # replace those values with nan
-            df.loc[jsonBlob.index, colHead] = np.nan
-
-            # turn jsonBlob to dataframe
-            newDataFrame = pd.concat([newDataFrame, pd.DataFrame(jsonBlob.tolist(),
-                                        index=jsonBlob.index).add_prefix(colHead + '.')], axis=1)
-
-    newColHeadings = list(newDataFrame)
-
-    # put df back into the main dataframe
-    # and add the fields that were removed back in
-    columnFilter = list(set(newColHeadings) & set(dataFieldsForExport))
-    tempDataFrame = newDataFrame.filter(items=columnFilter)
-    df = pd.concat([df, tempDataFrame, holdData], axis=1)
+    # fields that we don't want to flatten
+    doNotFlattenList = ["basalSchedules",
+                        "bgTarget",
+                        "bgTargets",
+                        "carbRatio",
+                        "carbRatios",
+                        "insulinSensitivity",
+                        "insulinSensitivities"]
+
+    # flatten the embedded json, remove [] from the annotations field,
+    # and only keep the new fields that are approved for export
+    df = td.clean.flatten_json(df,
+                               doNotFlattenList,
+                               unwrapLists=["annotations"],
+                               flattenedFieldsToKeep=dataFieldsForExport)
 
     return df
 
@@ -13,6 +13,18 @@ import ast
 import pandas as pd
 import datetime as dt
 import numpy as np
+import sys
+import importlib
+
+# load tidals package locally if it does not exist globally
+if importlib.util.find_spec("tidals") is None:
+    tidalsPath = os.path.abspath(
+                    os.path.join(
+                    os.path.dirname(__file__),
+                    "..", "..", "..", "tidepool-analysis-tools"))
+    if tidalsPath not in sys.path:
+        sys.path.insert(0, tidalsPath)
+import tidals as td
 
 
 # %% USER INPUTS (choices to be made in order to run the code)
@@ -408,113 +420,15 @@ def qualify(df, metaDF, q, idx):
     return df, metaDF
 
 
-def temp_remove_fields(df, removeFields):
-
-    tempRemoveFields = list(set(df) & set(removeFields))
-    tempDf = df[tempRemoveFields]
-    df = df.drop(columns=tempRemoveFields)
-
-    return df, tempDf
-
-
 def flatten_json(df, doNotFlattenList):
-    # remove fields that we don't want to flatten
-    df, holdData = temp_remove_fields(df, doNotFlattenList)
-
-    # get a list of data types of column headings
-    columnHeadings = list(df)
-
-    # loop through each columnHeading
-    newDataFrame = pd.DataFrame()
-
-    for colHead in columnHeadings:
-        if any(isinstance(item, list) for item in df[colHead]):
-            listBlob = df[colHead][df[colHead].astype(str).str[0] == "["]
-            df.loc[listBlob.index, colHead] = df.loc[listBlob.index, colHead].str[0]
-
-        # if the df field has embedded json
-        if any(isinstance(item, dict) for item in df[colHead]):
-            # grab the data that is in brackets
-            jsonBlob = df[colHead][df[colHead].astype(str).str[0] == "{"]
-
-            # replace those values with nan
-            df.loc[jsonBlob.index, colHead] = np.nan
-
-            # turn jsonBlob to dataframe
-            newDataFrame = pd.concat([newDataFrame, pd.DataFrame(jsonBlob.tolist(),
-                                     index=jsonBlob.index).add_prefix(colHead + '.')], axis=1)
-
-    df = pd.concat([df, newDataFrame, holdData], axis=1)
+    # flatten the embedded json (and lists) of all fields except doNotFlattenList
+    df = td.clean.flatten_json(df, doNotFlattenList, unwrapLists=True)
 
     df.sort_index(axis=1, inplace=True)
 
     return df
 
 
-def round_time(df, timeIntervalMinutes=5, timeField="time",
-               roundedTimeFieldName="roundedTime", startWithFirstRecord=True,
-               verbose=False):
-    '''
-    A general purpose round time function that rounds the "time"
-    field to nearest <timeIntervalMinutes> minutes
-    INPUTS:
-        * a dataframe (df) that contains a time field that you want to round
-        * timeIntervalMinutes (defaults to 5 minutes given that most cgms output every 5 minutes)
-        * timeField to round (defaults to the UTC time "time" field)
-        * roundedTimeFieldName is a user specified column name (defaults to roundedTime)
-        * startWithFirstRecord starts the rounding with the first record if True, and the last record if False (defaults to True)
-        * verbose specifies whether the extra columns used to make calculations are returned
-    '''
-
-    df.sort_values(by=timeField, ascending=startWithFirstRecord, inplace=True)
-    df.reset_index(drop=True, inplace=True)
-
-    # make sure the time field is in the right form
-    t = pd.to_datetime(df[timeField].astype('datetime64[ns]'))
-
-    # calculate the time between consecutive records
-    t_shift = pd.to_datetime(df[timeField].astype('datetime64[ns]').shift(1))
-    df["timeBetweenRecords"] = \
-        round((t - t_shift).dt.days*(86400/(60 * timeIntervalMinutes)) +
-              (t - t_shift).dt.seconds/(60 * timeIntervalMinutes)) * timeIntervalMinutes
-
-    # separate the data into chunks if timeBetweenRecords is greater than
-    # 2 times the <timeIntervalMinutes> minutes so the rounding process starts over
-    largeGaps = list(df.query("abs(timeBetweenRecords) > " + str(timeIntervalMinutes * 2)).index)
-    largeGaps.insert(0, 0)
-    largeGaps.append(len(df))
-
-    for gIndex in range(0, len(largeGaps) - 1):
-        chunk = t[largeGaps[gIndex]:largeGaps[gIndex+1]]
-        firstRecordChunk = t[largeGaps[gIndex]]
-
-        # calculate the time difference between each time record and the first record
-        df.loc[largeGaps[gIndex]:largeGaps[gIndex+1], "minutesFromFirstRecord"] = \
-            (chunk - firstRecordChunk).dt.days*(86400/(60)) + (chunk - firstRecordChunk).dt.seconds/(60)
-
-        # then round to the nearest X Minutes
-        # NOTE: the ".000001" ensures that mulitples of 2:30 always rounds up.
-        df.loc[largeGaps[gIndex]:largeGaps[gIndex+1], "roundedMinutesFromFirstRecord"] = \
-            round((df.loc[largeGaps[gIndex]:largeGaps[gIndex+1],
-                          "minutesFromFirstRecord"] / timeIntervalMinutes) + 0.000001) * (timeIntervalMinutes)
-
-        roundedFirstRecord = (firstRecordChunk + pd.Timedelta("1microseconds")).round(str(timeIntervalMinutes) + "min")
-        df.loc[largeGaps[gIndex]:largeGaps[gIndex+1], roundedTimeFieldName] = \
-            roundedFirstRecord + \
-            pd.to_timedelta(df.loc[largeGaps[gIndex]:largeGaps[gIndex+1],
-                                   "roundedMinutesFromFirstRecord"], unit="m")
-
-    # sort by time and drop fieldsfields
-    df.sort_values(by=timeField, ascending=startWithFirstRecord, inplace=True)
-    df.reset_index(drop=True, inplace=True)
-    if verbose is False:
-        df.drop(columns=["timeBetweenRecords",
-                         "minutesFromFirstRecord",
-                         "roundedMinutesFromFirstRecord"], inplace=True)
-
-    return df
-
-
 def make_folder_if_doesnt_exist(folder_paths):
     ''' function requires a single path or a list of paths'''
     if not isinstance(folder_paths, list):
@@ -555,7 +469,12 @@ if os.path.exists(file_path):
     file_size = os.stat(file_path).st_size
     metadata["fileSize"] = file_size
     if file_size > 1000:
-        data = pd.read_csv(file_path, low_memory=False)
+        # only load the data types that are needed for qualification
+        # (and the uploads, for resolving duplicates)
+        data = td.load.load_csv(
+            file_path,
+            types=["cbg", "basal", "bolus", "wizard", "upload"]
+        )
 
         # attach upload time to each record, for resolving duplicates
         data = add_uploadDateTime(data)
@@ -616,12 +535,11 @@ if os.path.exists(file_path):
                 nDuplicatesRemovedUtcTime
 
             # round time to the nearest 5 minutes
-            cgmData = round_time(
-                cgmData,
+            cgmData = cgmData.sort_values(by="time").reset_index(drop=True)
+            cgmData["roundedTime"] = td.clean.round_time_array(
+                cgmData["time"],
                 timeIntervalMinutes=5,
-                timeField="time",
-                roundedTimeFieldName="roundedTime",
-                verbose=False
+                method="fromFirstRecord"
             )
 
             # get rid of duplicates that have the same "roundedTime"
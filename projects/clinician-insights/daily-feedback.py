@@ -357,8 +357,11 @@ for dIndex in studyPartipants.index:
     metaData.loc[dIndex, ["getData.response1", "getData.response2"]] = \
         reponse1.status_code, reponse2.status_code
 
-    # load json data
-    data = pd.read_json(outputFileLocation)
+    # load json data (only the fields needed for the cgm stats)
+    data = td.load.load_json(
+        outputFileLocation,
+        columns=["type", "time", "value", "timezone", "timezoneOffset"]
+    )
 
     if "type" in list(data):
         if "cbg" in data.type.unique():
@@ -0,0 +1,286 @@
+"""
+description: Benchmark the throughput (MB/s and reports/s) and peak memory of parse_loop_report,
+LoopReport.parse_by_file and list_sections_in_loop_report on the test loop reports, and on synthetic reports of
+10 MB and 100 MB that are made by replicating the lines of the list sections of a test report. Each run is
+appended to a results file (one json line per run, with the git commit it was run on), and compared with the last
+run of another commit on the same machine, so that regressions are visible across commits.
+
+    python benchmark_throughput.py
+    python benchmark_throughput.py --sizes 10 --repeats 5 --threshold 0.05
+
+dependencies: loop_report_parser.py, loop_report.py
+license: BSD-2-Clause
+"""
+import os
+import sys
+import json
+import math
+import time
+import platform
+import argparse
+import datetime
+import tempfile
+import subprocess
+import tracemalloc
+
+parsers_path = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if parsers_path not in sys.path:
+    sys.path.insert(0, parsers_path)
+from loop_report_parser import (
+    parse_loop_report,
+    list_sections_in_loop_report,
+    SECTION_HEADERS,
+    LOOP_DATA_MANAGER_KEYS,
+)
+from loop_report import LoopReport
+
+FILES_PATH = os.path.join(parsers_path, "..", "tests", "parsers", "files")
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results", "throughput.jsonl")
+MB = 2 ** 20
+
+parser = argparse.ArgumentParser(description="benchmark loop report parsing throughput")
+parser.add_argument(
+    "--path", default=FILES_PATH, help="folder of the loop reports to parse"
+)
+parser.add_argument(
+    "--files",
+    nargs="+",
+    default=["LoopReport.md", "LoopReport2.md"],
+    help="loop report file names",
+)
+parser.add_argument(
+    "--template",
+    default="LoopReport2.md",
+    help="the loop report that the synthetic reports are made from",
+)
+parser.add_argument(
+    "--sizes",
+    nargs="*",
+    default=[10, 100],
+    type=int,
+    help="sizes (MB) of the synthetic reports",
+)
+parser.add_argument(
+    "--data-path",
+    default=os.path.join(tempfile.gettempdir(), "loop_report_benchmarks"),
+    help="folder the synthetic reports are written to (and reused from)",
+)
+parser.add_argument(
+    "--repeats", default=3, type=int, help="number of times each report is parsed"
+)
+parser.add_argument(
+    "--results", default=RESULTS_PATH, help="json lines file the runs are appended to"
+)
+parser.add_argument(
+    "--no-save", action="store_true", help="do not append this run to the results"
+)
+parser.add_argument(
+    "--threshold",
+    default=0.1,
+    type=float,
+    help="the drop in MB/s (as a fraction) that is reported as a regression",
+)
+
+
+def _parse_by_file(file_path):
+    return LoopReport().parse_by_file(*os.path.split(file_path))
+
+
+# {benchmark: the function that parses a report file}
+BENCHMARKS = {
+    "parse_loop_report": parse_loop_report,
+    "LoopReport.parse_by_file": _parse_by_file,
+    "list_sections_in_loop_report": list_sections_in_loop_report,
+}
+
+
+def make_synthetic_report(template_path, output_path, size_mb):
+    # write a report of about <size_mb> MB, with the data lines of each list
+    # section of the template (e.g. ### cachedGlucoseSamples) repeated, and
+    # every other line once; an existing report of the same size is reused
+    output_path_name = os.path.join(
+        output_path,
+        f"{os.path.splitext(os.path.basename(template_path))[0]}-{size_mb}MB.md",
+    )
+    if os.path.isfile(output_path_name):
+        return output_path_name
+
+    header_prefixes = ["Generated:", "Loop", "#"] + list(LOOP_DATA_MANAGER_KEYS)
+    header_prefixes += [prefix for prefix, _, _ in SECTION_HEADERS]
+    list_prefixes = tuple(prefix for prefix, _, is_list in SECTION_HEADERS if is_list)
+
+    # [(is data, lines)], in report order
+    blocks = []
+    in_list = False
+    with open(template_path) as reader:
+        for line in reader:
+            if line.startswith(tuple(header_prefixes)):
+                in_list = line.startswith(list_prefixes)
+                is_data = False
+            else:
+                is_data = in_list and bool(line.strip())
+            if blocks and blocks[-1][0] == is_data:
+                blocks[-1][1].append(line)
+            else:
+                blocks.append((is_data, [line]))
+
+    def size(is_data):
+        return sum(
+            len("".join(lines).encode("utf-8"))
+            for data, lines in blocks
+            if data == is_data
+        )
+
+    copies = max(1, math.ceil((size_mb * MB - size(False)) / max(size(True), 1)))
+    os.makedirs(output_path, exist_ok=True)
+    with open(output_path_name + ".tmp", "w") as writer:
+        for is_data, lines in blocks:
+            text = "".join(lines)
+            for _ in range(copies if is_data else 1):
+                writer.write(text)
+    os.replace(output_path_name + ".tmp", output_path_name)
+    return output_path_name
+
+
+def measure(parse, file_path, repeats):
+    # the best wall time of <repeats> parses, and the peak memory allocated by
+    # one more (traced) parse
+    best = float("inf")
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        parse(file_path)
+        best = min(best, time.perf_counter() - start_time)
+
+    tracemalloc.start()
+    try:
+        parse(file_path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    size = os.path.getsize(file_path)
+    return {
+        "seconds": best,
+        "mb_per_s": size / MB / best,
+        "reports_per_s": 1 / best,
+        "peak_mb": peak / MB,
+    }
+
+
+def git_commit():
+    # (the short commit, and whether the tree has uncommitted changes)
+    def git(*args):
+        return subprocess.run(
+            ["git", *args],
+            cwd=parsers_path,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+
+    try:
+        return git("rev-parse", "--short", "HEAD"), bool(
+            git("status", "--porcelain", "--", ".")
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def machine():
+    return f"{platform.node()} {platform.machine()} {platform.python_version()}"
+
+
+def load_runs(results_path):
+    if not os.path.isfile(results_path):
+        return []
+    with open(results_path) as reader:
+        return [json.loads(line) for line in reader if line.strip()]
+
+
+def previous_run(runs, run):
+    # the last run of another commit on the same machine
+    for previous in reversed(runs):
+        if (
+            previous["machine"] == run["machine"]
+            and previous["commit"] != run["commit"]
+        ):
+            return previous
+    return None
+
+
+def compare(run, previous, threshold):
+    # print the change in MB/s of each result since the previous run, and
+    # return the results that are slower by more than <threshold>
+    previous_results = {
+        (result["report"], result["benchmark"]): result
+        for result in previous["results"]
+    }
+    regressions = []
+    print(f"\ncompared with {previous['commit']} ({previous['date']}):")
+    for result in run["results"]:
+        old = previous_results.get((result["report"], result["benchmark"]))
+        if old is None:
+            continue
+        change = result["mb_per_s"] / old["mb_per_s"] - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(result)
+        print(
+            f"{result['report']:<24} {result['benchmark']:<30} "
+            f"{old['mb_per_s']:8.1f} -> {result['mb_per_s']:8.1f} MB/s "
+            f"({change:+.1%}){flag}"
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    reports = [os.path.join(args.path, file_name) for file_name in args.files]
+    reports += [
+        make_synthetic_report(
+            os.path.join(args.path, args.template), args.data_path, size_mb
+        )
+        for size_mb in args.sizes
+    ]
+
+    commit, dirty = git_commit()
+    run = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "machine": machine(),
+        "repeats": args.repeats,
+        "results": [],
+    }
+    print(
+        f"{'report':<24} {'benchmark':<30} {'MB':>7} {'seconds':>9} {'MB/s':>8} "
+        f"{'reports/s':>10} {'peak MB':>8}"
+    )
+    for file_path in reports:
+        size = os.path.getsize(file_path)
+        for benchmark, parse in BENCHMARKS.items():
+            result = measure(parse, file_path, args.repeats)
+            result = dict(
+                report=os.path.basename(file_path),
+                bytes=size,
+                benchmark=benchmark,
+                **result,
+            )
+            run["results"].append(result)
+            print(
+                f"{result['report']:<24} {benchmark:<30} {size / MB:7.1f} "
+                f"{result['seconds']:9.4f} {result['mb_per_s']:8.1f} "
+                f"{result['reports_per_s']:10.2f} {result['peak_mb']:8.1f}"
+            )
+
+    previous = previous_run(load_runs(args.results), run)
+    regressions = []
+    if previous is not None:
+        regressions = compare(run, previous, args.threshold)
+    if not args.no_save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, "a") as writer:
+            writer.write(json.dumps(run) + "\n")
+        print(f"\nsaved to {args.results}")
+    sys.exit(1 if regressions else 0)
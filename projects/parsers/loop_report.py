@@ -8,44 +8,323 @@ license: BSD-2-Clause
 """
 
 from loop_report_parser import parse_loop_report, Sections
+from loop_report_index import read_sections
+from loop_report_cache import (
+    ParseCache,
+    source_version,
+    module_sources,
+    DEFAULT_MAX_BYTES,
+)
+from loop_report_frames import parse_time_series, parse_events
+from loop_report_archive import is_archive, iter_members
+from loop_report_profile import ParseProfile, HANDLER, raw_size
+from swift_structures import parse_swift
 import os
 import re
 import json
 import logging
+import sys
+import signal
+import threading
+import time
+import functools
+import multiprocessing
 
 logger = logging.getLogger("LoopReport")
 
+# the parts of a report, in the order they are parsed, as
+# (handler, the sections of parse_loop_report that the handler reads)
+REPORT_SECTIONS = [
+    ("_parse_loop_version", (Sections.LOOP_VERSION,)),
+    ("_parse_device_data_manager", (Sections.DEVICE_DATA_MANAGER,)),
+    ("_parse_riley_link_device", (Sections.RILEY_LINK_DEVICE,)),
+    ("_parse_carb_store", (Sections.CARB_STORE,)),
+    ("_parse_dose_store", (Sections.DOSE_STORE,)),
+    (
+        "_parse_pump_manager",
+        (Sections.MINIMED_PUMP_MANAGER, Sections.OMNIPOD_PUMP_MANAGER),
+    ),
+    ("_parse_watch_data_manager", (Sections.WATCH_DATA_MANAGER,)),
+    ("_parse_loop_data_manager", (Sections.LOOP_DATA_MANAGER,)),
+    ("_parse_insulin_counteraction_effects", (Sections.INSULIN_COUNTERACTION_EFFECTS,)),
+    (
+        "_parse_retrospective_glucose_discrepancies_summed",
+        (Sections.RETROSPECTIVE_GLUCOSE_DISCREPANCIES_SUMMED,),
+    ),
+    ("_parse_get_reservoir_values", (Sections.GET_RESERVOIR_VALUES,)),
+    ("_parse_predicted_glucose", (Sections.PREDICTED_GLUCOSE,)),
+    (
+        "_parse_retrospective_glucose_discrepancies",
+        (Sections.RETROSPECTIVE_GLUCOSE_DISCREPANCIES,),
+    ),
+    ("_parse_carb_effect", (Sections.CARB_EFFECT,)),
+    ("_parse_insulin_effect", (Sections.INSULIN_EFFECT,)),
+    (
+        "_parse_get_normalized_pump_event_dose",
+        (Sections.GET_NORMALIZED_PUMP_EVENT_DOSE,),
+    ),
+    ("_parse_get_normalized_dose_entries", (Sections.GET_NORMALIZED_DOSE_ENTRIES,)),
+    ("_parse_cached_dose_entries", (Sections.CACHED_DOSE_ENTRIES,)),
+    ("_parse_get_pump_event_values", (Sections.GET_PUMP_EVENT_VALUES,)),
+    ("_parse_message_log", (Sections.MESSAGE_LOG,)),
+    ("_parse_g5_cgm_manager", (Sections.G5_CGM_MANAGER,)),
+    ("_parse_dex_cgm_manager", (Sections.DEX_CGM_MANAGER,)),
+    ("_parse_status_extension_data_manager", (Sections.STATUS_EXTENSION_DATA_MANAGER,)),
+    ("_parse_riley_link_pump_manager", (Sections.RILEY_LINK_PUMP_MANAGER,)),
+    ("_parse_riley_link_device_manager", (Sections.RILEY_LINK_DEVICE_MANAGER,)),
+    ("_parse_persistence_controller", (Sections.PERSISTENCE_CONTROLLER,)),
+    ("_parse_insulin_delivery_store", (Sections.INSULIN_DELIVERY_STORE,)),
+    ("_parse_cached_carb_entries", (Sections.CACHED_CARB_ENTRIES,)),
+    ("_parse_glucose_store", (Sections.GLUCOSE_STORE,)),
+    ("_parse_cached_glucose_samples", (Sections.CACHED_GLUCOSE_SAMPLES,)),
+]
+
+# {handler: the sections of parse_loop_report that the handler reads}
+_HANDLER_SECTIONS = dict(REPORT_SECTIONS)
+
+
+def raw_sections(sections):
+    # the sections of parse_loop_report that are read to parse <sections>
+    # (None for all sections)
+    if sections is None:
+        return None
+    needed = set()
+    for _, handler_sections in REPORT_SECTIONS:
+        if not set(handler_sections).isdisjoint(sections):
+            needed.update(handler_sections)
+    return needed
+
 
 class LoopReport:
-    def parse_by_file(self, path: str, file_name: str) -> dict:
+    def __init__(
+        self, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES, profile=None
+    ):
+        # cache_dir: a directory to cache parsed reports in (None for no
+        # cache); reports are reparsed only when their content or the parser
+        # code changes
+        # profile: a loop_report_profile.ParseProfile that the time, bytes and
+        # lines of each raw section and each handler of every report parsed
+        # are added to, also by the worker processes of iter_by_directory and
+        # iter_by_archive (None for no profiling)
+        self.profile = profile
+        self.cache = None
+        if cache_dir is not None:
+            self.cache = ParseCache(cache_dir, PARSER_VERSION, max_bytes=cache_max_bytes)
+
+    def parse_by_file(self, path: str, file_name: str, sections=None) -> dict:
+        # sections: the only sections to parse (e.g. [Sections.LOOP_VERSION,
+        # Sections.DOSE_STORE]); None parses every section
+        self.__check_file(path, file_name)
+        return self.__parse(path, file_name, sections)
+
+    def parse_by_buffer(self, source, file_name="", sections=None) -> dict:
+        # parse a report from a file-like object (text or binary, e.g. an
+        # archive member or an HTTP response) or bytes, without a file on disk
+        # file_name: the file name of the report, for the parsed report
+        # (reports parsed from buffers are not cached)
+        dict = parse_loop_report(
+            source, sections=raw_sections(sections), profile=self.profile
+        )
+        return self.__parse_sections(dict, file_name, sections)
+
+    def view_by_file(self, path: str, file_name: str, sections=None, use_index=False):
+        # a LoopReportView that parses each section on first access
+        # sections: the sections that are scanned together on first access
+        # use_index: seek to each section with a sidecar byte offset index
+        # (see loop_report_index.py) instead of scanning the whole report
+        self.__check_file(path, file_name)
+        return LoopReportView(
+            path, file_name, sections=sections, loop_report=self, use_index=use_index
+        )
+
+    def time_series_by_file(self, path: str, file_name: str, sections=None) -> dict:
+        # the time series sections (see loop_report_frames.TIME_SERIES_SECTIONS)
+        # as typed DataFrames, e.g. {Sections.CARB_EFFECT: DataFrame}
+        self.__check_file(path, file_name)
+        return parse_time_series(path, file_name, sections)
+
+    def events_by_file(self, path: str, file_name: str, sections=None) -> dict:
+        # the decoded ### MessageLog and ### getPumpEventValues sections (see
+        # loop_report_frames.EVENT_SECTIONS) as typed DataFrames
+        self.__check_file(path, file_name)
+        return parse_events(path, file_name, sections)
+
+    def __check_file(self, path, file_name):
         try:
             if not os.path.isdir(path) or not os.path.isfile(f"{path}/{file_name}"):
                 raise RuntimeError("The file path or file name passed in is invalid.")
         except:
             raise RuntimeError("The file path or file name passed in is invalid.")
-        return self.__parse(path, file_name)
 
-    def parse_by_directory(self, directory: dict) -> list:
+    def parse_by_directory(self, directory: dict, sections=None) -> list:
+        return list(self.iter_by_directory(directory, sections))
+
+    def iter_by_directory(
+        self,
+        directory: str,
+        sections=None,
+        workers=None,
+        chunksize=1,
+        ordered=False,
+        timeout=None,
+        parse=None,
+    ):
+        # a generator of the parsed reports (.md files) in <directory>
+        # workers: the number of worker processes (None parses in this process)
+        # chunksize: the number of files sent to a worker at a time
+        # ordered: yield the reports in directory order (otherwise as soon as
+        # each one is parsed)
+        # timeout: the seconds after which a report is given up on
+        # parse: a module level function (loop_report, directory, file_name,
+        # sections) that is run in the workers instead of parse_by_file, whose
+        # results are yielded (e.g. to do more work on each report in parallel)
+        # reports that fail to parse (or time out) are logged and skipped
         try:
             if not os.path.isdir(directory):
                 raise RuntimeError("The directory passed in is invalid.")
         except:
             raise RuntimeError("The directory passed in is invalid.")
 
-        all_dict_list = []
-        for file_name in os.listdir(directory):
+        tasks = [
+            (position, directory, file_name, sections, timeout)
+            for position, file_name in enumerate(
+                f for f in os.listdir(directory) if f.endswith(".md")
+            )
+        ]
+        parse_file = functools.partial(_parse_file, loop_report=self, parse=parse)
+        if workers is None or workers <= 1:
+            return self._successful_results(parse_file(task) for task in tasks)
+        return self.__iter_in_pool(parse_file, tasks, workers, chunksize, ordered)
+
+    def iter_by_archive(
+        self,
+        archive_path: str,
+        sections=None,
+        workers=None,
+        chunksize=1,
+        ordered=False,
+        timeout=None,
+    ):
+        # a generator of the parsed reports (.md members) in a zip or tar
+        # archive, which are read straight out of the archive (see
+        # iter_by_directory for the other arguments)
+        if not is_archive(archive_path):
+            raise RuntimeError("The archive passed in is invalid.")
+
+        if workers is None or workers <= 1:
+            parse_member = functools.partial(_parse_member, loop_report=self)
+            tasks = (
+                (position, member_name, member, sections, timeout)
+                for position, (member_name, member) in enumerate(
+                    iter_members(archive_path)
+                )
+            )
+            return self._successful_results(parse_member(task) for task in tasks)
+
+        # the members are read here and parsed in the workers, with at most a
+        # few members per worker read ahead
+        tasks = (
+            (position, member_name, member.read(), sections, timeout)
+            for position, (member_name, member) in enumerate(iter_members(archive_path))
+        )
+        parse_member = functools.partial(_parse_member, loop_report=self)
+        return self.__iter_in_pool(
+            parse_member,
+            tasks,
+            workers,
+            chunksize,
+            ordered,
+            read_ahead=2 * workers * chunksize,
+        )
+
+    def __iter_in_pool(
+        self, parse_file, tasks, workers, chunksize, ordered, read_ahead=None
+    ):
+        # read_ahead: the most tasks that are generated before their results
+        # are consumed (None for no limit)
+        if read_ahead is not None:
+            tasks = _ReadAhead(tasks, read_ahead)
+        with multiprocessing.Pool(processes=workers) as pool:
             try:
-                if file_name.endswith(".md"):
-                    all_dict_list.append(self.__parse(directory, file_name))
-            except Exception as e:
-                logger.debug("loop parser parse by directory error for file")
-                logger.debug(e)
-        return all_dict_list
-
-    def __parse(self, path, file_name) -> dict:
+                results = pool.imap_unordered(parse_file, tasks, chunksize=chunksize)
+                if read_ahead is not None:
+                    results = tasks.consumed(results)
+                if ordered:
+                    results = _in_order(results)
+                yield from self._successful_results(results)
+            finally:
+                # (before the pool shuts down, which waits for its task thread)
+                if read_ahead is not None:
+                    tasks.close()
+
+    def __parse(self, path, file_name, sections=None) -> dict:
+        if self.cache is not None:
+            key = self.cache.key(os.path.join(path, file_name), sections)
+            loop_report_dict = self.cache.get(key)
+            if loop_report_dict is None:
+                loop_report_dict = self.__parse_file(path, file_name, sections)
+                self.cache.put(key, loop_report_dict)
+            # the same report can be cached under another file name
+            loop_report_dict["file_name"] = file_name
+            return loop_report_dict
+
+        return self.__parse_file(path, file_name, sections)
+
+    def __parse_file(self, path, file_name, sections=None) -> dict:
+        dict = parse_loop_report(
+            path, file_name, sections=raw_sections(sections), profile=self.profile
+        )
+        return self.__parse_sections(dict, file_name, sections)
+
+    def __parse_sections(self, dict, file_name, sections=None) -> dict:
         loop_report_dict = {}
-        dict = parse_loop_report(path, file_name)
         loop_report_dict["file_name"] = file_name
+        for handler_name, handler_sections in REPORT_SECTIONS:
+            if sections is None or not set(handler_sections).isdisjoint(sections):
+                if self.profile is not None:
+                    self.__profile_handler(
+                        handler_name, dict, loop_report_dict, file_name
+                    )
+                    continue
+                getattr(self, handler_name)(dict, loop_report_dict, file_name)
+
+        return loop_report_dict
+
+    def __profile_handler(self, handler_name, dict, loop_report_dict, file_name):
+        # run a handler, adding its time and the size of its raw sections to
+        # the profile (handlers of sections that are not in the report are not
+        # recorded)
+        size = 0
+        lines = 0
+        present = False
+        for section in _HANDLER_SECTIONS[handler_name]:
+            if section in dict:
+                present = True
+                section_size, section_lines = raw_size(dict[section])
+                size += section_size
+                lines += section_lines
+        start = time.perf_counter()
+        try:
+            getattr(self, handler_name)(dict, loop_report_dict, file_name)
+        finally:
+            if present:
+                self.profile.add(
+                    HANDLER, handler_name, time.perf_counter() - start, size, lines
+                )
+
+    def _successful_results(self, results):
+        # the parsed reports of (position, file name, report, error, profile)
+        # results, adding the profiles of worker processes to this profile
+        for position, file_name, loop_report_dict, error, profile in results:
+            if profile is not None and self.profile is not None:
+                self.profile.update(profile)
+            if error is not None:
+                logger.debug(f"loop parser parse by directory error for file {file_name}")
+                logger.debug(error)
+                continue
+            yield loop_report_dict
+
+    def _parse_loop_version(self, dict, loop_report_dict, file_name):
         if Sections.LOOP_VERSION in dict:
             try:
                 loop_report_dict["loop_version"] = dict[Sections.LOOP_VERSION][
@@ -54,12 +333,14 @@ class LoopReport:
             except:
                 logger.debug("handled error loop_version")
 
+    def _parse_device_data_manager(self, dict, loop_report_dict, file_name):
         if Sections.DEVICE_DATA_MANAGER in dict:
             try:
                 self.__device_data_manager = dict[Sections.DEVICE_DATA_MANAGER]
             except:
                 logger.debug("handled error device data manager")
 
+    def _parse_riley_link_device(self, dict, loop_report_dict, file_name):
         if Sections.RILEY_LINK_DEVICE in dict:
             try:
                 riley_link_device = dict[Sections.RILEY_LINK_DEVICE]
@@ -72,40 +353,22 @@ class LoopReport:
             except:
                 logger.debug("handled error riley link device")
 
+    def _parse_carb_store(self, dict, loop_report_dict, file_name):
         if Sections.CARB_STORE in dict:
             try:
                 carb_store = dict[Sections.CARB_STORE]
-                temp = (
-                    carb_store["carbRatioSchedule"]
-                    .replace("[", "{")
-                    .replace("]", "}")
-                    .replace("{{", "{")
-                    .replace("}}", "}")
-                    .replace('"items": {{', '"items": [{')
-                    .replace('"items": {', '"items": [{')
-                    .replace("}}", "}]")
-                    .replace('}, "unit"', '}], "unit"')
-                    .replace('}, "timeZone"', '}], "timeZone"')
-                )
-
-                if temp[-1:] != "}":
-                    temp = temp + "}"
-
-                carb_ratio_schedule = json.loads(temp)
+                carb_ratio_schedule = parse_swift(carb_store["carbRatioSchedule"])
 
                 loop_report_dict["carb_ratio_unit"] = carb_ratio_schedule["unit"]
                 loop_report_dict["carb_ratio_timeZone"] = carb_ratio_schedule[
                     "timeZone"
                 ]
-                loop_report_dict["carb_ratio_schedule"] = carb_ratio_schedule["items"]
+                loop_report_dict["carb_ratio_schedule"] = _copy_value(
+                    carb_ratio_schedule["items"]
+                )
 
-                default_absorption_times = json.loads(
+                default_absorption_times = parse_swift(
                     carb_store["defaultAbsorptionTimes"]
-                    .replace("(", "{")
-                    .replace(")", "}")
-                    .replace("fast", '"fast"')
-                    .replace("medium", '"medium"')
-                    .replace("slow", '"slow"')
                 )
                 loop_report_dict[
                     "carb_default_absorption_times_fast"
@@ -117,26 +380,12 @@ class LoopReport:
                     "carb_default_absorption_times_slow"
                 ] = default_absorption_times["slow"]
 
-                temp = (
+                insulin_sensitivity_factor_schedule = parse_swift(
                     carb_store["insulinSensitivitySchedule"]
-                    .replace("[", "{")
-                    .replace("]", "}")
-                    .replace("{{", "{")
-                    .replace("}}", "}")
-                    .replace('"items": {{', '"items": [{')
-                    .replace('"items": {', '"items": [{')
-                    .replace("}}", "}]")
-                    .replace('}, "unit"', '}], "unit"')
-                    .replace('}, "timeZone"', '}], "timeZone"')
                 )
-
-                if temp[-1:] != "}":
-                    temp = temp + "}"
-
-                insulin_sensitivity_factor_schedule = json.loads(temp)
-                loop_report_dict[
-                    "insulin_sensitivity_factor_schedule"
-                ] = insulin_sensitivity_factor_schedule["items"]
+                loop_report_dict["insulin_sensitivity_factor_schedule"] = _copy_value(
+                    insulin_sensitivity_factor_schedule["items"]
+                )
                 loop_report_dict[
                     "insulin_sensitivity_factor_timeZone"
                 ] = insulin_sensitivity_factor_schedule["timeZone"]
@@ -147,35 +396,30 @@ class LoopReport:
             except:
                 logger.debug("handled error carb store")
 
+    def _parse_dose_store(self, dict, loop_report_dict, file_name):
         if Sections.DOSE_STORE in dict:
             try:
                 dose_store = dict[Sections.DOSE_STORE]
-                basal_profile = json.loads(
-                    dose_store["basalProfile"]
-                    .replace("[", "{")
-                    .replace("]", "}")
-                    .replace("{{", "{")
-                    .replace("}}", "}")
-                    .replace(": {", ": [{")
-                    .replace("}}", "}]}")
-                    .replace('}, "timeZone"', '}], "timeZone"')
-                )
+                basal_profile = parse_swift(dose_store["basalProfile"])
                 loop_report_dict["basal_rate_timeZone"] = basal_profile["timeZone"]
-                loop_report_dict["basal_rate_schedule"] = basal_profile["items"]
+                loop_report_dict["basal_rate_schedule"] = _copy_value(
+                    basal_profile["items"]
+                )
 
-                loop_report_dict["insulin_model"] = re.search(
-                    r"Optional\((.+?)\(Exponential", dose_store["insulinModel"]
-                ).group(1)
+                # e.g. Optional(humalogNovologAdult(ExponentialInsulinModel(actionDuration: 21600.0, ...)))
+                insulin_model = parse_swift(dose_store["insulinModel"])
+                exponential_model = insulin_model.args[0]
+                if exponential_model.type_name != "ExponentialInsulinModel":
+                    raise ValueError(f"unknown insulin model {insulin_model!r}")
+                loop_report_dict["insulin_model"] = insulin_model.type_name
                 loop_report_dict["insulin_action_duration"] = float(
-                    re.search(
-                        "actionDuration: (.+?), peakActivityTime",
-                        dose_store["insulinModel"],
-                    ).group(1)
+                    exponential_model["actionDuration"]
                 )
 
             except:
                 logger.debug("handled error dose store")
 
+    def _parse_pump_manager(self, dict, loop_report_dict, file_name):
         minimed_pump_manager = None
         omnipod_pump_manager = None
         if (
@@ -197,6 +441,7 @@ class LoopReport:
                 loop_report_dict, minimed_pump_manager, omnipod_pump_manager
             )
 
+    def _parse_watch_data_manager(self, dict, loop_report_dict, file_name):
         if Sections.WATCH_DATA_MANAGER in dict:
             try:
                 watch_data_manager = dict[Sections.WATCH_DATA_MANAGER]
@@ -207,6 +452,7 @@ class LoopReport:
             except:
                 logger.debug("handled error watch data manager")
 
+    def _parse_loop_data_manager(self, dict, loop_report_dict, file_name):
         if Sections.LOOP_DATA_MANAGER in dict:
             try:
                 loop_data_manager = dict[Sections.LOOP_DATA_MANAGER]
@@ -333,30 +579,13 @@ class LoopReport:
                     logger.debug(e)
 
                 try:
-                    retrospective_glucose_change = loop_data_manager['retrospectiveGlucoseChange']
-                    retrospective_glucose_change = retrospective_glucose_change.replace("Optional((", "").replace("))", "")
-                    split_index = retrospective_glucose_change.index('end')
-                    start = retrospective_glucose_change[:split_index]
-                    start = start.replace("start: LoopKit.StoredGlucoseSample(", "").replace(")", "")
-                    start_list = start.split(",")
-                    start_list.pop(len(start_list) - 1)
-                    start_dict = {}
-                    for v in start_list:
-                        aux = v.split(": ")
-                        start_dict[aux[0]] = aux[1]
-
-                    end = retrospective_glucose_change[split_index:]
-                    end = end.replace("end: LoopKit.StoredGlucoseSample(", "").replace(")", "")
-                    end_list= end.split(",")
-                    end_dict = {}
-                    for v in end_list:
-                        aux = v.split(": ")
-                        end_dict[aux[0]] = aux[1]
-
-                    retrospective_glucose_change_dict = {}
-                    retrospective_glucose_change_dict['start_dict'] = start_dict
-                    retrospective_glucose_change_dict['end_dict'] = end_dict
-                    loop_report_dict["retrospective_glucose_change"] = retrospective_glucose_change_dict
+                    retrospective_glucose_change = parse_swift(
+                        loop_data_manager["retrospectiveGlucoseChange"]
+                    )
+                    loop_report_dict["retrospective_glucose_change"] = {
+                        "start_dict": _copy_value(retrospective_glucose_change["start"]),
+                        "end_dict": _copy_value(retrospective_glucose_change["end"]),
+                    }
                 except Exception as e:
                     logger.debug("handled error loop data manager - retrospective_glucose_change")
                     logger.debug(e)
@@ -386,79 +615,53 @@ class LoopReport:
                     logger.debug("handled error loop data manager - retrospective_predicted_glucose")
                     logger.debug(e)
 
+                try:
+                    settings = parse_swift(loop_data_manager["settings"])
+                except Exception as e:
+                    logger.debug("handled error loop data manager - settings")
+                    logger.debug(e)
+                    settings = {}
+
                 try:
                     loop_report_dict["maximum_basal_rate"] = float(
-                        re.search(
-                            r"maximumBasalRatePerHour: Optional\((.+?)\), maximumBolus",
-                            loop_data_manager["settings"],
-                        ).group(1)
+                        settings["maximumBasalRatePerHour"]
                     )
                 except Exception as e:
                     logger.debug("handled error loop data manager")
                     logger.debug(e)
                 try:
-                    loop_report_dict["maximum_bolus"] = float(
-                        re.search(
-                            r"maximumBolus: Optional\((.+?)\), suspendThreshold",
-                            loop_data_manager["settings"],
-                        ).group(1)
-                    )
+                    loop_report_dict["maximum_bolus"] = float(settings["maximumBolus"])
 
-                    temp = re.search(
-                        "retrospectiveCorrectionEnabled: (.+?), retrospectiveCorrection",
-                        loop_data_manager["settings"],
-                    )
-                    if temp:
-                        loop_report_dict["retrospective_correction_enabled"] = temp.group(1)
+                    if "retrospectiveCorrectionEnabled" in settings:
+                        loop_report_dict["retrospective_correction_enabled"] = _swift_text(
+                            settings["retrospectiveCorrectionEnabled"]
+                        )
 
                     loop_report_dict["suspend_threshold"] = float(
-                        re.search(
-                            r"Loop.GlucoseThreshold\(value: (.+?), unit",
-                            loop_data_manager["settings"],
-                        ).group(1)
+                        settings["suspendThreshold"]["value"]
                     )
                 except Exception as e:
                     logger.debug("handled error LOOP_DATA_MANAGER - retrospective_correction_enabled")
                     logger.debug(e)
 
                 try:
-                    start_index = loop_data_manager["settings"].index("suspendThreshold")
-                    end_index = loop_data_manager["settings"].index(
-                        "retrospectiveCorrectionEnabled"
-                    )
-                    substr = loop_data_manager["settings"][start_index:end_index]
-
-                    unit = substr.index("unit")
-                    start_index = unit + 6
-                    check = ""
-                    while check != ")":
-                        unit += 1
-                        check = substr[unit]
-                    loop_report_dict["suspend_threshold_unit"] = substr[start_index:unit]
+                    loop_report_dict["suspend_threshold_unit"] = settings[
+                        "suspendThreshold"
+                    ]["unit"]
                 except Exception as e:
                     logger.debug("handled error LOOP_DATA_MANAGER - suspend_threshold_unit")
                     logger.debug(e)
 
                 try:
-                    glucoseTargetRangeSchedule_index = loop_data_manager["settings"].index("glucoseTargetRangeSchedule")
-                    temp_str = loop_data_manager["settings"][glucoseTargetRangeSchedule_index:]
-                    items_index = temp_str.index("items")
-                    temp_str = temp_str[items_index:]
-                    temp_str = temp_str.replace('items":', '')
+                    glucose_target_range_schedule = settings["glucoseTargetRangeSchedule"]
                     values = []
-
-                    while True:
-                        if "]]" in temp_str:
-                            end_index = temp_str.index("]]")
-                            parse_string = temp_str[:end_index + 2]
-                            item = self._parse_item(parse_string)
-                            if item:
-                                values.append(item)
-                            else:
-                                break
-                            temp_str = temp_str[end_index+3:]
-                        else:
-                            break
+                    for item in glucose_target_range_schedule["items"]:
+                        values.append(
+                            {
+                                "startTime": str(item["startTime"]),
+                                "value": [float(v) for v in item["value"]],
+                            }
+                        )
 
                     loop_report_dict["correction_range_schedule"] = values
 
@@ -468,51 +671,19 @@ class LoopReport:
                     logger.debug(e)
 
                 try:
-                    start_index = loop_data_manager["settings"].index("overrideRanges")
-                    end_index = loop_data_manager["settings"].index(
-                        "maximumBasalRatePerHour"
-                    )
-                    substr = loop_data_manager["settings"][start_index:end_index]
-
-                    workout = substr.index("workout")
-                    start_index = workout + 10
-                    check = ""
-                    while check != "]":
-                        workout += 1
-                        check = substr[workout]
-                    workout_list = eval(
-                        substr[start_index : workout + 1]
-                    )
-                    if workout_list[0] < workout_list[1]:
-                        loop_report_dict["override_range_workout_minimum"] = workout_list[0]
-                        loop_report_dict["override_range_workout_maximum"] = workout_list[1]
-                    else:
-                        loop_report_dict["override_range_workout_minimum"] = workout_list[1]
-                        loop_report_dict["override_range_workout_maximum"] = workout_list[0]
+                    override_ranges = settings["glucoseTargetRangeSchedule"]["overrideRanges"]
+                    workout_list = override_ranges["workout"]
+                    loop_report_dict["override_range_workout_minimum"] = min(workout_list)
+                    loop_report_dict["override_range_workout_maximum"] = max(workout_list)
 
                 except Exception as e:
                     logger.debug("handled error LOOP_DATA_MANAGER - override_range_workout")
                     logger.debug(e)
 
                 try:
-                    premeal = substr.index("preMeal")
-                    start_index = premeal + 10
-                    check = ""
-
-                    while check != "]":
-                        premeal += 1
-                        check = substr[premeal]
-
-
-                    premeal_list = eval(
-                        substr[start_index : premeal + 1]
-                    )
-                    if premeal_list[0] < premeal_list[1]:
-                        loop_report_dict["override_range_premeal_minimum"] = premeal_list[0]
-                        loop_report_dict["override_range_premeal_maximum"] = premeal_list[1]
-                    else:
-                        loop_report_dict["override_range_premeal_minimum"] = premeal_list[1]
-                        loop_report_dict["override_range_premeal_maximum"] = premeal_list[0]
+                    premeal_list = override_ranges["preMeal"]
+                    loop_report_dict["override_range_premeal_minimum"] = min(premeal_list)
+                    loop_report_dict["override_range_premeal_maximum"] = max(premeal_list)
 
                 except Exception as e:
                     logger.debug("preMeal is not in loop data")
@@ -522,6 +693,7 @@ class LoopReport:
                 logger.debug("handled error loop data manager")
                 logger.debug(e)
 
+    def _parse_insulin_counteraction_effects(self, dict, loop_report_dict, file_name):
         if Sections.INSULIN_COUNTERACTION_EFFECTS in dict:
             try:
                 ice_list = dict[Sections.INSULIN_COUNTERACTION_EFFECTS]
@@ -543,6 +715,7 @@ class LoopReport:
                 logger.debug("handled error INSULIN_COUNTERACTION_EFFECTS")
                 logger.debug(e)
 
+    def _parse_retrospective_glucose_discrepancies_summed(self, dict, loop_report_dict, file_name):
         if Sections.RETROSPECTIVE_GLUCOSE_DISCREPANCIES_SUMMED in dict:
             try:
                 local_list = dict[Sections.RETROSPECTIVE_GLUCOSE_DISCREPANCIES_SUMMED]
@@ -567,6 +740,7 @@ class LoopReport:
                 logger.debug("handled error RETROSPECTIVE_GLUCOSE_DISCREPANCIES")
                 logger.debug(e)
 
+    def _parse_get_reservoir_values(self, dict, loop_report_dict, file_name):
         if Sections.GET_RESERVOIR_VALUES in dict:
             try:
                 local_list = dict[Sections.GET_RESERVOIR_VALUES]
@@ -589,6 +763,7 @@ class LoopReport:
                 logger.debug("handled error GET_RESERVOIR_VALUES")
                 logger.debug(e)
 
+    def _parse_predicted_glucose(self, dict, loop_report_dict, file_name):
         if Sections.PREDICTED_GLUCOSE in dict:
             try:
                 local_list = dict[Sections.PREDICTED_GLUCOSE]
@@ -610,6 +785,7 @@ class LoopReport:
                 logger.debug("handled error PREDICTED_GLUCOSE")
                 logger.debug(e)
 
+    def _parse_retrospective_glucose_discrepancies(self, dict, loop_report_dict, file_name):
         if Sections.RETROSPECTIVE_GLUCOSE_DISCREPANCIES in dict:
             try:
                 local_list = dict[Sections.RETROSPECTIVE_GLUCOSE_DISCREPANCIES]
@@ -632,6 +808,7 @@ class LoopReport:
                 logger.debug("handled error RETROSPECTIVE_GLUCOSE_DISCREPANCIES")
                 logger.debug(e)
 
+    def _parse_carb_effect(self, dict, loop_report_dict, file_name):
         if Sections.CARB_EFFECT in dict:
             try:
                 local_list = dict[Sections.CARB_EFFECT]
@@ -652,6 +829,7 @@ class LoopReport:
                 logger.debug("handled error CARB_EFFECT")
                 logger.debug(e)
 
+    def _parse_insulin_effect(self, dict, loop_report_dict, file_name):
         if Sections.INSULIN_EFFECT in dict:
             try:
                 local_list = dict[Sections.INSULIN_EFFECT]
@@ -673,6 +851,7 @@ class LoopReport:
                 logger.debug("handled error INSULIN_EFFECT")
                 logger.debug(e)
 
+    def _parse_get_normalized_pump_event_dose(self, dict, loop_report_dict, file_name):
         if Sections.GET_NORMALIZED_PUMP_EVENT_DOSE in dict:
             try:
                 local_list = dict[Sections.GET_NORMALIZED_PUMP_EVENT_DOSE]
@@ -699,6 +878,7 @@ class LoopReport:
                 logger.debug("handled error GET_NORMALIZED_PUMP_EVENT_DOSE")
                 logger.debug(e)
 
+    def _parse_get_normalized_dose_entries(self, dict, loop_report_dict, file_name):
         if Sections.GET_NORMALIZED_DOSE_ENTRIES in dict:
             try:
                 local_list = dict[Sections.GET_NORMALIZED_DOSE_ENTRIES]
@@ -721,6 +901,7 @@ class LoopReport:
                 logger.debug("handled error GET_NORMALIZED_DOSE_ENTRIES")
                 logger.debug(e)
 
+    def _parse_cached_dose_entries(self, dict, loop_report_dict, file_name):
         if Sections.CACHED_DOSE_ENTRIES in dict:
             try:
                 local_list = dict[Sections.CACHED_DOSE_ENTRIES]
@@ -747,6 +928,7 @@ class LoopReport:
                 logger.debug("handled error CACHED_DOSE_ENTRIES")
                 logger.debug(e)
 
+    def _parse_get_pump_event_values(self, dict, loop_report_dict, file_name):
         if Sections.GET_PUMP_EVENT_VALUES in dict:
             try:
                 items = dict[Sections.GET_PUMP_EVENT_VALUES]
@@ -983,10 +1165,12 @@ class LoopReport:
                 logger.debug("handled error GET_PUMP_EVENT_VALUES")
                 logger.debug(e)
 
+    def _parse_message_log(self, dict, loop_report_dict, file_name):
         if Sections.MESSAGE_LOG in dict:
             local_list = dict[Sections.MESSAGE_LOG]
             loop_report_dict["message_log"] = local_list
 
+    def _parse_g5_cgm_manager(self, dict, loop_report_dict, file_name):
         if Sections.G5_CGM_MANAGER in dict:
             try:
                 temp_dict = dict[Sections.G5_CGM_MANAGER]
@@ -1052,6 +1236,7 @@ class LoopReport:
                 logger.debug("handled error G5_CGM_MANAGER")
                 logger.debug(e)
 
+    def _parse_dex_cgm_manager(self, dict, loop_report_dict, file_name):
         if Sections.DEX_CGM_MANAGER in dict:
             try:
                 temp_dict = dict[Sections.DEX_CGM_MANAGER]
@@ -1074,135 +1259,39 @@ class LoopReport:
                 logger.debug("handled error DEX_CGM_MANAGER")
                 logger.debug(e)
 
+    def _parse_status_extension_data_manager(self, dict, loop_report_dict, file_name):
         if Sections.STATUS_EXTENSION_DATA_MANAGER in dict:
             try:
                 status_extension_data_manager = dict[
                     Sections.STATUS_EXTENSION_DATA_MANAGER
                 ]
+                context = parse_swift(
+                    status_extension_data_manager["statusExtensionContext"]
+                )
+
                 status_extension_context_dict = {}
+                for key in ["sensor", "netBasal", "version"]:
+                    if key in context:
+                        status_extension_context_dict[key] = _copy_value(context[key])
 
                 predicted_glucose = {}
-
-                temp = status_extension_data_manager["statusExtensionContext"]
-                temp = temp.replace("Optional([", "")
-                values_index = temp.index("values")
-                values_temp = temp[values_index:]
-                last_index = values_temp.index("]")
-                values = values_temp[:last_index+1]
-                values = values.replace(": [", "")
-                values = values.replace("values", "")
-                values = values.replace("]", "")
-                values = values.replace(', "', "")
-                values = values.replace('"', "")
-                values = values.replace(' ', "")
-                values_list = values.split(",")
-                predicted_glucose["values"] = values_list
-
-                try:
-                    sensor_index = temp.index("sensor")
-                    sensor_temp = temp[sensor_index:]
-                    last_index = sensor_temp.index("]")
-                    sensor = sensor_temp[9:last_index+1]
-                    sensor = sensor.replace('"', "")
-                    sensor = sensor.replace('[', "").replace(']', "")
-                    sensor = sensor.strip()
-                    temp_list = sensor.split(",")
-                    value_dict = {}
-                    for value in temp_list:
-                        val = value.split(":")
-                        value_dict[val[0]] = val[1]
-                        '"85.732078872579'
-                    status_extension_context_dict["sensor"] = value_dict
-                except Exception as e:
-                    logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER - sensor")
-                    logger.debug(e)
-
-
-                try:
-                    netBasal_index = temp.index("netBasal")
-                    netBasal_temp = temp[netBasal_index:]
-                    last_index = netBasal_temp.index("]")
-                    netBasal = netBasal_temp[9:last_index+1]
-                    netBasal = netBasal.replace('[', "").replace(']', "")
-                    netBasal = netBasal.strip()
-                    temp_list = netBasal.split(",")
-                    value_dict = {}
-                    for value in temp_list:
-                        val = value.split(":")
-                        value_dict[val[0]] = val[1]
-                    status_extension_context_dict["netBasal"] = value_dict
-                except Exception as e:
-                    logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER - netBasal")
-                    logger.debug(e)
-
-                try:
-                    version_index = temp.index("version")
-                    version_temp = temp[version_index:]
-                    last_index = version_temp.index(",")
-                    status_extension_context_dict["version"] = version_temp[10:last_index]
-                except Exception as e:
-                    logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER - version")
-                    logger.debug(e)
-
-                try:
-                    unit_index = temp.index("unit")
-                    unit_temp = temp[unit_index:]
-                    unit_temp = unit_temp.replace('"', '')
-                    last_index = unit_temp.index(",")
-                    predicted_glucose["unit"] = unit_temp[6:last_index]
-                except Exception as e:
-                    logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER - unit")
-                    logger.debug(e)
-
-                try:
-                    interval_index = temp.index("interval")
-                    interval_temp = temp[interval_index:]
-                    interval_temp = interval_temp.replace('"', '')
-                    last_index = interval_temp.index(",")
-                    interval_temp = interval_temp[9:last_index].replace("]", "")
-                    predicted_glucose["interval"] = float(interval_temp)
-                except Exception as e:
-                    logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER - interval")
-                    logger.debug(e)
-
-                try:
-                    startDate_index = temp.index("startDate")
-                    startDate_temp = temp[startDate_index:]
-                    startDate_temp = startDate_temp.replace('"', '')
-                    last_index = startDate_temp.index(",")
-                    predicted_glucose["startDate"] = startDate_temp[10:last_index]
-                except Exception as e:
-                    logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER - startDate")
-                    logger.debug(e)
-
+                for key in ["values", "unit", "interval", "startDate"]:
+                    if key in context.get("predictedGlucose", {}):
+                        predicted_glucose[key] = _copy_value(
+                            context["predictedGlucose"][key]
+                        )
                 status_extension_context_dict["predictedGlucose"] = predicted_glucose
 
-                try:
-                    batteryPercentage_index = temp.index("batteryPercentage")
-                    batteryPercentage_temp = temp[batteryPercentage_index:]
-                    batteryPercentage_temp = batteryPercentage_temp.replace('"', '')
-                    last_index = batteryPercentage_temp.index(",")
-                    status_extension_context_dict["batteryPercentage"] = float(batteryPercentage_temp[18:last_index].strip())
-                except Exception as e:
-                    logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER - batteryPercentage")
-                    logger.debug(e)
-
-                try:
-                    lastLoopCompleted_index = temp.index("lastLoopCompleted")
-                    lastLoopCompleted_temp = temp[lastLoopCompleted_index:]
-                    lastLoopCompleted_temp = lastLoopCompleted_temp.replace('"', '')
-                    last_index = lastLoopCompleted_temp.index(",")
-                    status_extension_context_dict["lastLoopCompleted"] = lastLoopCompleted_temp[18:last_index]
-                except Exception as e:
-                    logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER - lastLoopCompleted")
-                    logger.debug(e)
-
+                for key in ["batteryPercentage", "lastLoopCompleted"]:
+                    if key in context:
+                        status_extension_context_dict[key] = context[key]
 
                 loop_report_dict["status_extension_data_manager"] = status_extension_context_dict
             except Exception as e:
                 logger.debug("handled error STATUS_EXTENSION_DATA_MANAGER")
                 logger.debug(e)
 
+    def _parse_riley_link_pump_manager(self, dict, loop_report_dict, file_name):
         if Sections.RILEY_LINK_PUMP_MANAGER in dict:
             try:
                 loop_report_dict["riley_link_pump_manager"] = dict[
@@ -1212,6 +1301,7 @@ class LoopReport:
                 logger.debug("handled error RILEY_LINK_PUMP_MANAGER")
                 logger.debug(e)
 
+    def _parse_riley_link_device_manager(self, dict, loop_report_dict, file_name):
         if Sections.RILEY_LINK_DEVICE_MANAGER in dict:
             try:
                 loop_report_dict["riley_link_device_manager"] = dict[
@@ -1221,6 +1311,7 @@ class LoopReport:
                 logger.debug("handled error RILEY_LINK_DEVICE_MANAGER")
                 logger.debug(e)
 
+    def _parse_persistence_controller(self, dict, loop_report_dict, file_name):
         if Sections.PERSISTENCE_CONTROLLER in dict:
             try:
                 loop_report_dict["persistence_controller"] = dict[
@@ -1230,6 +1321,7 @@ class LoopReport:
                 logger.debug("handled error PERSISTENCE_CONTROLLER")
                 logger.debug(e)
 
+    def _parse_insulin_delivery_store(self, dict, loop_report_dict, file_name):
         if Sections.INSULIN_DELIVERY_STORE in dict:
             try:
                 loop_report_dict["insulin_delivery_store"] = dict[
@@ -1239,6 +1331,7 @@ class LoopReport:
                 logger.debug("handled error INSULIN_DELIVERY_STORE")
                 logger.debug(e)
 
+    def _parse_cached_carb_entries(self, dict, loop_report_dict, file_name):
         if Sections.CACHED_CARB_ENTRIES in dict:
             try:
                 temp_list = []
@@ -1283,6 +1376,7 @@ class LoopReport:
                 logger.debug("handled error CACHED_CARB_ENTRIES")
                 logger.debug(e)
 
+    def _parse_glucose_store(self, dict, loop_report_dict, file_name):
         if Sections.GLUCOSE_STORE in dict:
             try:
                 temp_dict = dict[Sections.GLUCOSE_STORE]
@@ -1314,6 +1408,7 @@ class LoopReport:
                 logger.debug("handled error GLUCOSE_STORE")
                 logger.debug(e)
 
+    def _parse_cached_glucose_samples(self, dict, loop_report_dict, file_name):
         if Sections.CACHED_GLUCOSE_SAMPLES in dict:
             try:
                 local_list = dict[Sections.CACHED_GLUCOSE_SAMPLES]
@@ -1338,7 +1433,6 @@ class LoopReport:
                 logger.debug("handled error CACHED_GLUCOSE_SAMPLES")
                 logger.debug(e)
 
-        return loop_report_dict
 
     def add_to_dictionary(self, dictionary, item):
         keyvalue = item.split(":")
@@ -1384,25 +1478,248 @@ class LoopReport:
             loop_report_dict["pump_manager_type"] = "unknown"
 
 
-    def _parse_item(self, item):
-        item_dict = None
-        if "startTime" in item:
-            item = item.replace('[', '').replace('"', "").replace(']', "")
-            items_values = item.split(",")
-            item_list = []
+def _copy_value(value):
+    # a plain copy of a parsed (and cached) swift value, for the report dict
+    if isinstance(value, dict):
+        return {k: _copy_value(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy_value(v) for v in value]
+    return value
+
+
+def _swift_text(value):
+    # a parsed swift scalar as it is printed in the report
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+class _ParseTimeout(BaseException):
+    # a BaseException, so that the handlers' broad excepts do not swallow it
+    pass
+
 
-            if 'startTime' not in items_values[0] and 'value:' not in items_values[0]:
-                items_values.pop(0)
+class _TimeLimit:
+    # raise _ParseTimeout in the block after <seconds> (and again every 0.1
+    # seconds, in case a bare except swallows it), if signals can be used here
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.active = False
+        self.timed_out = False
+        self.previous_handler = None
 
-            if 'value:' in items_values[0]:
-                item_list = [float(items_values[0].replace('value:', '').strip()),
-                             float(items_values[1].strip())]
-                startTime = items_values[2].replace('startTime:', '').strip()
+    def _alarm(self, signum, frame):
+        if self.active:
+            self.timed_out = True
+            raise _ParseTimeout()
+
+    def __enter__(self):
+        if (
+            self.seconds
+            and hasattr(signal, "setitimer")
+            and threading.current_thread() is threading.main_thread()
+        ):
+            self.previous_handler = signal.signal(signal.SIGALRM, self._alarm)
+            self.active = True
+            signal.setitimer(signal.ITIMER_REAL, self.seconds, 0.1)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        while True:
+            try:
+                self.active = False
+                break
+            except _ParseTimeout:
+                pass
+        if self.previous_handler is not None:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous_handler)
+        return exc_type is _ParseTimeout
+
+
+def _parse_file(task, loop_report=None, parse=None):
+    # parse one report of iter_by_directory (in a worker process)
+    # parse: the function that parses it (LoopReport.parse_by_file if None)
+    # returns the result of _parse_with_time_limit
+    position, directory, file_name, sections, timeout = task
+    if loop_report is None:
+        loop_report = LoopReport()
+    if parse is None:
+        parse = LoopReport.parse_by_file
+    return _parse_with_time_limit(
+        position,
+        file_name,
+        timeout,
+        lambda: parse(loop_report, directory, file_name, sections),
+        loop_report,
+    )
+
+
+def _parse_with_time_limit(position, file_name, timeout, parse, loop_report):
+    # returns (position, file name, the parsed report or None, error or None,
+    # the profile of the report or None)
+    # (the report is profiled separately, as the loop_report of a worker
+    # process is a copy, whose profile is not seen by the parent process)
+    profile = None
+    if loop_report.profile is not None:
+        profile = ParseProfile()
+        parent_profile, loop_report.profile = loop_report.profile, profile
+    loop_report_dict = None
+    error = None
+    time_limit = _TimeLimit(timeout)
+    try:
+        with time_limit:
+            loop_report_dict = parse()
+    except Exception as e:
+        error = repr(e)
+    finally:
+        if profile is not None:
+            loop_report.profile = parent_profile
+    if time_limit.timed_out:
+        loop_report_dict = None
+        error = f"timed out after {timeout} seconds"
+    return position, file_name, loop_report_dict, error, profile
+
+
+def _parse_member(task, loop_report=None):
+    # parse one archive member of iter_by_archive (in a worker process)
+    position, member_name, member, sections, timeout = task
+    if loop_report is None:
+        loop_report = LoopReport()
+    return _parse_with_time_limit(
+        position,
+        member_name,
+        timeout,
+        lambda: loop_report.parse_by_buffer(member, member_name, sections),
+        loop_report,
+    )
+
+
+class _ReadAhead:
+    # an iterator of tasks that blocks (in the pool's task thread) once
+    # <limit> tasks are waiting for their results, so that a pool is not sent
+    # a whole archive at once
+    def __init__(self, tasks, limit):
+        self.tasks = iter(tasks)
+        self.slots = threading.Semaphore(limit)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.slots.acquire()
+        if self.closed:
+            raise StopIteration
+        return next(self.tasks)
+
+    def consumed(self, results):
+        for result in results:
+            self.slots.release()
+            yield result
+
+    def close(self):
+        # unblock the task thread, so that the pool can shut down
+        self.closed = True
+        self.slots.release()
+
+
+def _in_order(results):
+    # restore the order of (position, ...) results that arrive in any order
+    pending = {}
+    next_position = 0
+    for result in results:
+        pending[result[0]] = result
+        while next_position in pending:
+            yield pending.pop(next_position)
+            next_position += 1
+
+
+class LoopReportView:
+    # a lazy view of one loop report: each part of the report (see
+    # REPORT_SECTIONS) is a property that is scanned, parsed and memoized on
+    # first access, e.g. view.dose_store["basal_rate_schedule"]
+    def __init__(self, path, file_name, sections=None, loop_report=None, use_index=False):
+        self.path = path
+        self.file_name = file_name
+        self.use_index = use_index
+        self._prefetch = raw_sections(sections) or set()
+        self._loop_report = loop_report if loop_report is not None else LoopReport()
+        self._raw = {}
+        self._scanned = set()
+        self._parsed = {}
+
+    def _scan(self, needed):
+        # scan the raw sections that have not been scanned yet (and the
+        # prefetch sections, on the first scan), skipping all other sections
+        missing = set(needed) - self._scanned
+        if missing:
+            missing.update(self._prefetch - self._scanned)
+            if self.use_index:
+                self._raw.update(
+                    read_sections(os.path.join(self.path, self.file_name), missing)
+                )
             else:
-                startTime = items_values[0].replace('startTime:', '').strip()
-                item_list = [float(items_values[1].replace('value:', '').strip()),
-                             float(items_values[2].strip())]
+                self._raw.update(
+                    parse_loop_report(self.path, self.file_name, sections=missing)
+                )
+            self._scanned.update(missing)
+
+    def section(self, handler_name):
+        # the parsed fields of one part of the report, e.g. "_parse_dose_store"
+        if handler_name not in self._parsed:
+            handler_sections = dict(REPORT_SECTIONS)[handler_name]
+            self._scan(handler_sections)
+            raw = {k: self._raw[k] for k in handler_sections if k in self._raw}
+            parsed = {}
+            getattr(self._loop_report, handler_name)(raw, parsed, self.file_name)
+            self._parsed[handler_name] = parsed
+        return self._parsed[handler_name]
+
+    def __getitem__(self, key):
+        # a parsed field (e.g. "loop_version"), parsing the parts of the report
+        # in order until the field is found
+        if key == "file_name":
+            return self.file_name
+        for parsed in self._parsed.values():
+            if key in parsed:
+                return parsed[key]
+        self._scan(raw_sections([s for _, h in REPORT_SECTIONS for s in h]))
+        for handler_name, _ in REPORT_SECTIONS:
+            parsed = self.section(handler_name)
+            if key in parsed:
+                return parsed[key]
+        raise KeyError(key)
+
+    def to_dict(self):
+        # all parsed fields, as returned by LoopReport.parse_by_file
+        loop_report_dict = {"file_name": self.file_name}
+        self._scan(raw_sections([s for _, h in REPORT_SECTIONS for s in h]))
+        for handler_name, _ in REPORT_SECTIONS:
+            loop_report_dict.update(self.section(handler_name))
+        return loop_report_dict
+
+
+def _section_property(handler_name):
+    return property(lambda self: self.section(handler_name))
+
+
+for _handler_name, _ in REPORT_SECTIONS:
+    setattr(
+        LoopReportView,
+        _handler_name[len("_parse_"):],
+        _section_property(_handler_name),
+    )
+
 
-            item_dict = {'startTime': startTime,
-                         'value': item_list}
-        return item_dict
+# the source files of the parser code: the modules of the handlers of
+# REPORT_SECTIONS, and the modules of the parser that they use (found from
+# their imports, so that a new dependency is covered without listing it), and
+# their version, which invalidates cached parse results
+PARSER_SOURCES = module_sources(
+    [
+        sys.modules[getattr(LoopReport, handler_name).__module__]
+        for handler_name, _ in REPORT_SECTIONS
+    ]
+)
+PARSER_VERSION = source_version(PARSER_SOURCES)
@@ -0,0 +1,63 @@
+"""
+description: Read loop reports straight out of zip and tar (.tar, .tar.gz, .tgz, .tar.bz2, .tar.xz) archives,
+streaming each report member to the parser without extracting the archive to disk.
+
+dependencies:
+* <>
+license: BSD-2-Clause
+"""
+import io
+import os
+import tarfile
+import zipfile
+
+REPORT_EXTENSION = ".md"
+
+
+def is_archive(file_path):
+    # whether <file_path> is a zip or tar archive
+    if not os.path.isfile(file_path):
+        return False
+    return zipfile.is_zipfile(file_path) or tarfile.is_tarfile(file_path)
+
+
+def _is_report(member_name):
+    # (skipping the "._" resource forks that macOS adds to archives)
+    base_name = os.path.basename(member_name)
+    return base_name.endswith(REPORT_EXTENSION) and not base_name.startswith("._")
+
+
+def iter_members(archive_path):
+    # a generator of (member name, binary file object) of the reports in an
+    # archive, in archive order; each file object is only readable until the
+    # next member is generated
+    if zipfile.is_zipfile(archive_path):
+        with zipfile.ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_report(info.filename):
+                    with archive.open(info) as member:
+                        yield info.filename, member
+        return
+
+    # (tar archives are read as a stream, so a compressed archive is only
+    # decompressed once, from start to end)
+    with tarfile.open(archive_path, mode="r|*") as archive:
+        for info in archive:
+            if info.isfile() and _is_report(info.name):
+                member = archive.extractfile(info)
+                yield info.name, io.BufferedReader(_ForwardOnly(member))
+
+
+class _ForwardOnly(io.RawIOBase):
+    # a member of a tar stream as a standard (forward only) binary stream, as
+    # the members of tar streams cannot be wrapped in io.TextIOWrapper
+    def __init__(self, member):
+        self.member = member
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.member.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
@@ -0,0 +1,168 @@
+"""
+description: An on-disk cache of parsed loop reports, keyed by the SHA-256 of the report content and the
+version of the parser, so that only new or changed reports are parsed again.
+
+dependencies:
+* <>
+license: BSD-2-Clause
+"""
+import os
+import sys
+import types
+import pickle
+import hashlib
+import tempfile
+
+CACHE_FILE_EXTENSION = ".pickle"
+DEFAULT_MAX_BYTES = 1024 ** 3
+
+# when the cache is full, the least recently used entries are evicted until
+# the cache is this fraction of its maximum size
+_EVICT_TO = 0.9
+
+
+def source_version(file_paths):
+    # a version string of source code, which changes whenever the code does
+    digest = hashlib.sha256()
+    for file_path in file_paths:
+        with open(file_path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def module_sources(modules):
+    # the source files of <modules>, and of the modules in their directories
+    # that they use (imported, or imported from), in a stable order
+    directories = {os.path.dirname(os.path.realpath(m.__file__)) for m in modules}
+    sources = set()
+    pending = list(modules)
+    while pending:
+        module = pending.pop()
+        path = os.path.realpath(module.__file__)
+        if path in sources:
+            continue
+        sources.add(path)
+        for value in list(vars(module).values()):
+            if isinstance(value, types.ModuleType):
+                used = value
+            else:
+                used = sys.modules.get(getattr(value, "__module__", None) or "")
+            used_path = getattr(used, "__file__", None)
+            if used_path and os.path.dirname(os.path.realpath(used_path)) in directories:
+                pending.append(used)
+    return sorted(sources)
+
+
+def file_digest(file_path, block_size=1024 * 1024):
+    # the SHA-256 of the content of a file
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    # a directory of pickled parse results, evicting the least recently used
+    # results once the directory is larger than max_bytes
+    def __init__(self, directory, version, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.version = version
+        self.max_bytes = max_bytes
+        self._total_bytes = None
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, file_path, sections=None):
+        # the cache key of parsing <sections> of a report
+        sections = "" if sections is None else ",".join(sorted(sections))
+        key = f"{file_digest(file_path)}:{self.version}:{sections}"
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + CACHE_FILE_EXTENSION)
+
+    def get(self, key):
+        # the cached result, or None
+        entry_path = self._path(key)
+        try:
+            with open(entry_path, "rb") as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # a corrupt (e.g. partly evicted) entry is a miss
+            self._remove(entry_path)
+            return None
+
+        try:
+            # mark the entry as recently used
+            os.utime(entry_path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        data = pickle.dumps(value, protocol=5)
+        if len(data) > self.max_bytes:
+            return
+
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            # the cache is only an optimization (e.g. a read-only directory)
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            self._remove(temp_path)
+            return
+
+        if self._total_bytes is None:
+            self._total_bytes = self._scan_total_bytes()
+        else:
+            self._total_bytes += len(data)
+        if self._total_bytes > self.max_bytes:
+            self.evict(int(self.max_bytes * _EVICT_TO))
+
+    def evict(self, max_bytes):
+        # remove the least recently used entries until the cache is at most
+        # max_bytes
+        entries = self._entries()
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_bytes <= max_bytes:
+                break
+            self._remove(entry_path)
+            total_bytes -= size
+        self._total_bytes = total_bytes
+
+    def clear(self):
+        for _, _, entry_path in self._entries():
+            self._remove(entry_path)
+        self._total_bytes = 0
+
+    def _entries(self):
+        # [(last used, size, path)] of the entries in the cache (entries that
+        # other processes are evicting at the same time are skipped)
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(CACHE_FILE_EXTENSION):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        return entries
+
+    def _scan_total_bytes(self):
+        return sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def _remove(entry_path):
+        try:
+            os.remove(entry_path)
+        except OSError:
+            pass
@@ -0,0 +1,272 @@
+"""
+description: Export parsed loop reports to a Parquet dataset, partitioned by loop_version and
+pump_manager_type. The dataset has a flat summary table with one row per report, and one long-format
+table per time series section (see loop_report_frames.TIME_SERIES_SECTIONS), keyed by report_id.
+Strings are dictionary-encoded.
+
+    <output_path>/summary/loop_version=.../pump_manager_type=.../*.parquet
+    <output_path>/<section>/loop_version=.../pump_manager_type=.../*.parquet
+
+dependencies:
+* pandas
+* pyarrow
+license: BSD-2-Clause
+"""
+from loop_report_cache import file_digest
+from loop_report_frames import parse_time_series, TIME_SERIES_SECTIONS
+import os
+import urllib.parse
+
+PARTITION_COLUMNS = ["loop_version", "pump_manager_type"]
+SUMMARY_TABLE = "summary"
+# the tables of a dataset
+TABLES = [SUMMARY_TABLE] + list(TIME_SERIES_SECTIONS)
+DEFAULT_BATCH_SIZE = 64
+_NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+def make_report_id(file_path):
+    # the id of a report, from its content (so the same report has the same id
+    # wherever it is exported from)
+    return file_digest(file_path)[:16]
+
+
+def summary_row(loop_dict, report_id):
+    # the flat summary of a parsed report: its scalar values, with the scalar
+    # values of nested dictionaries as "<key>.<nested key>" (lists, e.g. the
+    # time series, are left to the section tables)
+    row = {"report_id": report_id}
+
+    def flatten(prefix, dictionary):
+        for key, value in dictionary.items():
+            column = prefix + str(key).strip()
+            if isinstance(value, dict):
+                flatten(column + ".", value)
+            elif not isinstance(value, (list, tuple)):
+                row[column] = value.strip() if isinstance(value, str) else value
+
+    flatten("", loop_dict)
+    for column in PARTITION_COLUMNS:
+        row.setdefault(column, None)
+    return row
+
+
+def _summary_frame(rows):
+    # the summary rows as a DataFrame with one type per column: a column of
+    # only booleans, integers or numbers keeps them, and any other column is
+    # strings
+    import pandas as pd
+
+    columns = list(dict.fromkeys(column for row in rows for column in row))
+    frame = {}
+    for column in columns:
+        values = [row.get(column) for row in rows]
+        present = [value for value in values if value is not None]
+        if present and all(isinstance(value, bool) for value in present):
+            frame[column] = pd.array(values, dtype="boolean")
+        elif present and all(type(value) is int for value in present):
+            frame[column] = pd.array(values, dtype="Int64")
+        elif present and all(type(value) in (int, float) for value in present):
+            frame[column] = pd.array(
+                [float("nan") if value is None else value for value in values],
+                dtype="float64",
+            )
+        else:
+            frame[column] = pd.Categorical(
+                [None if value is None else str(value) for value in values]
+            )
+    return pd.DataFrame(frame)
+
+
+class DatasetWriter:
+    # writes reports to a partitioned Parquet dataset
+    # output_path: the directory of the dataset
+    # batch_size: the number of reports written to the section tables at a time
+    # (the summary table, with one small row per report, is written on close)
+    #
+    #    with DatasetWriter(output_path) as writer:
+    #        for loop_dict in lr.iter_by_directory(directory):
+    #            writer.add(directory, loop_dict)
+    def __init__(self, output_path, batch_size=DEFAULT_BATCH_SIZE):
+        self.output_path = output_path
+        self.batch_size = batch_size
+        self.count = 0
+        self._summary_rows = []
+        self._frames = {}
+        self._pending = 0
+        os.makedirs(output_path, exist_ok=True)
+
+    def add(self, path, loop_dict, frames=None, report_id=None):
+        # add a parsed report (loop_dict, from LoopReport.parse_by_file) that
+        # is in directory <path>
+        # frames: the time series of the report (parsed from the file if None)
+        # report_id: the id of the report (see make_report_id if None)
+        file_name = loop_dict["file_name"]
+        if report_id is None:
+            report_id = make_report_id(os.path.join(path, file_name))
+        if frames is None:
+            frames = parse_time_series(path, file_name)
+
+        self._summary_rows.append(summary_row(loop_dict, report_id))
+        partition = {column: loop_dict.get(column) for column in PARTITION_COLUMNS}
+        for section, frame in frames.items():
+            if len(frame) == 0:
+                continue
+            frame = frame.copy()
+            frame.insert(0, "report_id", report_id)
+            for column, value in partition.items():
+                frame[column] = value
+            self._frames.setdefault(section, []).append(frame)
+
+        self.count += 1
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        # write the time series of the reports added since the last flush
+        import pandas as pd
+
+        for section, frames in self._frames.items():
+            frame = pd.concat(frames, ignore_index=True)
+            frame["report_id"] = frame["report_id"].astype("category")
+            self._write(section, frame)
+        self._frames = {}
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        if self._summary_rows:
+            self._write(SUMMARY_TABLE, _summary_frame(self._summary_rows))
+            self._summary_rows = []
+
+    def _write(self, table_name, frame):
+        # write a new file to each partition of <frame>, e.g.
+        # <table_name>/loop_version=Loop%20v1.9.3/pump_manager_type=minimed/
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        file_name = f"part-{os.urandom(8).hex()}.parquet"
+        directories = [
+            frame[column].astype(object).map(_partition_value)
+            for column in PARTITION_COLUMNS
+        ]
+        for values, partition in frame.groupby(directories, sort=False):
+            partition_path = os.path.join(
+                self.output_path,
+                table_name,
+                *(
+                    f"{column}={value}"
+                    for column, value in zip(PARTITION_COLUMNS, values)
+                ),
+            )
+            os.makedirs(partition_path, exist_ok=True)
+            table = pa.Table.from_pandas(
+                partition.drop(columns=PARTITION_COLUMNS), preserve_index=False
+            )
+            # (with the same index type in every file, so that the files of a
+            # table have the same schema)
+            schema = pa.schema(
+                [
+                    field.with_type(
+                        pa.dictionary(pa.int32(), field.type.value_type)
+                    )
+                    if pa.types.is_dictionary(field.type)
+                    else field
+                    for field in table.schema
+                ]
+            )
+            pq.write_table(
+                table.cast(schema), os.path.join(partition_path, file_name)
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_table(output_path, table=SUMMARY_TABLE, columns=None, filters=None):
+    # read a table of a dataset (e.g. "summary" or Sections.CARB_EFFECT) into
+    # a DataFrame, e.g.
+    #   read_table(path, "carb_effect", filters=[("loop_version", "=", "Loop v1.9.3")])
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    table_path = os.path.join(output_path, table)
+    partitioning = _partitioning()
+    dataset = ds.dataset(table_path, format="parquet", partitioning=partitioning)
+    # (the files of a table can have different columns, e.g. the summaries
+    # written by different runs)
+    schema = pa.unify_schemas(
+        [dataset.schema]
+        + [fragment.physical_schema for fragment in dataset.get_fragments()]
+    )
+    dataset = ds.dataset(
+        table_path, schema=schema, format="parquet", partitioning=partitioning
+    )
+    table = dataset.to_table(columns=columns, filter=_filter_expression(filters))
+    return table.to_pandas()
+
+
+def _partition_value(value):
+    # a partition value as a hive directory name
+    import pandas as pd
+
+    if pd.isna(value):
+        return _NULL_PARTITION
+    return urllib.parse.quote(str(value), safe="")
+
+
+def _partitioning():
+    # the hive (<column>=<value>) directories of the partition columns
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+
+    return ds.HivePartitioning(
+        pa.schema([(column, pa.string()) for column in PARTITION_COLUMNS]),
+        null_fallback=_NULL_PARTITION,
+    )
+
+
+def _filter_expression(filters):
+    # [(column, "=" or "in", value)] as a pyarrow filter expression
+    import pyarrow.dataset as ds
+
+    expression = None
+    for column, op, value in filters or []:
+        if op == "=":
+            condition = ds.field(column) == value
+        elif op == "in":
+            condition = ds.field(column).isin(value)
+        else:
+            raise ValueError(f"unsupported filter operator: {op}")
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _parse_report(loop_report, directory, file_name, sections):
+    # parse a report of export_dataset, with its time series and id (in the
+    # worker processes of LoopReport.iter_by_directory)
+    # returns (loop_dict, frames, report_id)
+    loop_dict = loop_report.parse_by_file(directory, file_name, sections)
+    frames = parse_time_series(directory, file_name)
+    return loop_dict, frames, make_report_id(os.path.join(directory, file_name))
+
+
+def export_dataset(
+    directory, output_path, batch_size=DEFAULT_BATCH_SIZE, **kwargs
+):
+    # parse the reports in <directory> (kwargs are passed to
+    # LoopReport.iter_by_directory) into a dataset at <output_path>
+    # returns the number of reports exported
+    from loop_report import LoopReport
+
+    with DatasetWriter(output_path, batch_size) as writer:
+        reports = LoopReport().iter_by_directory(
+            directory, parse=_parse_report, **kwargs
+        )
+        for loop_dict, frames, report_id in reports:
+            writer.add(directory, loop_dict, frames=frames, report_id=report_id)
+    return writer.count
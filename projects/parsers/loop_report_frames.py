@@ -0,0 +1,249 @@
+"""
+description: Typed, columnar output for the time series and event sections of a loop report. Each section is
+parsed with one precompiled regex over the whole section text, straight into a pandas DataFrame with datetime64
+startDate / endDate and float64 quantity columns, instead of into lists of dicts of strings. The Omnipod
+### MessageLog is decoded into the bytes of each message, with its pod address, sequence number and message type.
+
+dependencies:
+* pandas
+* numpy
+license: BSD-2-Clause
+"""
+from loop_report_parser import parse_loop_report, Sections
+import re
+
+_DATE = r"(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d [+-]\d{4})"
+_NUMBER = r"([-+]?(?:\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|nan|inf))"
+
+# GlucoseEffect(start, mg/dL), e.g. "2019-01-28 15:16:20 +0000, 85.0"
+_EFFECT_PATTERN = re.compile(rf"^{_DATE}, {_NUMBER}$", re.MULTILINE)
+
+# GlucoseEffectVelocity(start, end, mg/dL/min)
+_VELOCITY_PATTERN = re.compile(rf"^{_DATE}, {_DATE}, {_NUMBER}$", re.MULTILINE)
+
+# StoredGlucoseSample(..., startDate: <date>, quantity: 92 mg/dL, ...)
+_GLUCOSE_SAMPLE_PATTERN = re.compile(
+    rf"startDate: {_DATE}, quantity: {_NUMBER} mg/dL"
+)
+
+# DoseEntry(type: LoopKit.DoseType.basal, startDate: <date>, endDate: <date>,
+# value: 0.8, unit: LoopKit.DoseUnit.unitsPerHour, ...,
+# scheduledBasalRate: Optional(0.8 IU/hr) or nil)
+_DOSE_ENTRY_PATTERN = re.compile(
+    rf"DoseEntry\(type: LoopKit\.DoseType\.(\w+), startDate: {_DATE}, endDate: {_DATE}, "
+    rf"value: {_NUMBER}, unit: LoopKit\.DoseUnit\.(\w+),.*"
+    rf"scheduledBasalRate: (?:Optional\({_NUMBER} IU/hr\)|nil)\)$",
+    re.MULTILINE,
+)
+
+# {section: (regex, the columns of the regex groups, units of quantity)}
+TIME_SERIES_SECTIONS = {
+    Sections.CACHED_GLUCOSE_SAMPLES: (
+        _GLUCOSE_SAMPLE_PATTERN,
+        ["startDate", "quantity"],
+        "mg/dL",
+    ),
+    Sections.PREDICTED_GLUCOSE: (_EFFECT_PATTERN, ["startDate", "quantity"], "mg/dL"),
+    Sections.INSULIN_EFFECT: (_EFFECT_PATTERN, ["startDate", "quantity"], "mg/dL"),
+    Sections.CARB_EFFECT: (_EFFECT_PATTERN, ["startDate", "quantity"], "mg/dL"),
+    Sections.INSULIN_COUNTERACTION_EFFECTS: (
+        _VELOCITY_PATTERN,
+        ["startDate", "endDate", "quantity"],
+        "mg/dL/min",
+    ),
+    Sections.GET_RESERVOIR_VALUES: (
+        _EFFECT_PATTERN,
+        ["startDate", "quantity"],
+        "unitVolume",
+    ),
+    Sections.GET_NORMALIZED_PUMP_EVENT_DOSE: (
+        _DOSE_ENTRY_PATTERN,
+        ["type", "startDate", "endDate", "quantity", "unit", "scheduledBasalRate"],
+        None,
+    ),
+}
+
+# the event sections, decoded by message_log_frame and pump_event_frame
+EVENT_SECTIONS = [Sections.MESSAGE_LOG, Sections.GET_PUMP_EVENT_VALUES]
+
+# e.g. "2019-01-08 18:42:00 +0000 send 1f0d624118030e01008179"
+_MESSAGE_PATTERN = re.compile(rf"^{_DATE} (\w+) ([0-9a-fA-F]*)$", re.MULTILINE)
+
+# PersistedPumpEvent(date: <date>, persistedDate: <date>, dose: nil or
+# Optional(LoopKit.DoseEntry(...)), isUploaded: false, ..., raw: Optional(8 bytes),
+# title: Optional("TempBasalPumpEvent(...)"), type: Optional(LoopKit.PumpEventType.tempBasal))
+_PUMP_EVENT_PATTERN = re.compile(
+    rf"^PersistedPumpEvent\(date: {_DATE}, persistedDate: {_DATE}, "
+    rf"dose: (?:nil|Optional\(LoopKit\.DoseEntry\(type: LoopKit\.DoseType\.(\w+), "
+    rf"startDate: {_DATE}, endDate: {_DATE}, value: {_NUMBER}, "
+    rf"unit: LoopKit\.DoseUnit\.(\w+).*?\)\)), "
+    rf"isUploaded: (true|false), objectIDURL: [^,]*, raw: (?:nil|Optional\((\d+) bytes\)), "
+    rf"title: (?:nil|Optional\(\"(\w+)[^\"\\]*(?:\\.[^\"\\]*)*\"\)), "
+    rf"type: (?:nil|Optional\((?:LoopKit\.PumpEventType\.)?(\w+)\))\)$",
+    re.MULTILINE,
+)
+_PUMP_EVENT_COLUMNS = [
+    "date",
+    "persistedDate",
+    "doseType",
+    "startDate",
+    "endDate",
+    "quantity",
+    "unit",
+    "isUploaded",
+    "rawLength",
+    "title",
+    "type",
+]
+
+_DATE_COLUMNS = {"startDate", "endDate", "date", "persistedDate"}
+_FLOAT_COLUMNS = {"quantity", "scheduledBasalRate"}
+
+
+def section_frame(section, lines):
+    # parse the lines of one time series or event section (as returned by
+    # parse_loop_report) into a DataFrame
+    text = lines if isinstance(lines, str) else "\n".join(lines)
+    if section == Sections.MESSAGE_LOG:
+        return message_log_frame(text)
+    if section == Sections.GET_PUMP_EVENT_VALUES:
+        return pump_event_frame(text)
+
+    pattern, columns, units = TIME_SERIES_SECTIONS[section]
+    frame = _typed_frame(pattern.findall(text), columns)
+    if units is not None:
+        frame.attrs["units"] = units
+    return frame
+
+
+def _typed_frame(rows, columns):
+    # a DataFrame of the regex groups of <rows>, typed by column name
+    import numpy as np
+    import pandas as pd
+
+    frame = {}
+    for i, column in enumerate(columns):
+        values = [row[i] for row in rows]
+        if column in _DATE_COLUMNS:
+            # (the ISO 8601 fast path is much faster than an explicit format
+            # with %z)
+            frame[column] = pd.to_datetime(values, utc=True)
+        elif column in _FLOAT_COLUMNS:
+            # a missing value (e.g. scheduledBasalRate: nil) is NaN
+            frame[column] = np.fromiter(
+                (float(value) if value else np.nan for value in values),
+                dtype=np.float64,
+                count=len(values),
+            )
+        elif column == "isUploaded":
+            frame[column] = np.array(values) == "true"
+        elif column == "rawLength":
+            frame[column] = pd.array(
+                [int(value) if value else None for value in values], dtype="Int16"
+            )
+        else:
+            # (a missing value, e.g. the dose of a pump event without one, is NaN)
+            frame[column] = pd.Categorical(
+                values, categories=sorted(set(values) - {""})
+            )
+
+    return pd.DataFrame(frame)
+
+
+def message_log_frame(text):
+    # decode an Omnipod ### MessageLog into one row per message:
+    #   * date, direction ("send" or "receive")
+    #   * payload, the bytes of the message
+    #   * address, the pod address (the first 4 bytes)
+    #   * sequence, the message sequence number (bits 2 to 5 of byte 4)
+    #   * message_type, the type of the first message block (byte 6)
+    # (the numbers are NA for messages that are too short to have them)
+    import numpy as np
+    import pandas as pd
+
+    rows = _MESSAGE_PATTERN.findall(text)
+    hex_payloads = [row[2] for row in rows]
+    lengths = np.array(
+        [len(payload) // 2 for payload in hex_payloads], dtype=np.int64
+    )
+    offsets = np.zeros(len(rows), dtype=np.int64)
+    if len(rows) > 1:
+        offsets[1:] = np.cumsum(lengths)[:-1]
+
+    # all of the payloads are decoded at once, into one buffer
+    # (an odd trailing hex digit is dropped)
+    buffer = bytes.fromhex(
+        "".join(
+            payload[: 2 * n] for payload, n in zip(hex_payloads, lengths.tolist())
+        )
+    )
+    data = np.frombuffer(buffer, dtype=np.uint8)
+
+    def byte_at(i):
+        has_byte = lengths > i
+        values = np.zeros(len(rows), dtype=np.int64)
+        values[has_byte] = data[offsets[has_byte] + i]
+        return values, ~has_byte
+
+    address = np.zeros(len(rows), dtype=np.int64)
+    for i in range(4):
+        address = (address << 8) | byte_at(i)[0]
+    b9, short = byte_at(4)
+    message_type, no_block = byte_at(6)
+    payloads = [
+        buffer[offset : offset + length]
+        for offset, length in zip(offsets.tolist(), lengths.tolist())
+    ]
+
+    return pd.DataFrame(
+        {
+            "date": pd.to_datetime([row[0] for row in rows], utc=True),
+            "direction": pd.Categorical([row[1] for row in rows]),
+            "payload": payloads,
+            "address": pd.arrays.IntegerArray(address.astype(np.uint32), lengths < 4),
+            "sequence": pd.arrays.IntegerArray(
+                ((b9 >> 2) & 0x0F).astype(np.uint8), short
+            ),
+            "message_type": pd.arrays.IntegerArray(
+                message_type.astype(np.uint8), no_block
+            ),
+        }
+    )
+
+
+def pump_event_frame(text):
+    # decode ### getPumpEventValues into one typed row per pump event, with the
+    # dose of the event (if any), the event title (e.g. "TempBasalPumpEvent")
+    # and the event type (e.g. "tempBasal")
+    return _typed_frame(_PUMP_EVENT_PATTERN.findall(text), _PUMP_EVENT_COLUMNS)
+
+
+def parse_time_series(path, file_name, sections=None):
+    # parse the time series sections of a report into DataFrames
+    # sections: the time series sections to parse (None for all of them)
+    # returns {section: DataFrame} for the sections in the report
+    if sections is None:
+        sections = list(TIME_SERIES_SECTIONS)
+    return parse_frames(path, file_name, sections)
+
+
+def parse_events(path, file_name, sections=None):
+    # parse the event sections of a report (see EVENT_SECTIONS) into DataFrames
+    if sections is None:
+        sections = EVENT_SECTIONS
+    return parse_frames(path, file_name, sections)
+
+
+def parse_frames(path, file_name, sections):
+    # parse time series and event sections of a report into DataFrames
+    # returns {section: DataFrame} for the sections in the report
+    unknown = set(sections) - set(TIME_SERIES_SECTIONS) - set(EVENT_SECTIONS)
+    if unknown:
+        raise ValueError(f"not time series or event sections: {sorted(unknown)}")
+
+    raw = parse_loop_report(path, file_name, sections=sections)
+    return {
+        section: section_frame(section, raw[section])
+        for section in sections
+        if section in raw
+    }
@@ -0,0 +1,182 @@
+"""
+description: A byte offset index of the sections of a loop report. The report is memory-mapped and scanned
+once for its headers and known keys, and the index is saved as a small sidecar file, so that a single
+section (e.g. ### MessageLog) can be read by seeking to it instead of parsing the whole report.
+
+dependencies: loop_report_parser.py
+license: BSD-2-Clause
+"""
+from loop_report_parser import (
+    parse_loop_report_lines,
+    parse_key_value,
+    Sections,
+    _DISPATCH_TABLE,
+    _SECTION,
+    _KEY_VALUE,
+    _GENERATED,
+    _LOOP_VERSION,
+    _NEW_LINE,
+)
+import os
+import io
+import re
+import json
+import mmap
+import hashlib
+
+INDEX_FILE_EXTENSION = ".index.json"
+
+# the index changes whenever the headers that the parser knows change
+INDEX_VERSION = hashlib.sha1(repr(sorted(_DISPATCH_TABLE.items())).encode()).hexdigest()[:12]
+
+_HEADER_PATTERN = re.compile(
+    b"^(?:#|"
+    + b"|".join(
+        re.escape(prefix.encode())
+        for candidates in _DISPATCH_TABLE.values()
+        for prefix, action, _, _ in candidates
+        if action != _NEW_LINE
+    )
+    + b")",
+    re.MULTILINE,
+)
+
+
+def build_index(file_path):
+    # scan the (memory-mapped) report for headers and known keys
+    # returns a dict with:
+    #   * sections: {section: [start, end]}, the byte range of the last
+    #     occurrence of each section (its header up to the next section header)
+    #   * keys: {key: [offset, ...]}, the lines of the loop data manager keys
+    #   * headers: [[offset, header], ...], every "#" line
+    file_stat = os.stat(file_path)
+    index = {
+        "version": INDEX_VERSION,
+        "file_size": file_stat.st_size,
+        "mtime_ns": file_stat.st_mtime_ns,
+        "sections": {},
+        "keys": {},
+        "headers": [],
+    }
+    if file_stat.st_size == 0:
+        return index
+
+    sections = index["sections"]
+    open_section = None
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for match in _HEADER_PATTERN.finditer(mm):
+                start = match.start()
+                end = mm.find(b"\n", start)
+                end = file_stat.st_size if end == -1 else end + 1
+                line = mm[start:end].decode("utf-8", errors="replace")
+
+                action = None
+                for prefix, action, section, _ in _DISPATCH_TABLE.get(line[:1], []):
+                    if line.startswith(prefix):
+                        break
+                else:
+                    action = None
+
+                if line.startswith("#"):
+                    index["headers"].append([start, line.rstrip("\n")])
+
+                if action == _SECTION:
+                    if open_section is not None:
+                        sections[open_section][1] = start
+                    sections[section] = [start, None]
+                    open_section = section
+                elif action == _KEY_VALUE:
+                    index["keys"].setdefault(prefix, []).append(start)
+                elif action == _GENERATED:
+                    sections["generated"] = [start, end]
+                elif action == _LOOP_VERSION:
+                    sections[Sections.LOOP_VERSION] = [start, end]
+
+    if open_section is not None:
+        sections[open_section][1] = file_stat.st_size
+
+    return index
+
+
+def index_path_for(file_path, index_dir=None):
+    # the sidecar index file of a report (next to the report by default)
+    if index_dir is None:
+        return file_path + INDEX_FILE_EXTENSION
+    return os.path.join(index_dir, os.path.basename(file_path) + INDEX_FILE_EXTENSION)
+
+
+def load_index(file_path, index_dir=None, write=True):
+    # the index of a report, read from its sidecar file if the report has
+    # not changed since, otherwise built (and saved, if write)
+    index_path = index_path_for(file_path, index_dir)
+    file_stat = os.stat(file_path)
+    try:
+        with open(index_path, "r") as f:
+            index = json.load(f)
+        if (
+            index.get("version") == INDEX_VERSION
+            and index.get("file_size") == file_stat.st_size
+            and index.get("mtime_ns") == file_stat.st_mtime_ns
+        ):
+            return index
+    except (OSError, ValueError):
+        pass
+
+    index = build_index(file_path)
+    if write:
+        temp_path = index_path + ".tmp"
+        try:
+            with open(temp_path, "w") as f:
+                json.dump(index, f)
+            os.replace(temp_path, index_path)
+        except OSError:
+            # the sidecar is only an optimization (e.g. a read-only folder)
+            pass
+
+    return index
+
+
+def _read_range(f, start, end):
+    f.seek(start)
+    return f.read(end - start).decode("utf-8")
+
+
+def read_sections(file_path, sections, index=None, index_dir=None):
+    # parse only <sections> of a report, seeking to each one with the index
+    # returns {section: parsed section} for the sections in the report
+    if index is None:
+        index = load_index(file_path, index_dir=index_dir)
+
+    all_sections = {}
+    with open(file_path, "rb") as f:
+        for section in sections:
+            if section not in index["sections"]:
+                continue
+            start, end = index["sections"][section]
+            lines = io.StringIO(_read_range(f, start, end))
+            parsed = parse_loop_report_lines(lines, sections=[section])
+            if section not in parsed:
+                continue
+            all_sections[section] = parsed[section]
+
+            if section == Sections.LOOP_DATA_MANAGER:
+                # the loop data manager keys after the section belong to it
+                later_keys = sorted(
+                    offset
+                    for offsets in index["keys"].values()
+                    for offset in offsets
+                    if offset >= end
+                )
+                for offset in later_keys:
+                    f.seek(offset)
+                    parse_key_value(all_sections, f.readline().decode("utf-8"))
+
+    return all_sections
+
+
+def read_section(file_path, section, index=None, index_dir=None):
+    # parse one section of a report (None if it is not in the report)
+    return read_sections(file_path, [section], index=index, index_dir=index_dir).get(
+        section
+    )
@@ -7,7 +7,10 @@ dependencies:
 * <>
 license: BSD-2-Clause
 """
+from loop_report_profile import SectionCounter
+import io
 import os
+import contextlib
 
 
 class Sections:
@@ -48,6 +51,9 @@ class Sections:
     GET_NORMALIZED_DOSE_ENTRIES = "get_normalized_dose_entries"
     CACHED_DOSE_ENTRIES = "cached_dose_entries"
     STATUS_EXTENSION_DATA_MANAGER = "status_extension_data_manager"
+    G6_CGM_MANAGER = "g6_cgm_manager"
+    SHARE_CLIENT_MANAGER = "share_client_manager"
+    DELETED_CARB_ENTRIES = "deleted_carb_entries"
 
     """ 
         #not sure this one is used
@@ -62,367 +68,252 @@ def _split_key_value(line, separator):
     return key, value
 
 
-def parse_loop_report(path: str, file_name: str):
-    current_section = ""
+# section headers, in the order they are matched (a line is matched against
+# the headers that start with the same character as the line)
+# (prefix, section name, True for a list section or False for a dict section)
+SECTION_HEADERS = [
+    ("## DeviceDataManager", Sections.DEVICE_DATA_MANAGER, False),
+    ("## G5CGMManager", Sections.G5_CGM_MANAGER, False),
+    ("## DexCGMManager", Sections.DEX_CGM_MANAGER, False),
+    ("## MinimedPumpManager", Sections.MINIMED_PUMP_MANAGER, False),
+    ("## RileyLinkPumpManager", Sections.RILEY_LINK_PUMP_MANAGER, False),
+    ("## RileyLinkDeviceManager", Sections.RILEY_LINK_DEVICE_MANAGER, False),
+    ("## RileyLinkDevice", Sections.RILEY_LINK_DEVICE, False),
+    ("## StatusExtensionDataManager", Sections.STATUS_EXTENSION_DATA_MANAGER, False),
+    ("## LoopDataManager", Sections.LOOP_DATA_MANAGER, False),
+    ("insulinCounteractionEffects:", Sections.INSULIN_COUNTERACTION_EFFECTS, True),
+    ("carbEffect:", Sections.CARB_EFFECT, True),
+    ("insulinEffect:", Sections.INSULIN_EFFECT, True),
+    ("predictedGlucose:", Sections.PREDICTED_GLUCOSE, True),
+    ("retrospectiveGlucoseDiscrepancies:", Sections.RETROSPECTIVE_GLUCOSE_DISCREPANCIES, True),
+    (
+        "retrospectiveGlucoseDiscrepanciesSummed:",
+        Sections.RETROSPECTIVE_GLUCOSE_DISCREPANCIES_SUMMED,
+        True,
+    ),
+    ("cacheStore: ## PersistenceController", Sections.PERSISTENCE_CONTROLLER, False),
+    ("## GlucoseStore", Sections.GLUCOSE_STORE, False),
+    ("### cachedGlucoseSamples", Sections.CACHED_GLUCOSE_SAMPLES, True),
+    ("## CarbStore", Sections.CARB_STORE, False),
+    ("cachedCarbEntries:", Sections.CACHED_CARB_ENTRIES, True),
+    ("deletedCarbEntries:", Sections.DELETED_CARB_ENTRIES, False),
+    ("## DoseStore", Sections.DOSE_STORE, False),
+    ("### getReservoirValues", Sections.GET_RESERVOIR_VALUES, True),
+    ("### getPumpEventValues", Sections.GET_PUMP_EVENT_VALUES, True),
+    ("### getNormalizedDoseEntries", Sections.GET_NORMALIZED_DOSE_ENTRIES, True),
+    (
+        "### getNormalizedPumpEventDoseEntriesOverlaidWithBasalEntries",
+        Sections.GET_NORMALIZED_PUMP_EVENT_DOSE,
+        True,
+    ),
+    ("### InsulinDeliveryStore", Sections.INSULIN_DELIVERY_STORE, False),
+    ("## WatchDataManager", Sections.WATCH_DATA_MANAGER, False),
+    ("## OmnipodPumpManager", Sections.OMNIPOD_PUMP_MANAGER, False),
+    ("## G6CGMManager", Sections.G6_CGM_MANAGER, False),
+    ("## ShareClientManager", Sections.SHARE_CLIENT_MANAGER, False),
+    ("## PodComms", Sections.POD_COMMS, False),
+    ("### MessageLog", Sections.MESSAGE_LOG, True),
+    ("#### cachedDoseEntries", Sections.CACHED_DOSE_ENTRIES, True),
+    ("## PodInfoFaultEvent", Sections.POD_INFO_FAULT_EVENT, False),
+    ("### OmnipodPumpManagerState", Sections.OMNIPOD_PUMP_MANAGER_STATE, False),
+    ("## PodState", Sections.POD_STATE, False),
+]
+
+# lines that are key values of the loop data manager, wherever they are
+LOOP_DATA_MANAGER_KEYS = [
+    "retrospectivePredictedGlucose",
+    "glucoseMomentumEffect",
+    "retrospectiveGlucoseEffect",
+    "recommendedTempBasal",
+    "recommendedBolus",
+    "lastBolus",
+    "retrospectiveGlucoseChange",
+    "lastLoopCompleted",
+    "lastTempBasal",
+    "carbsOnBoard",
+    "error",
+]
+
+_SECTION = "section"
+_GENERATED = "generated"
+_LOOP_VERSION = "loop_version"
+_KEY_VALUE = "key_value"
+_NEW_LINE = "new_line"
+
+
+def _build_dispatch_table():
+    # {first character of a line: [(prefix, action, section name, is list)]},
+    # keeping the order in which the prefixes are matched
+    line_prefixes = [
+        ("Generated:", _GENERATED, None, False),
+        ("Loop", _LOOP_VERSION, None, False),
+    ]
+    line_prefixes += [(prefix, _KEY_VALUE, None, False) for prefix in LOOP_DATA_MANAGER_KEYS]
+    line_prefixes += [
+        (prefix, _SECTION, section, is_list) for prefix, section, is_list in SECTION_HEADERS
+    ]
+    line_prefixes.append(("\n", _NEW_LINE, None, False))
+
+    dispatch_table = {}
+    for prefix, action, section, is_list in line_prefixes:
+        dispatch_table.setdefault(prefix[0], []).append((prefix, action, section, is_list))
+
+    return dispatch_table
+
+
+_DISPATCH_TABLE = _build_dispatch_table()
+
+
+def parse_loop_report(path, file_name=None, sections=None, profile=None):
+    # path, file_name: the directory and file name of a report, or
+    # path: a report as a file-like object (text or binary) or bytes
+    # sections: the only sections to parse (e.g. [Sections.DOSE_STORE]); the
+    # lines of all other sections are skipped. None parses every section.
+    # profile: a loop_report_profile.ParseProfile to add the wall time, bytes
+    # and lines of each section to (None for no profiling)
     all_sections = {}
-
-    new_line = False
-    dataPathAndName = os.path.join(path, file_name)
+    if file_name is None:
+        dataPathAndName = path
+        source_name = path if isinstance(path, (str, os.PathLike)) else "<buffer>"
+    else:
+        dataPathAndName = os.path.join(path, file_name)
+        source_name = dataPathAndName
 
     try:
+        with open_report(dataPathAndName) as reader:
+            parse_loop_report_lines(
+                reader, sections=sections, all_sections=all_sections, profile=profile
+            )
+    except Exception as e:
+        print("loop report parser error for file : " + str(source_name))
+        print(e)
 
-        with open(dataPathAndName, "r") as reader:
-            for line in reader:
-
-                if line.startswith("Generated:"):
-                    key, value = _split_key_value(line, ":")
-                    generated = {}
-                    generated[key] = value
-                    all_sections["generated"] = generated
-                    new_line = False
-
-                elif line.startswith("Loop"):
-                    key, value = _split_key_value(line, ":")
-                    loop = {}
-                    loop["loop_version"] = key
-                    all_sections["loop_version"] = loop
-                    new_line = False
-
-                elif line.startswith("## DeviceDataManager"):
-                    device_data_manager = {}
-                    current_section = "device_data_manager"
-                    all_sections["device_data_manager"] = device_data_manager
-                    new_line = False
-
-                elif line.startswith("## G5CGMManager"):
-                    g5_cgm_manager = {}
-                    current_section = "g5_cgm_manager"
-                    all_sections["g5_cgm_manager"] = g5_cgm_manager
-                    new_line = False
-
-                elif line.startswith("## DexCGMManager"):
-                    dex_cgm_manager = {}
-                    current_section = "dex_cgm_manager"
-                    all_sections["dex_cgm_manager"] = dex_cgm_manager
-                    new_line = False
-
-                elif line.startswith("## MinimedPumpManager"):
-                    minimed_pump_manager = {}
-                    current_section = "minimed_pump_manager"
-                    all_sections["minimed_pump_manager"] = minimed_pump_manager
-                    new_line = False
-
-                elif line.startswith("## RileyLinkPumpManager"):
-                    riley_link_pump_manager = {}
-                    current_section = "riley_link_pump_manager"
-                    all_sections["riley_link_pump_manager"] = riley_link_pump_manager
-                    new_line = False
-
-                elif line.startswith("## RileyLinkDeviceManager"):
-                    riley_link_device_manager = {}
-                    current_section = "riley_link_device_manager"
-                    all_sections["riley_link_device_manager"] = riley_link_device_manager
-                    new_line = False
-
-                elif line.startswith("## RileyLinkDevice"):
-                    riley_link_device = {}
-                    current_section = "riley_link_device"
-                    all_sections["riley_link_device"] = riley_link_device
-                    new_line = False
-
-                elif line.startswith("## StatusExtensionDataManager"):
-                    status_extension_data_manager = {}
-                    current_section = "status_extension_data_manager"
-                    all_sections[
-                        "status_extension_data_manager"
-                    ] = status_extension_data_manager
-                    new_line = False
-
-                elif line.startswith("## LoopDataManager"):
-                    loop_data_manager = {}
-                    current_section = "loop_data_manager"
-                    all_sections["loop_data_manager"] = loop_data_manager
-                    new_line = False
-
-                elif line.startswith("retrospectivePredictedGlucose"):
-                    parse_key_value(all_sections, line)
-
-                elif line.startswith("glucoseMomentumEffect"):
-                    parse_key_value(all_sections, line)
-
-                elif line.startswith("retrospectiveGlucoseEffect"):
-                    parse_key_value(all_sections, line)
-
-                elif line.startswith("recommendedTempBasal"):
-                    parse_key_value(all_sections, line)
-
-                elif line.startswith("recommendedBolus"):
-                    parse_key_value(all_sections, line)
-
-                elif line.startswith("lastBolus"):
-                    parse_key_value(all_sections, line)
+    return all_sections
 
-                elif line.startswith("retrospectiveGlucoseChange"):
-                    parse_key_value(all_sections, line)
 
-                elif line.startswith("lastLoopCompleted"):
-                    parse_key_value(all_sections, line)
+@contextlib.contextmanager
+def open_report(source):
+    # the lines of a report, from a file path, bytes or a file-like object
+    # (binary streams, e.g. the members of an archive, are decoded as they are
+    # read, and are not closed)
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "r") as reader:
+            yield reader
+        return
 
-                elif line.startswith("lastTempBasal"):
-                    parse_key_value(all_sections, line)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    elif isinstance(source.read(0), str):
+        yield source
+        return
 
-                elif line.startswith("carbsOnBoard"):
-                    parse_key_value(all_sections, line)
+    reader = io.TextIOWrapper(source, encoding="utf-8")
+    try:
+        yield reader
+    finally:
+        reader.detach()
+
+
+def parse_loop_report_lines(lines, sections=None, all_sections=None, profile=None):
+    # parse an iterable of report lines (e.g. an open file, or the lines of
+    # one section) into all_sections, which is returned
+    # profile: see parse_loop_report (the lines are only counted when profiling)
+    counter = None
+    if profile is not None:
+        counter = SectionCounter(profile)
+        lines = counter.count(lines)
+    current_section = ""
+    current_list = None
+    current_dict = None
+    if all_sections is None:
+        all_sections = {}
+    wanted = None if sections is None else set(sections)
+
+    dispatch_table = _DISPATCH_TABLE
+
+    for line in lines:
+        # only the lines that start like a header need to be matched
+        # against the headers; all other lines are data lines
+        candidates = dispatch_table.get(line[:1])
+        if candidates is not None:
+            for prefix, action, section, is_list in candidates:
+                if line.startswith(prefix):
+                    break
+            else:
+                action = None
+
+            if action == _SECTION:
+                if counter is not None:
+                    counter.start(section)
+                if wanted is not None and section not in wanted:
+                    # skip the lines of this section
+                    current_section = ""
+                    current_list = None
+                    current_dict = None
+                    continue
+                current_section = section
+                if is_list:
+                    current_list = []
+                    current_dict = None
+                    all_sections[section] = current_list
+                else:
+                    current_list = None
+                    current_dict = {}
+                    all_sections[section] = current_dict
+                continue
 
-                elif line.startswith("error"):
+            elif action == _KEY_VALUE:
+                if wanted is None or Sections.LOOP_DATA_MANAGER in wanted:
                     parse_key_value(all_sections, line)
+                continue
 
-                elif line.startswith("insulinCounteractionEffects:"):
-                    insulin_counteraction_effects = []
-                    current_section = "insulin_counteraction_effects"
-                    all_sections[
-                        "insulin_counteraction_effects"
-                    ] = insulin_counteraction_effects
-                    new_line = False
-
-                elif line.startswith("carbEffect:"):
-                    carb_effect = []
-                    current_section = "carb_effect"
-                    all_sections["carb_effect"] = carb_effect
-                    new_line = False
-
-                elif line.startswith("insulinEffect:"):
-                    insulin_effect = []
-                    current_section = "insulin_effect"
-                    all_sections["insulin_effect"] = insulin_effect
-                    new_line = False
-
-                elif line.startswith("predictedGlucose:"):
-                    predicted_glucose = []
-                    current_section = "predicted_glucose"
-                    all_sections["predicted_glucose"] = predicted_glucose
-                    new_line = False
-
-                elif line.startswith("retrospectiveGlucoseDiscrepancies:"):
-                    retrospective_glucose_discrepancies = []
-                    current_section = "retrospective_glucose_discrepancies"
-                    all_sections[
-                        "retrospective_glucose_discrepancies"
-                    ] = retrospective_glucose_discrepancies
-                    new_line = False
-
-                elif line.startswith("retrospectiveGlucoseDiscrepanciesSummed:"):
-                    retrospective_glucose_discrepancies_summed = []
-                    current_section = "retrospective_glucose_discrepancies_summed"
-                    all_sections[
-                        "retrospective_glucose_discrepancies_summed"
-                    ] = retrospective_glucose_discrepancies_summed
-                    new_line = False
-
-                elif line.startswith("retrospectivePredictedGlucose"):
-                    retrospective_predicted_glucose = {}
-                    current_section = "retrospective_predicted_glucose"
-                    all_sections[
-                        "retrospective_predicted_glucose"
-                    ] = retrospective_predicted_glucose
-                    new_line = False
-
-                elif line.startswith("cacheStore: ## PersistenceController"):
-                    persistence_controller = {}
-                    current_section = "persistence_controller"
-                    all_sections["persistence_controller"] = persistence_controller
-                    new_line = False
-
-                elif line.startswith("## GlucoseStore"):
-                    glucose_store = {}
-                    current_section = "glucose_store"
-                    all_sections["glucose_store"] = glucose_store
-                    new_line = False
-
-                elif line.startswith("### cachedGlucoseSamples"):
-                    cached_glucose_samples = []
-                    current_section = "cached_glucose_samples"
-                    all_sections["cached_glucose_samples"] = cached_glucose_samples
-                    new_line = False
-
-                elif line.startswith("## CarbStore"):
-                    carb_store = {}
-                    current_section = "carb_store"
-                    all_sections["carb_store"] = carb_store
-                    new_line = False
-
-                elif line.startswith("cachedCarbEntries:"):
-                    cached_carb_entries = []
-                    current_section = "cached_carb_entries"
-                    all_sections["cached_carb_entries"] = cached_carb_entries
-                    new_line = False
-
-                elif line.startswith("deletedCarbEntries:"):
-                    deleted_carb_entries = {}
-                    current_section = "deleted_carb_entries"
-                    all_sections["deleted_carb_entries"] = deleted_carb_entries
-                    new_line = False
-
-                elif line.startswith("## DoseStore"):
-                    dose_store = {}
-                    current_section = "dose_store"
-                    all_sections["dose_store"] = dose_store
-                    new_line = False
-
-                elif line.startswith("### getReservoirValues"):
-                    get_reservoir_values = []
-                    current_section = "get_reservoir_values"
-                    all_sections["get_reservoir_values"] = get_reservoir_values
-                    new_line = False
-
-                elif line.startswith("### getPumpEventValues"):
-                    get_pump_event_values = []
-                    current_section = "get_pump_event_values"
-                    all_sections["get_pump_event_values"] = get_pump_event_values
-                    new_line = False
-
-                elif line.startswith("### getNormalizedDoseEntries"):
-                    get_normalized_dose_entries = []
-                    current_section = "get_normalized_dose_entries"
-                    all_sections[
-                        "get_normalized_dose_entries"
-                    ] = get_normalized_dose_entries
-                    new_line = False
-
-                elif line.startswith(
-                    "### getNormalizedPumpEventDoseEntriesOverlaidWithBasalEntries"
-                ):
-                    get_normalized_pump_event_dose = []
-                    current_section = "get_normalized_pump_event_dose"
-                    all_sections[
-                        "get_normalized_pump_event_dose"
-                    ] = get_normalized_pump_event_dose
-                    new_line = False
-
-                elif line.startswith("### InsulinDeliveryStore"):
-                    insulin_delivery_store = {}
-                    current_section = "insulin_delivery_store"
-                    all_sections["insulin_delivery_store"] = insulin_delivery_store
-                    new_line = False
-
-                elif line.startswith("## WatchDataManager"):
-                    watch_data_manager = {}
-                    current_section = "watch_data_manager"
-                    all_sections["watch_data_manager"] = watch_data_manager
-                    new_line = False
-
-                elif line.startswith("## OmnipodPumpManager"):
-                    omnipod_pump_manager = {}
-                    current_section = "omnipod_pump_manager"
-                    all_sections["omnipod_pump_manager"] = omnipod_pump_manager
-                    new_line = False
-
-                elif line.startswith("## G6CGMManager"):
-                    g6_cgm_manager = {}
-                    current_section = "g6_cgm_manager"
-                    all_sections["g6_cgm_manager"] = g6_cgm_manager
-                    new_line = False
-
-                elif line.startswith("## ShareClientManager"):
-                    share_client_manager = {}
-                    current_section = "share_client_manager"
-                    all_sections["share_client_manager"] = share_client_manager
-                    new_line = False
-
-                elif line.startswith("## PodComms"):
-                    pod_comms = {}
-                    current_section = "pod_comms"
-                    all_sections["pod_comms"] = pod_comms
-                    new_line = False
-
-                elif line.startswith("### MessageLog"):
-                    message_log = []
-                    current_section = "message_log"
-                    all_sections["message_log"] = message_log
-                    new_line = False
-
-                elif line.startswith("#### cachedDoseEntries"):
-                    cached_dose_entries = []
-                    current_section = "cached_dose_entries"
-                    all_sections["cached_dose_entries"] = cached_dose_entries
-                    new_line = False
-
-                elif line.startswith("## PodInfoFaultEvent"):
-                    pod_info_fault_event = {}
-                    current_section = "pod_info_fault_event"
-                    all_sections["pod_info_fault_event"] = pod_info_fault_event
-                    new_line = False
-
-                elif line.startswith("### OmnipodPumpManagerState"):
-                    omnipod_pump_manager_state = {}
-                    current_section = "omnipod_pump_manager_state"
-                    all_sections["omnipod_pump_manager_state"] = omnipod_pump_manager_state
-                    new_line = False
-
-                elif line.startswith("## PodState"):
-                    pod_state = {}
-                    current_section = "pod_state"
-                    all_sections["pod_state"] = pod_state
-                    new_line = False
-
-                elif line.startswith("\n"):
-                    new_line = True
-
-                elif (
-                    line.startswith("#") or line.startswith("##") or line.startswith("###")
-                ):
-                    print(f"UNHANDLED SECTION: {line}")
-                    new_line = False
-
-                else:
-                    if (
-                        current_section == "insulin_counteraction_effects"
-                        or current_section == "get_reservoir_values"
-                        or current_section == "predicted_glucose"
-                        or current_section == "get_pump_event_values"
-                        or current_section == "message_log"
-                        or current_section == "get_normalized_dose_entries"
-                        or current_section == "cached_dose_entries"
-                        or current_section == "get_normalized_pump_event_dose"
-                        or current_section == "insulin_effect"
-                        or current_section == "carb_effect"
-                        or current_section == "retrospective_glucose_discrepancies"
-                        or current_section == "retrospective_glucose_discrepancies_summed"
-                        or current_section == "cached_glucose_samples"
-                        or current_section == "cached_carb_entries"
-                    ):
-                        new_line = False
-                        i_list = all_sections[current_section]
-                        if line.startswith("*"):
-                            line = line[1:]
-                        if line.startswith(" "):
-                            line = line[1:]
-                        if line.endswith("\n"):
-                            line = line[:-1]
-
-                        i_list.append(line)
-
-                    elif (
-                        not line.startswith("settings")
-                        and current_section == Sections.LOOP_DATA_MANAGER
-                    ):
-                        one = "one"
-                    elif current_section:
-                        new_line = False
-                        dict = all_sections[current_section]
-                        key, value = _split_key_value(line, ":")
-                        if key or value != "\n":
-                            if key.startswith("*"):
-                                key = key[1:]
-                            if key.startswith(" "):
-                                key = key[1:]
-                            if value.endswith("\n"):
-                                value.replace("\n", "")
-                            dict[key] = value.replace("\n", "")
-    except Exception as e:
-        print("loop report parser error for file : " + dataPathAndName)
-        print(e)
+            elif action == _GENERATED:
+                if wanted is None or "generated" in wanted:
+                    key, value = _split_key_value(line, ":")
+                    all_sections["generated"] = {key: value}
+                continue
 
+            elif action == _LOOP_VERSION:
+                if wanted is None or Sections.LOOP_VERSION in wanted:
+                    key, value = _split_key_value(line, ":")
+                    all_sections["loop_version"] = {"loop_version": key}
+                continue
+
+            elif action == _NEW_LINE:
+                continue
+
+            elif line[0] == "#":
+                print(f"UNHANDLED SECTION: {line}")
+                continue
+
+        # data line
+        if current_list is not None:
+            if line.startswith("*"):
+                line = line[1:]
+            if line.startswith(" "):
+                line = line[1:]
+            if line.endswith("\n"):
+                line = line[:-1]
+
+            current_list.append(line)
+
+        elif (
+            current_section == Sections.LOOP_DATA_MANAGER
+            and not line.startswith("settings")
+        ):
+            pass
+
+        elif current_dict is not None:
+            key, value = _split_key_value(line, ":")
+            if key or value != "\n":
+                if key.startswith("*"):
+                    key = key[1:]
+                if key.startswith(" "):
+                    key = key[1:]
+                current_dict[key] = value.replace("\n", "")
+
+    if counter is not None:
+        counter.finish()
     return all_sections
 
 
@@ -0,0 +1,151 @@
+"""
+description: Optional profiling of loop report parsing. A ParseProfile records the wall time, input bytes and
+lines of every raw section read by parse_loop_report, and of every handler of LoopReport (see
+loop_report.REPORT_SECTIONS), summed over any number of reports, so that the sections that dominate the parse time
+of large reports can be found.
+
+    profile = ParseProfile()
+    LoopReport(profile=profile).parse_by_directory(directory)
+    print(profile.format())
+
+dependencies:
+* <>
+license: BSD-2-Clause
+"""
+import time
+
+SECTION = "section"
+HANDLER = "handler"
+# the lines of a report before its first section (e.g. Generated: and the loop
+# version)
+PREAMBLE = "preamble"
+
+
+def text_size(text):
+    # the utf-8 bytes of <text> (which is almost always ascii)
+    return len(text) if text.isascii() else len(text.encode("utf-8"))
+
+
+def raw_size(value):
+    # (bytes, lines) of a raw section of parse_loop_report: a list of lines or
+    # a dict of "key: value" lines
+    if isinstance(value, dict):
+        return (
+            sum(text_size(key) + text_size(text) for key, text in value.items()),
+            len(value),
+        )
+    if isinstance(value, list):
+        return sum(text_size(line) for line in value), len(value)
+    return 0, 0
+
+
+class ParseProfile:
+    # {(SECTION or HANDLER, name): [calls, seconds, bytes, lines]}, and the
+    # number of reports they were recorded for
+    def __init__(self):
+        self.reports = 0
+        self.stats = {}
+
+    def add(self, kind, name, seconds, size=0, lines=0):
+        stat = self.stats.get((kind, name))
+        if stat is None:
+            self.stats[(kind, name)] = [1, seconds, size, lines]
+        else:
+            stat[0] += 1
+            stat[1] += seconds
+            stat[2] += size
+            stat[3] += lines
+
+    def update(self, other):
+        # add the stats of another profile (e.g. of a worker process)
+        self.reports += other.reports
+        for key, (calls, seconds, size, lines) in other.stats.items():
+            stat = self.stats.setdefault(key, [0, 0.0, 0, 0])
+            stat[0] += calls
+            stat[1] += seconds
+            stat[2] += size
+            stat[3] += lines
+
+    def rows(self, kind=None):
+        # [(kind, name, calls, seconds, bytes, lines)], slowest first
+        rows = [
+            (key[0], key[1], *stat)
+            for key, stat in self.stats.items()
+            if kind is None or key[0] == kind
+        ]
+        return sorted(rows, key=lambda row: row[3], reverse=True)
+
+    def to_dict(self):
+        # {"reports": n, "section": {name: {...}}, "handler": {name: {...}}}
+        profile = {"reports": self.reports, SECTION: {}, HANDLER: {}}
+        for kind, name, calls, seconds, size, lines in self.rows():
+            profile[kind][name] = {
+                "calls": calls,
+                "seconds": seconds,
+                "bytes": size,
+                "lines": lines,
+            }
+        return profile
+
+    def format(self, top=None):
+        # a table of the sections and handlers, slowest first
+        lines = [f"parse profile of {self.reports} reports"]
+        for kind in (SECTION, HANDLER):
+            lines.append(
+                f"{kind:<9} {'name':<52} {'calls':>7} {'seconds':>9} "
+                f"{'MB':>9} {'lines':>10} {'MB/s':>8}"
+            )
+            for _, name, calls, seconds, size, count in self.rows(kind)[:top]:
+                rate = size / 1e6 / seconds if seconds > 0 else 0.0
+                lines.append(
+                    f"{'':<9} {name[:52]:<52} {calls:>7} {seconds:>9.4f} "
+                    f"{size / 1e6:>9.3f} {count:>10} {rate:>8.1f}"
+                )
+        return "\n".join(lines)
+
+
+class SectionCounter:
+    # counts the lines read by parse_loop_report_lines into the current raw
+    # section, and adds the wall time, bytes and lines of each section to a
+    # profile when the next one starts
+    def __init__(self, profile):
+        self.profile = profile
+        self.section = PREAMBLE
+        self.start_time = time.perf_counter()
+        self.size = 0
+        self.lines = 0
+        self._last_size = 0
+
+    def count(self, lines):
+        for line in lines:
+            self._last_size = text_size(line)
+            self.size += self._last_size
+            self.lines += 1
+            yield line
+
+    def start(self, section):
+        # the header line that was just read starts <section>
+        now = time.perf_counter()
+        if self.lines > 1 or self.section != PREAMBLE:
+            self.profile.add(
+                SECTION,
+                self.section,
+                now - self.start_time,
+                self.size - self._last_size,
+                self.lines - 1,
+            )
+        self.section = section
+        self.start_time = now
+        self.size = self._last_size
+        self.lines = 1
+
+    def finish(self):
+        # (at the end of a report)
+        self.profile.reports += 1
+        self.profile.add(
+            SECTION,
+            self.section,
+            time.perf_counter() - self.start_time,
+            self.size,
+            self.lines,
+        )
@@ -0,0 +1,240 @@
+"""
+description: Split the batch parsing of a directory of loop reports into N shards, which can be parsed on different
+machines. A report belongs to shard int(sha256(file name)) % N, so every machine selects the same files. Each
+shard writes its rows to part files of a batch format (see loop_report_writer), and records the reports in each
+part, with their sizes and modification times, in a manifest, so an interrupted shard resumes where it stopped.
+The parts of the shards are then merged into one batch file, without parsing the reports again.
+
+    <output_path>/shard-<i>-of-<N>/manifest.jsonl
+    <output_path>/shard-<i>-of-<N>/part-<id>.<csv, jsonl or parquet>
+
+dependencies:
+* pyarrow (for Parquet)
+license: BSD-2-Clause
+"""
+from loop_report_writer import report_writer, read_prepared, FORMATS
+import hashlib
+import json
+import os
+
+MANIFEST_FILE_NAME = "manifest.jsonl"
+# the number of reports in a part file (at most this many reports are parsed
+# again when an interrupted shard resumes)
+DEFAULT_PART_SIZE = 100
+_TEMP_SUFFIX = ".tmp"
+
+
+def shard_of(file_name, shard_count):
+    # the shard (0 to shard_count - 1) of a report file name
+    # (a hash of the name, as python's hash() differs between processes)
+    digest = hashlib.sha256(file_name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def parse_shard(text):
+    # "<i>/<N>" as (i, N), for shard i (from 0) of N shards
+    try:
+        shard, shard_count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"a shard is <i>/<N>, e.g. 0/4, not {text!r}") from None
+    if not 0 <= shard < shard_count:
+        raise ValueError(f"shard {shard} is not from 0 to {shard_count - 1}")
+    return shard, shard_count
+
+
+def shard_path(output_path, shard, shard_count):
+    # the directory of the parts and manifest of a shard
+    return os.path.join(output_path, f"shard-{shard}-of-{shard_count}")
+
+
+def shard_paths(output_path):
+    # the shard directories in <output_path>
+    if not os.path.isdir(output_path):
+        return []
+    return sorted(
+        os.path.join(output_path, name)
+        for name in os.listdir(output_path)
+        if name.startswith("shard-")
+        and os.path.isfile(os.path.join(output_path, name, MANIFEST_FILE_NAME))
+    )
+
+
+def file_entry(file_path, file_name):
+    # the manifest entry of a report file, before it is parsed
+    stat = os.stat(os.path.join(file_path, file_name))
+    return {
+        "file_name": file_name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+class ShardManifest:
+    # the reports processed by a shard, one json line per report:
+    #   {"file_name": ..., "size": ..., "mtime_ns": ..., "part": ..., "error": ...}
+    # with the part file of its row, or the error it failed with
+    # (lines are only appended, and only once the part file of their rows is
+    # complete)
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILE_NAME)
+        self.entries = {}
+        # the file names of the rows of each part, in order
+        self._part_rows = {}
+        if os.path.isfile(self.path):
+            with open(self.path) as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # (the last line of an interrupted append)
+                        continue
+                    self._add(entry)
+
+    def is_done(self, entry):
+        # whether the report of <entry> (from file_entry) was processed, and has
+        # not changed since
+        done = self.entries.get(entry["file_name"])
+        return (
+            done is not None
+            and done["size"] == entry["size"]
+            and done["mtime_ns"] == entry["mtime_ns"]
+        )
+
+    def _add(self, entry):
+        self.entries[entry["file_name"]] = entry
+        if entry.get("part") is not None:
+            self._part_rows.setdefault(entry["part"], []).append(entry["file_name"])
+
+    @property
+    def parts(self):
+        # the part files with current rows, in the order they were written
+        return [part for part in self._part_rows if any(self.current_rows(part))]
+
+    def current_rows(self, part):
+        # whether each row of <part> is current (a report that changed after
+        # it was written is in a later part as well)
+        return [
+            self.entries[file_name].get("part") == part
+            for file_name in self._part_rows.get(part, [])
+        ]
+
+    def record(self, entries):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, "a") as file:
+            for entry in entries:
+                file.write(json.dumps(entry) + "\n")
+                self._add(entry)
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class ShardWriter:
+    # writes the rows of a shard (of loop_report_writer.prepare_report) to part
+    # files of <part_size> reports, and records them in the manifest as each
+    # part is completed
+    #
+    #    with ShardWriter(directory, "csv") as writer:
+    #        writer.write_prepared(row, file_entry(file_path, file_name))
+    def __init__(
+        self, directory, output_format, manifest=None, part_size=DEFAULT_PART_SIZE
+    ):
+        if output_format not in FORMATS:
+            raise ValueError(f"unknown output format: {output_format}")
+        self.directory = directory
+        self.output_format = output_format
+        self.manifest = manifest or ShardManifest(directory)
+        self.part_size = part_size
+        self.count = 0
+        self._writer = None
+        self._part = None
+        self._entries = []
+        os.makedirs(directory, exist_ok=True)
+        _remove_temp_files(directory)
+
+    def write_prepared(self, row, entry):
+        if self._writer is None:
+            self._part = f"part-{os.urandom(8).hex()}.{self.output_format}"
+            self._writer = report_writer(self._temp_path(), self.output_format)
+        self._writer.write_prepared(row)
+        self._entries.append(dict(entry, part=self._part))
+        self.count += 1
+        if self._writer.count >= self.part_size:
+            self.flush()
+
+    def write_error(self, entry, error):
+        # record a report that failed to parse (so it is not parsed again)
+        self._entries.append(dict(entry, error=error))
+
+    def flush(self):
+        # complete the current part, and record its reports
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._temp_path(), os.path.join(self.directory, self._part))
+            self._writer = None
+        if self._entries:
+            self.manifest.record(self._entries)
+            self._entries = []
+
+    def _temp_path(self):
+        return os.path.join(self.directory, self._part + _TEMP_SUFFIX)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # (on an error the reports of the current part are kept, as they were
+        # parsed, and resume with the next part)
+        self.close()
+
+
+def _remove_temp_files(directory):
+    # the incomplete part files of an interrupted run
+    for name in os.listdir(directory):
+        if _TEMP_SUFFIX in name:
+            os.remove(os.path.join(directory, name))
+
+
+def part_format(part):
+    # the batch format of a part file, from its extension
+    output_format = os.path.splitext(part)[1][1:]
+    if output_format not in FORMATS:
+        raise ValueError(f"not a part file: {part}")
+    return output_format
+
+
+def shards_format(directories):
+    # the batch format of the parts of the shards in <directories>
+    formats = {
+        part_format(part)
+        for directory in directories
+        for part in ShardManifest(directory).parts
+    }
+    if len(formats) > 1:
+        raise ValueError(
+            f"the shards have parts of more than one format: {sorted(formats)}"
+        )
+    return formats.pop() if formats else FORMATS[0]
+
+
+def merge_shards(directories, output_path_name, output_format=None):
+    # combine the parts of the shards in <directories> into one batch file
+    # output_format: the format of the parts (see shards_format if None)
+    # returns the number of reports in the batch file
+    if output_format is None:
+        output_format = shards_format(directories)
+
+    with report_writer(output_path_name, output_format) as writer:
+        for directory in directories:
+            manifest = ShardManifest(directory)
+            for part in manifest.parts:
+                if part_format(part) != output_format:
+                    raise ValueError(f"{part} is not a {output_format} part")
+                rows = read_prepared(os.path.join(directory, part), output_format)
+                for row, current in zip(rows, manifest.current_rows(part)):
+                    if current:
+                        writer.write_prepared(row)
+    return writer.count
@@ -0,0 +1,381 @@
+"""
+description: Streaming writers for batches of parsed loop reports, with one row per report, as CSV, JSON Lines
+or Parquet. Each report is appended as it is parsed, so memory does not grow with the number of reports. The
+columns are the union of the keys of the reports: a column that first appears in a later report is added to the
+schema, and the rows written before it are filled in once, when the writer is closed.
+
+dependencies:
+* pyarrow (for Parquet)
+license: BSD-2-Clause
+"""
+import abc
+import os
+import csv
+import json
+import tempfile
+
+FORMATS = ["csv", "jsonl", "parquet"]
+DEFAULT_ROW_GROUP_SIZE = 256
+_MAX_FIELD_SIZE = 2 ** 31 - 1
+
+
+class _ReportWriter(abc.ABC):
+    # writer.write(loop_dict) appends a report; close() finishes the file
+    # (writer.write_prepared(row) appends a row of prepare(loop_dict), which
+    # can be made in another process, as serializing a report is much of the
+    # cost of writing it)
+    def __init__(self, output_path_name, columns=None):
+        self.output_path_name = output_path_name
+        self.columns = list(columns or [])
+        self._known = set(self.columns)
+        self.count = 0
+
+    def _add_columns(self, loop_dict):
+        # add the new columns of a report to the end of the schema
+        new_columns = [key for key in loop_dict if key not in self._known]
+        self.columns.extend(new_columns)
+        self._known.update(new_columns)
+
+    @staticmethod
+    def prepare(loop_dict):
+        return loop_dict
+
+    def write(self, loop_dict):
+        self.write_prepared(self.prepare(loop_dict))
+
+    @staticmethod
+    @abc.abstractmethod
+    def read_prepared(output_path_name):
+        # the rows of a file written by this writer, as they were given to
+        # write_prepared (so files can be combined without parsing the reports
+        # again)
+        pass
+
+    @abc.abstractmethod
+    def write_prepared(self, row):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class JsonLinesReportWriter(_ReportWriter):
+    # one json object per line (which needs no schema)
+    def __init__(self, output_path_name, columns=None):
+        super().__init__(output_path_name, columns)
+        self._file = open(output_path_name, "w")
+
+    @staticmethod
+    def prepare(loop_dict):
+        # the json of each value
+        return {
+            key: json.dumps(value, sort_keys=True, default=str)
+            for key, value in loop_dict.items()
+        }
+
+    def write_prepared(self, row):
+        # (as json.dumps(loop_dict, sort_keys=True) would)
+        self._file.write(
+            "{"
+            + ", ".join(f"{json.dumps(key)}: {row[key]}" for key in sorted(row))
+            + "}\n"
+        )
+        self.count += 1
+
+    @staticmethod
+    def read_prepared(output_path_name):
+        with open(output_path_name) as file:
+            for line in file:
+                yield {
+                    key: json.dumps(value, sort_keys=True)
+                    for key, value in json.loads(line).items()
+                }
+
+    def close(self):
+        self._file.close()
+
+
+class CsvReportWriter(_ReportWriter):
+    # the csv of the earlier batch parsing: an "index" column, then a column
+    # per key of the reports (with lists and dicts as their python repr)
+    def __init__(self, output_path_name, columns=None):
+        super().__init__(output_path_name, columns)
+        # (the header is written with the first report, so that the file is
+        # only rewritten if a later report has more columns)
+        self._header = None
+        self._file = open(output_path_name, "w", newline="")
+
+    @staticmethod
+    def prepare(loop_dict):
+        # the csv field of each value (quoted as csv.writer would, which is
+        # slow for the long fields of the time series)
+        return {
+            key: "" if value is None else _csv_field(str(value))
+            for key, value in loop_dict.items()
+        }
+
+    def write_prepared(self, row):
+        self._add_columns(row)
+        if self._header is None:
+            self._write_header(self._file)
+        self._file.write(
+            ",".join([str(self.count)] + [row.get(key, "") for key in self.columns])
+            + "\r\n"
+        )
+        self.count += 1
+
+    def _write_header(self, file):
+        self._header = list(self.columns)
+        file.write(",".join(_csv_field(name) for name in ["index"] + self._header))
+        file.write("\r\n")
+
+    @staticmethod
+    def read_prepared(output_path_name):
+        # (without the "index" column, which is numbered again when written;
+        # an empty field is an empty row value, as is a None)
+        field_size_limit = csv.field_size_limit(_MAX_FIELD_SIZE)
+        try:
+            with open(output_path_name, newline="") as file:
+                reader = csv.reader(file)
+                header = next(reader, ["index"])[1:]
+                for fields in reader:
+                    yield {
+                        key: _csv_field(field)
+                        for key, field in zip(header, fields[1:])
+                    }
+        finally:
+            csv.field_size_limit(field_size_limit)
+
+    def close(self):
+        if self._header is None:
+            self._write_header(self._file)
+        self._file.close()
+        if self.columns != self._header:
+            self._rewrite()
+
+    def _rewrite(self):
+        # write the final header, and pad the rows that were written before
+        # the last columns were added (new columns are always at the end)
+        width = len(self.columns) + 1
+        directory = os.path.dirname(os.path.abspath(self.output_path_name))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".csv.tmp")
+        # (the time series of a report are single fields of megabytes)
+        field_size_limit = csv.field_size_limit(_MAX_FIELD_SIZE)
+        try:
+            with open(self.output_path_name, newline="") as old, os.fdopen(
+                fd, "w", newline=""
+            ) as new:
+                reader = csv.reader(old)
+                next(reader)
+                self._write_header(new)
+                for row in reader:
+                    new.write(",".join(_csv_field(field) for field in row))
+                    new.write("," * (width - len(row)) + "\r\n")
+            os.replace(temp_path, self.output_path_name)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        finally:
+            csv.field_size_limit(field_size_limit)
+
+
+class ParquetReportWriter(_ReportWriter):
+    # a Parquet file with a row group per <row_group_size> reports; numbers,
+    # booleans and strings keep their types, and lists and dicts are json
+    def __init__(
+        self,
+        output_path_name,
+        columns=None,
+        row_group_size=DEFAULT_ROW_GROUP_SIZE,
+    ):
+        super().__init__(output_path_name, columns)
+        self.row_group_size = row_group_size
+        self._types = {}
+        self._rows = []
+        self._writer = None
+        self._schema = None
+        # the files written so far, one per schema (merged on close)
+        self._parts = []
+
+    @staticmethod
+    def prepare(loop_dict):
+        return {key: _parquet_value(value) for key, value in loop_dict.items()}
+
+    def write_prepared(self, row):
+        self._add_columns(row)
+        for key, value in row.items():
+            self._types[key] = _column_type(self._types.get(key), value)
+        self._rows.append(row)
+        self.count += 1
+        if len(self._rows) >= self.row_group_size:
+            self._write_row_group()
+
+    @staticmethod
+    def read_prepared(output_path_name):
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(output_path_name)
+        for i in range(parquet_file.num_row_groups):
+            yield from parquet_file.read_row_group(i).to_pylist()
+
+    def _arrow_schema(self):
+        import pyarrow as pa
+
+        return pa.schema(
+            [(column, _arrow_type(self._types.get(column))) for column in self.columns]
+        )
+
+    def _write_row_group(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self._rows:
+            return
+        schema = self._arrow_schema()
+        if self._writer is not None and not schema.equals(self._schema):
+            # the schema changed: finish this part, and start another
+            self._writer.close()
+            self._writer = None
+        if self._writer is None:
+            part_path = f"{self.output_path_name}.part{len(self._parts)}"
+            self._writer = pq.ParquetWriter(part_path, schema)
+            self._schema = schema
+            self._parts.append(part_path)
+
+        columns = {
+            column: [
+                _cast(row.get(column), self._types.get(column)) for row in self._rows
+            ]
+            for column in self.columns
+        }
+        self._writer.write_table(pa.table(columns, schema=schema))
+        self._rows = []
+
+    def close(self):
+        import pyarrow.parquet as pq
+
+        self._write_row_group()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        if not self._parts:
+            pq.ParquetWriter(self.output_path_name, self._arrow_schema()).close()
+            return
+        if len(self._parts) == 1:
+            os.replace(self._parts[0], self.output_path_name)
+            self._parts = []
+            return
+
+        # copy the row groups of the parts into one file with the final
+        # schema, a row group at a time
+        schema = self._arrow_schema()
+        try:
+            with pq.ParquetWriter(self.output_path_name, schema) as writer:
+                for part_path in self._parts:
+                    part = pq.ParquetFile(part_path)
+                    for i in range(part.num_row_groups):
+                        writer.write_table(_conform(part.read_row_group(i), schema))
+        finally:
+            for part_path in self._parts:
+                os.remove(part_path)
+            self._parts = []
+
+
+WRITERS = {
+    "csv": CsvReportWriter,
+    "jsonl": JsonLinesReportWriter,
+    "parquet": ParquetReportWriter,
+}
+
+
+def report_writer(output_path_name, output_format, columns=None):
+    # a writer of reports to <output_path_name>, in one of FORMATS
+    # columns: the columns, if they are known up front (more are added as
+    # they appear)
+    if output_format not in WRITERS:
+        raise ValueError(f"unknown output format: {output_format}")
+    return WRITERS[output_format](output_path_name, columns=columns)
+
+
+def prepare_report(loop_dict, output_format):
+    # the row of a report for write_prepared of a writer of <output_format>
+    return WRITERS[output_format].prepare(loop_dict)
+
+
+def read_prepared(output_path_name, output_format):
+    # a generator of the rows of a batch file of <output_format>, for
+    # write_prepared of a writer of the same format
+    if output_format not in WRITERS:
+        raise ValueError(f"unknown output format: {output_format}")
+    return WRITERS[output_format].read_prepared(output_path_name)
+
+
+def _csv_field(text):
+    if "," in text or '"' in text or "\n" in text or "\r" in text:
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
+def _parquet_value(value):
+    # lists and dicts as json
+    if isinstance(value, (list, tuple, dict)):
+        return json.dumps(value, sort_keys=True, default=str)
+    return value
+
+
+def _column_type(column_type, value):
+    # the type of a column, widened to fit <value>: bool, int, float or (for
+    # anything else, or a mix of types) str
+    if value is None:
+        return column_type
+    if isinstance(value, (bool, int, float)):
+        value_type = type(value).__name__
+    else:
+        value_type = "str"
+    if column_type is None or column_type == value_type:
+        return value_type
+    if {column_type, value_type} == {"int", "float"}:
+        return "float"
+    return "str"
+
+
+def _cast(value, column_type):
+    if value is None:
+        return None
+    if column_type == "str":
+        return value if isinstance(value, str) else str(value)
+    if column_type == "float":
+        return float(value)
+    return value
+
+
+def _conform(table, schema):
+    # <table> with the columns and types of <schema>
+    import pyarrow as pa
+
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            columns.append(table[field.name].cast(field.type))
+        else:
+            columns.append(pa.nulls(len(table), field.type))
+    return pa.table(columns, schema=schema)
+
+
+def _arrow_type(column_type):
+    # the pyarrow type of a column type (str for a column of only None)
+    import pyarrow as pa
+
+    if column_type == "bool":
+        return pa.bool_()
+    if column_type == "int":
+        return pa.int64()
+    if column_type == "float":
+        return pa.float64()
+    return pa.string()
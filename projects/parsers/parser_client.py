@@ -7,9 +7,24 @@ import argparse
 import logging, sys
 #from config.logconfig import log_config
 from loop_report import LoopReport
-import pandas as pd
+from loop_report_dataset import export_dataset
+from loop_report_archive import is_archive
+from loop_report_profile import ParseProfile
+from loop_report_writer import report_writer, prepare_report, FORMATS
+from loop_report_shards import (
+    shard_of,
+    parse_shard,
+    shard_path,
+    shard_paths,
+    file_entry,
+    merge_shards,
+    shards_format,
+    ShardManifest,
+    ShardWriter,
+)
 import json
 import os
+import time
 import datetime as dt
 from multiprocessing import Pool
 
@@ -17,7 +32,7 @@ from multiprocessing import Pool
 # %% CODE DESCRIPTION
 codeDescription = (
     "Parses Loop issue report(s) into a dictionary," +
-    "and saves the data to user specified format (json or csv)"
+    "and saves the data to user specified format (json, csv, jsonl or parquet)"
 )
 
 
@@ -36,7 +51,7 @@ def setup_logging():
     logger.debug('debug_level: %s', args.logLevel)
 
 
-def parse_by_file(file_path, file_name, output_path):
+def parse_by_file(file_path, file_name, output_path, pretty=True, profile=None):
 
     if not os.path.isfile(os.path.join(file_path, file_name)):
         raise RuntimeError("The file name is invalid.")
@@ -45,83 +60,357 @@ def parse_by_file(file_path, file_name, output_path):
     if not os.path.exists(output_path):
         os.makedirs(output_path)
 
-    # % parse file
-    lr = LoopReport()
-    loop_dict = lr.parse_by_file(path=file_path, file_name=file_name)
+    loop_dict = parse_and_save(file_path, file_name, output_path, pretty, profile)
 
-    # save a pretty json
-    output_path_name = os.path.join(
-        output_path, file_name[:-3] + "-parsed.json"
-    )
+    print(file_name, "file parsed")
 
-    with open(output_path_name, "w") as fp:
-        json.dump(loop_dict, fp, sort_keys=True, indent=4)
+    return loop_dict
 
-    print(file_name, "file parsed")
+
+def parse_and_save(file_path, file_name, output_path, pretty=True, profile=None):
+    # % parse file
+    # profile: a loop_report_profile.ParseProfile to add the parse times to
+    lr = LoopReport(profile=profile)
+    loop_dict = lr.parse_by_file(path=file_path, file_name=file_name)
+
+    save_report(loop_dict, output_path, pretty)
 
     return loop_dict
 
 
-def parse_directory(file_path, output_path):
-    all_loop_df = pd.DataFrame()
-    count = 1
-    for file in os.listdir(args.file_path):
-        try:
-            if ".md" in file:
-                loop_dict = parse_by_file(file_path, file, output_path)
+def save_report(loop_dict, output_path, pretty=True):
+    # save a pretty (or compact) json, named after the report (and the folder
+    # of the report in an archive, e.g. reports_LoopReport-parsed.json)
+    file_name = loop_dict["file_name"].replace("/", "_")
+    output_path_name = os.path.join(
+        output_path, file_name[:-3] + "-parsed.json"
+    )
 
-                loop_df = pd.DataFrame(columns=loop_dict.keys(), index=[0])
-                loop_df = loop_df.astype("object")
-                for k in loop_dict.keys():
-                    loop_df[k][0] = loop_dict[k]
+    with open(output_path_name, "w") as fp:
+        if pretty:
+            json.dump(loop_dict, fp, sort_keys=True, indent=4)
+        else:
+            json.dump(loop_dict, fp, separators=(",", ":"))
+
+
+def _parse_task(task):
+    # parse_and_save a report in a worker process, and prepare its row of the
+    # batch file (see loop_report_writer.prepare_report)
+    # returns (file name, the row or None, error or None, the ParseProfile of
+    # the report if it is profiled)
+    file_path, file_name, output_path, pretty, output_format, profiled = task
+    profile = ParseProfile() if profiled else None
+    try:
+        loop_dict = parse_and_save(
+            file_path, file_name, output_path, pretty, profile
+        )
+        row = prepare_report(loop_dict, output_format)
+    except Exception as e:
+        return file_name, None, repr(e), profile
+    return file_name, row, None, profile
+
+
+def _parse_tasks(tasks, workers):
+    # the results of _parse_task, as they finish
+    if workers <= 1:
+        yield from map(_parse_task, tasks)
+        return
+
+    with Pool(processes=workers) as pool:
+        yield from pool.imap_unordered(_parse_task, tasks)
+
+
+class Progress:
+    # a progress line on stderr, e.g. "parsed 120/500 files (14.2 files/s)",
+    # redrawn at most every <interval> seconds
+    def __init__(self, total=None, interval=0.5):
+        self.total = total
+        self.interval = interval
+        self.count = 0
+        self.start = time.perf_counter()
+        self.last_drawn = 0
+
+    def update(self, count=1):
+        self.count += count
+        now = time.perf_counter()
+        if now - self.last_drawn >= self.interval:
+            self.last_drawn = now
+            self._draw(now)
+
+    def finish(self):
+        self._draw(time.perf_counter())
+        sys.stderr.write("\n")
+
+    def _draw(self, now):
+        rate = self.count / max(now - self.start, 1e-9)
+        total = "" if self.total is None else f"/{self.total}"
+        sys.stderr.write(f"\rparsed {self.count}{total} files ({rate:.1f} files/s)")
+        sys.stderr.flush()
+
+
+def workers_count(workers):
+    # the number of worker processes of --workers (0 for every core)
+    if workers is None:
+        return 1
+    if workers <= 0:
+        return os.cpu_count() or 1
+    return workers
+
+
+def write_batch(loop_dicts, output_path, output_format="csv", prepared=False):
+    # stream the parsed reports into one batch file, with a row per report
+    # (see loop_report_writer), e.g. 2019-01-28-batch-parsing.csv
+    # prepared: the reports are rows of loop_report_writer.prepare_report
+    process_date = dt.datetime.now().strftime("%Y-%m-%d")
+    output_path_name = os.path.join(
+        output_path, process_date + "-batch-parsing." + output_format
+    )
+    with report_writer(output_path_name, output_format) as writer:
+        write = writer.write_prepared if prepared else writer.write
+        for loop_dict in loop_dicts:
+            write(loop_dict)
+
+    print("total count: " + str(writer.count))
+    return output_path_name
+
+
+def parse_archive(
+    archive_path,
+    output_path,
+    output_format="csv",
+    workers=1,
+    pretty=True,
+    profile=None,
+):
+    # parse the reports in a zip or tar archive, without extracting it
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
 
-                all_loop_df = pd.concat(
-                    [all_loop_df, loop_df],
-                    sort=False,
-                    ignore_index=True)
+    def parse_reports():
+        progress = Progress()
+        for loop_dict in LoopReport(profile=profile).iter_by_archive(
+            archive_path, workers=workers
+        ):
+            save_report(loop_dict, output_path, pretty)
+            progress.update()
+            yield loop_dict
+        progress.finish()
+
+    return write_batch(parse_reports(), output_path, output_format)
+
+
+def parse_directory_to_dataset(file_path, output_path, workers=1):
+    # a Parquet dataset (see loop_report_dataset), partitioned by loop_version
+    # and pump_manager_type, instead of one batch file
+    process_date = dt.datetime.now().strftime("%Y-%m-%d")
+    dataset_path = os.path.join(output_path, process_date + "-batch-parsing")
+    count = export_dataset(file_path, dataset_path, workers=workers)
+    print("total count: " + str(count))
+    return dataset_path
+
+
+def parse_directory(
+    file_path,
+    output_path,
+    output_format="csv",
+    workers=1,
+    pretty=True,
+    profile=None,
+):
+    # the reports are parsed, and their json and batch rows serialized, by
+    # <workers> processes, and this process writes the rows to the batch file
+    # profile: a loop_report_profile.ParseProfile to add the parse times of
+    # all of the reports to
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
 
-                process_date = dt.datetime.now().strftime("%Y-%m-%d")
-                output_path_name = os.path.join(
-                    output_path, process_date + "-batch-parsing.csv"
-                )
-                count = count + 1
+    tasks = [
+        (file_path, file, output_path, pretty, output_format, profile is not None)
+        for file in os.listdir(file_path)
+        if ".md" in file
+    ]
+
+    def parse_reports():
+        progress = Progress(len(tasks))
+        for file, row, error, report_profile in _parse_tasks(tasks, workers):
+            progress.update()
+            if report_profile is not None:
+                profile.update(report_profile)
+            if error is not None:
+                print("exception in file - " + file)
+                continue
+            yield row
+        progress.finish()
+
+    return write_batch(parse_reports(), output_path, output_format, prepared=True)
+
+
+def parse_directory_shard(
+    file_path,
+    output_path,
+    shard,
+    shard_count,
+    output_format="csv",
+    workers=1,
+    pretty=True,
+    profile=None,
+):
+    # parse the reports of shard <shard> of <shard_count> (see
+    # loop_report_shards) into the part files of the shard, skipping the
+    # reports that an earlier run of the shard processed
+    if not os.path.exists(output_path):
+        os.makedirs(output_path)
 
-                all_loop_df.to_csv(output_path_name, index_label="index")
+    directory = shard_path(output_path, shard, shard_count)
+    manifest = ShardManifest(directory)
+    entries = {}
+    skipped = 0
+    for file in sorted(os.listdir(file_path)):
+        if ".md" not in file or shard_of(file, shard_count) != shard:
+            continue
+        entry = file_entry(file_path, file)
+        if manifest.is_done(entry):
+            skipped += 1
+        else:
+            entries[file] = entry
+    if skipped:
+        print(f"skipping {skipped} files processed by an earlier run")
+
+    tasks = [
+        (file_path, file, output_path, pretty, output_format, profile is not None)
+        for file in entries
+    ]
+    progress = Progress(len(tasks))
+    with ShardWriter(directory, output_format, manifest) as writer:
+        for file, row, error, report_profile in _parse_tasks(tasks, workers):
+            progress.update()
+            if report_profile is not None:
+                profile.update(report_profile)
+            if error is not None:
+                print("exception in file - " + file)
+                writer.write_error(entries[file], error)
+                continue
+            writer.write_prepared(row, entries[file])
+    progress.finish()
+
+    print("total count: " + str(writer.count))
+    return directory
+
+
+def merge_shard_outputs(output_path, output_format=None):
+    # combine the parts of every shard in <output_path> into one batch file,
+    # without parsing the reports again
+    directories = shard_paths(output_path)
+    if not directories:
+        raise RuntimeError("There are no shards in the output path.")
+    names = {os.path.basename(directory) for directory in directories}
+    shard_count = int(min(names).rsplit("-", 1)[1])
+    expected = {
+        os.path.basename(shard_path(output_path, shard, shard_count))
+        for shard in range(shard_count)
+    }
+    if names != expected:
+        raise RuntimeError(
+            f"The shards are not the {shard_count} shards of one run: "
+            + ", ".join(sorted(names ^ expected))
+        )
 
-        except:
-            print("exception in file - " + file)
+    if output_format is None:
+        output_format = shards_format(directories)
+    process_date = dt.datetime.now().strftime("%Y-%m-%d")
+    output_path_name = os.path.join(
+        output_path, process_date + "-batch-parsing." + output_format
+    )
+    count = merge_shards(directories, output_path_name, output_format)
     print("total count: " + str(count))
-    return all_loop_df
+    return output_path_name
 
 
 # %% COMMAND LINE ARGUMENTS
 def main(args):
     setup_logging()
 
-    if not os.path.isdir(args.file_path):
+    workers = workers_count(args.workers)
+    pretty = args.pretty
+
+    if args.command == "merge":  # combine the outputs of the shards
+        return merge_shard_outputs(args.output_path, args.output_format)
+
+    output_format = args.output_format or "csv"
+    profile = ParseProfile() if args.profile else None
+    if is_archive(args.file_path):  # process all md files in the archive
+        if output_format == "dataset" or args.shard:
+            raise RuntimeError(
+                "A dataset or a shard can only be made from a directory."
+            )
+        output = parse_archive(
+            args.file_path, args.output_path, output_format, workers, pretty, profile
+        )
+
+    elif not os.path.isdir(args.file_path):
         raise RuntimeError("The file path is invalid.")
 
-    if args.batch_process:  # process all md files in path
-        output = parse_directory(args.file_path, args.output_path)
+    elif args.shard:  # process the md files of one shard of the path
+        if output_format == "dataset":
+            raise RuntimeError("A shard is a csv, jsonl or parquet batch file.")
+        shard, shard_count = parse_shard(args.shard)
+        output = parse_directory_shard(
+            args.file_path,
+            args.output_path,
+            shard,
+            shard_count,
+            output_format,
+            workers,
+            pretty,
+            profile,
+        )
+
+    elif args.batch_process and output_format == "dataset":
+        output = parse_directory_to_dataset(
+            args.file_path, args.output_path, workers
+        )
+
+    elif args.batch_process:  # process all md files in path
+        output = parse_directory(
+            args.file_path,
+            args.output_path,
+            output_format,
+            workers,
+            pretty,
+            profile,
+        )
 
     else:  # process one file
         output = parse_by_file(
             args.file_path,
             args.file_name,
-            args.output_path
+            args.output_path,
+            pretty,
+            profile,
         )
 
+    if profile is not None:
+        sys.stderr.write(profile.format() + "\n")
+
     return output
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description=codeDescription)
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["parse", "merge"],
+        default="parse",
+        help="parse the reports, or merge the outputs of the shards in the output "
+        "path (see --shard) into one batch file",
+    )
     parser.add_argument(
         "-p",
         "--path",
         dest="file_path",
         default=os.path.join("..", "tests", "parsers", "files"),
-        help="directory of the issue report file(s)"
+        help="directory (or zip / tar archive) of the issue report file(s)"
     )
     parser.add_argument(
         "-n",
@@ -144,6 +433,46 @@ if __name__ == "__main__":
         default=True,
         help="True if you want to process all issue reports in the dir",
     )
+    parser.add_argument(
+        "-f",
+        "--format",
+        dest="output_format",
+        choices=FORMATS + ["dataset"],
+        default=None,
+        help="format of the batch output: one csv (the default), jsonl or parquet "
+        "file with a row per report, or a partitioned parquet dataset (merge uses "
+        "the format of the shards)",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        dest="workers",
+        type=int,
+        default=1,
+        help="number of processes that parse reports in batch mode (0 for one per core)",
+    )
+    parser.add_argument(
+        "-s",
+        "--shard",
+        dest="shard",
+        default=None,
+        help="i/N: parse only shard i (from 0) of N of the reports in the path, "
+        "e.g. on one of N machines, into <output_path>/shard-i-of-N; a shard that "
+        "is run again resumes, and merge combines the shards",
+    )
+    parser.add_argument(
+        "--no-pretty",
+        dest="pretty",
+        action="store_false",
+        help="save compact json instead of pretty json",
+    )
+    parser.add_argument(
+        "--profile",
+        dest="profile",
+        action="store_true",
+        help="print the time, bytes and lines of each section and section handler, "
+        "summed over the reports (not for the dataset format)",
+    )
     parser.add_argument(
         "-v",
         "--verbose",
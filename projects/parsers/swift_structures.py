@@ -0,0 +1,174 @@
+"""
+description: A single-pass parser for the Swift debug printed structures in loop reports, such as
+Optional(...), Type(key: value, ...), (key: value, ...), [value, ...] and ["key": value, ...]. A field is parsed
+once into native Python values (dicts, lists, strings, numbers, booleans and None) instead of being rewritten
+with chains of str.replace into json.
+
+dependencies:
+* <>
+license: BSD-2-Clause
+"""
+import re
+import functools
+
+# the tokens of the debug printed structures, matched in one pass over a field
+_BARE_CHARACTER = r"[^\s,()\[\]:\"]"
+_NUMBER = r"-?\d[\d.eE+-]*"
+_TOKEN = re.compile(
+    rf"""\s*(?:
+    (?P<string>"[^"\\]*(?:\\.[^"\\]*)*"?)      # "a \"quoted\" string"
+    |(?P<numbers>\[\s*{_NUMBER}(?:\s*,\s*{_NUMBER})*\s*\])  # [85.7, 86.4]
+    |(?P<name>[A-Za-z_][\w.]*)\(                 # Type( or Optional(
+    |(?P<label>[A-Za-z_]\w*):(?=\s)              # label: (of a labeled argument)
+    |(?P<punctuation>[\[\](),:])
+    |(?P<bare>{_BARE_CHARACTER}+(?:(?::(?!\s)|\s+(?={_BARE_CHARACTER})){_BARE_CHARACTER}*)*)
+    |(?P<error>\S)
+    )""",
+    re.VERBOSE,
+)
+_INTEGER = re.compile(r"[-+]?\d+\Z")
+_FLOAT = re.compile(r"[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?\Z")
+_ESCAPE = re.compile(r"\\(.)")
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "0": "\0"}
+
+
+class SwiftObject(dict):
+    # the labeled values of a struct, enum case or tuple, e.g.
+    # GlucoseThreshold(value: 85.0, unit: mg/dL) -> {"value": 85.0, "unit": "mg/dL"}
+    # type_name: e.g. "Loop.GlucoseThreshold" (None for a tuple)
+    # args: the unlabeled values, e.g. the model of humalogNovologAdult(...)
+    def __init__(self, type_name=None, values=None, args=None):
+        super().__init__(values or {})
+        self.type_name = type_name
+        self.args = args or []
+
+    def __repr__(self):
+        return f"SwiftObject({self.type_name!r}, {dict(self)!r}, {self.args!r})"
+
+
+def _tokenize(text):
+    # [(kind, text)] of a field
+    tokens = [(m.lastgroup, m.group(m.lastgroup)) for m in _TOKEN.finditer(text)]
+    for kind, token in tokens:
+        if kind == "error":
+            raise ValueError(f"unexpected {token!r} in {text!r}")
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def next(self):
+        # the next token (("", "") at the end, as some fields are cut short)
+        if self.pos < len(self.tokens):
+            token = self.tokens[self.pos]
+        else:
+            token = ("", "")
+        self.pos += 1
+        return token
+
+    def peek(self):
+        return self.tokens[self.pos][1] if self.pos < len(self.tokens) else ""
+
+    def value(self):
+        kind, token = self.next()
+        if kind == "bare":
+            return to_scalar(token)
+        if kind == "string":
+            value = token[1:-1] if token.endswith('"') and len(token) > 1 else token[1:]
+            if "\\" in value:
+                value = _ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), value)
+            return value
+        if kind == "numbers":
+            return [_to_number(number) for number in token[1:-1].split(",")]
+        if kind == "name":
+            swift_object = self.arguments(token)
+            if swift_object.type_name == "Optional" and len(swift_object.args) == 1:
+                return swift_object.args[0]
+            return swift_object
+        if token == "[":
+            return self.collection()
+        if token == "(":
+            return self.arguments(None)
+        raise ValueError(f"unexpected {token!r} in {self.text!r}")
+
+    def arguments(self, type_name):
+        # the arguments of Type(...) or a tuple, up to the closing parenthesis
+        values = {}
+        args = []
+        while self.peek() not in ("", ")"):
+            kind, token = self.tokens[self.pos]
+            if kind == "label":
+                self.pos += 1
+                values[token] = self.value()
+            else:
+                args.append(self.value())
+            self.separator(")")
+        self.pos += 1
+
+        return SwiftObject(type_name, values, args)
+
+    def collection(self):
+        # an array [a, b] or a dictionary ["k": v] (or [:]), up to the
+        # closing bracket
+        if self.peek() == ":":
+            self.pos += 2
+            return {}
+
+        items = []
+        dictionary = None
+        while self.peek() not in ("", "]"):
+            item = self.value()
+            if self.peek() == ":":
+                self.pos += 1
+                if dictionary is None:
+                    dictionary = {}
+                dictionary[item] = self.value()
+            else:
+                items.append(item)
+            self.separator("]")
+        self.pos += 1
+
+        return items if dictionary is None else dictionary
+
+    def separator(self, closer):
+        token = self.peek()
+        if token == ",":
+            self.pos += 1
+        elif token not in ("", closer):
+            raise ValueError(f"unexpected {token!r} in {self.text!r}")
+
+
+def _to_number(token):
+    if "." in token or "e" in token or "E" in token:
+        return float(token)
+    return int(token)
+
+
+def to_scalar(token):
+    # an unquoted token as a bool, None, int, float or (otherwise) str
+    token = token.strip()
+    if token == "true":
+        return True
+    if token == "false":
+        return False
+    if token == "nil":
+        return None
+    if _INTEGER.match(token):
+        return int(token)
+    if _FLOAT.match(token):
+        return float(token)
+    return token
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_swift(text):
+    # the native Python value of a Swift debug printed field, e.g.
+    # '["timeZone": -28800, "items": [["startTime": 0.0, "value": 0.8]]]'
+    # -> {"timeZone": -28800, "items": [{"startTime": 0.0, "value": 0.8}]}
+    # results are cached (the same fields repeat across sections and reports),
+    # so they must not be modified
+    return _Parser(text).value()
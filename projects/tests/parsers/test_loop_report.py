@@ -1,6 +1,7 @@
 # from projects.parsers.loop_report import LoopReport
 import projects.parsers.loop_report as loop_report
 import os
+import time
 import pytest
 
 
@@ -116,102 +117,102 @@ def test_parse_by_file():
 def get_status_extension_data_manager():
     return {
         "sensor": {
-            "isStateValid": " true",
-            " stateDescription": " ok ",
-            " trendType": " 4",
-            " isLocal": " true",
+            "isStateValid": True,
+            "stateDescription": "ok ",
+            "trendType": 4,
+            "isLocal": True,
         },
         "netBasal": {
-            "": ' "percentage"',
-            ' "start"': " 2019-01-28 15",
-            ' "rate"': " -0.8",
-            ' "end"': " 2019-01-28 15",
+            "percentage": -1.0,
+            "start": "2019-01-28 15:01:30 +0000",
+            "rate": -0.8,
+            "end": "2019-01-28 15:31:30 +0000",
         },
-        "version": "5",
+        "version": 5,
         "predictedGlucose": {
             "values": [
-                "85.732078872579",
-                "86.44096256310476",
-                "86.77019751074303",
-                "86.74103998552496",
-                "86.64342159003903",
-                "86.57898055151605",
-                "86.54829897295224",
-                "86.5520006409324",
-                "86.59083783299144",
-                "86.66555585381998",
-                "86.77683520191353",
-                "86.92521097785732",
-                "87.06166310407576",
-                "87.18657445807551",
-                "87.30036060017812",
-                "87.40355987211228",
-                "87.4967727773405",
-                "87.58041626246342",
-                "87.65476704819528",
-                "87.72029003700567",
-                "87.77754565123954",
-                "87.8273377716408",
-                "87.87044653212743",
-                "87.90751659629285",
-                "87.93889754994686",
-                "87.96500123976884",
-                "87.98647008053209",
-                "88.00392652213652",
-                "88.01795871129279",
-                "88.02912156874194",
-                "88.0379378183584",
-                "88.04489934830934",
-                "88.05046836922816",
-                "88.05508417906836",
-                "88.05917636320798",
-                "88.06314680728673",
-                "88.06727407099355",
-                "88.07155325261802",
-                "88.07596408572763",
-                "88.08048771649001",
-                "88.0851791482404",
-                "88.09021545216102",
-                "88.0955744117943",
-                "88.10122342167693",
-                "88.10713178627508",
-                "88.11312558507561",
-                "88.11889980331782",
-                "88.12484203567728",
-                "88.13124497984529",
-                "88.13808315983019",
-                "88.14502479923775",
-                "88.15104161042552",
-                "88.15539987378455",
-                "88.15777204139727",
-                "88.15835646191698",
-                "88.15761275402889",
-                "88.15598599919659",
-                "88.15389249855268",
-                "88.15170285865179",
-                "88.149703828917",
-                "88.14810111911734",
-                "88.14688621614334",
-                "88.14603489653823",
-                "88.145523923539",
-                "88.14533102945123",
-                "88.14543489642449",
-                "88.14574261113549",
-                "88.14596950526587",
-                "88.14598217974014",
-                "88.14598217974014",
-                "88.14598217974014",
-                "88.14598217974014",
-                "88.14598217974014",
-                "88.14598217974014",
-                "88.14598217974014",
+                85.732078872579,
+                86.44096256310476,
+                86.77019751074303,
+                86.74103998552496,
+                86.64342159003903,
+                86.57898055151605,
+                86.54829897295224,
+                86.5520006409324,
+                86.59083783299144,
+                86.66555585381998,
+                86.77683520191353,
+                86.92521097785732,
+                87.06166310407576,
+                87.18657445807551,
+                87.30036060017812,
+                87.40355987211228,
+                87.4967727773405,
+                87.58041626246342,
+                87.65476704819528,
+                87.72029003700567,
+                87.77754565123954,
+                87.8273377716408,
+                87.87044653212743,
+                87.90751659629285,
+                87.93889754994686,
+                87.96500123976884,
+                87.98647008053209,
+                88.00392652213652,
+                88.01795871129279,
+                88.02912156874194,
+                88.0379378183584,
+                88.04489934830934,
+                88.05046836922816,
+                88.05508417906836,
+                88.05917636320798,
+                88.06314680728673,
+                88.06727407099355,
+                88.07155325261802,
+                88.07596408572763,
+                88.08048771649001,
+                88.0851791482404,
+                88.09021545216102,
+                88.0955744117943,
+                88.10122342167693,
+                88.10713178627508,
+                88.11312558507561,
+                88.11889980331782,
+                88.12484203567728,
+                88.13124497984529,
+                88.13808315983019,
+                88.14502479923775,
+                88.15104161042552,
+                88.15539987378455,
+                88.15777204139727,
+                88.15835646191698,
+                88.15761275402889,
+                88.15598599919659,
+                88.15389249855268,
+                88.15170285865179,
+                88.149703828917,
+                88.14810111911734,
+                88.14688621614334,
+                88.14603489653823,
+                88.145523923539,
+                88.14533102945123,
+                88.14543489642449,
+                88.14574261113549,
+                88.14596950526587,
+                88.14598217974014,
+                88.14598217974014,
+                88.14598217974014,
+                88.14598217974014,
+                88.14598217974014,
+                88.14598217974014,
+                88.14598217974014,
             ],
             "unit": "mg/dL",
             "interval": 300.0,
-            "startDate": " 2019-01-28 15:20:00 +0000",
+            "startDate": "2019-01-28 15:20:00 +0000",
         },
         "batteryPercentage": 1.0,
-        "lastLoopCompleted": " 2019-01-28 15:16:28 +0000",
+        "lastLoopCompleted": "2019-01-28 15:16:28 +0000",
     }
 
 
@@ -221,6 +222,30 @@ def test_parse_by_directory():
     assert len(list_of_files) == 2
 
 
+def test_iter_by_directory_in_workers():
+    lr = loop_report.LoopReport()
+    list_of_files = lr.parse_by_directory(os.path.realpath("files"))
+    parsed_files = lr.iter_by_directory(
+        os.path.realpath("files"), workers=2, ordered=True, timeout=60
+    )
+
+    assert not isinstance(parsed_files, list)
+    assert list(parsed_files) == list_of_files
+
+
+def test_iter_by_directory_timeout(monkeypatch):
+    def slow_handler(self, dict, loop_report_dict, file_name):
+        time.sleep(10)
+
+    monkeypatch.setattr(loop_report.LoopReport, "_parse_loop_version", slow_handler)
+    lr = loop_report.LoopReport()
+    start = time.perf_counter()
+    parsed_files = list(lr.iter_by_directory(os.path.realpath("files"), timeout=0.2))
+
+    assert parsed_files == []
+    assert time.perf_counter() - start < 5
+
+
 def test_parse_by_file_missing_file_name():
     with pytest.raises(RuntimeError) as excinfo:
         lr = loop_report.LoopReport()
@@ -242,6 +267,36 @@ def test_parse_by_directory_invalid_directory():
     assert "The directory passed in is invalid." in str(excinfo.value)
 
 
+def test_parse_by_file_sections():
+    lr = loop_report.LoopReport()
+    full_dict = lr.parse_by_file(os.getcwd() + "/files", "LoopReport2.md")
+    loop_dict = lr.parse_by_file(
+        os.getcwd() + "/files",
+        "LoopReport2.md",
+        sections=[
+            loop_report.Sections.LOOP_VERSION,
+            loop_report.Sections.MINIMED_PUMP_MANAGER,
+            loop_report.Sections.DOSE_STORE,
+        ],
+    )
+
+    assert loop_dict["pump_manager_type"] == "minimed"
+    assert "basal_rate_schedule" in loop_dict
+    assert "cached_glucose_samples" not in loop_dict
+    assert loop_dict == {key: full_dict[key] for key in loop_dict}
+
+
+def test_view_by_file():
+    lr = loop_report.LoopReport()
+    full_dict = lr.parse_by_file(os.getcwd() + "/files", "LoopReport.md")
+    view = lr.view_by_file(os.getcwd() + "/files", "LoopReport.md")
+
+    assert view.dose_store["basal_rate_schedule"] == full_dict["basal_rate_schedule"]
+    assert view.dose_store is view.dose_store
+    assert view["pump_model"] == "723"
+    assert view.to_dict() == full_dict
+
+
 def get_retrospective_predicted_glucose():
     return [
         {
@@ -280,22 +335,22 @@ def get_retrospective_predicted_glucose():
 def get_retrospective_glucose_change():
     return {
         "start_dict": {
-            " sampleUUID": "8B9AA1D2-E475-47E0-9612-76C01A438AD3",
-            " syncIdentifier": '"00AA0A 2594908"',
-            " syncVersion": "1",
-            " startDate": "2019-01-28 14:51:19 +0000",
-            " quantity": "89 mg/dL",
-            " isDisplayOnly": "false",
-            " provenanceIdentifier": '"com.34SNZ39Q48.loopkit.Loop"',
+            "sampleUUID": "8B9AA1D2-E475-47E0-9612-76C01A438AD3",
+            "syncIdentifier": "00AA0A 2594908",
+            "syncVersion": 1,
+            "startDate": "2019-01-28 14:51:19 +0000",
+            "quantity": "89 mg/dL",
+            "isDisplayOnly": False,
+            "provenanceIdentifier": "com.34SNZ39Q48.loopkit.Loop",
         },
         "end_dict": {
             "sampleUUID": "7ED3FC10-0E37-4243-86F1-6E187E62F2DF",
-            " syncIdentifier": '"00AA0A 2596408"',
-            " syncVersion": "1",
-            " startDate": "2019-01-28 15:16:20 +0000",
-            " quantity": "85 mg/dL",
-            " isDisplayOnly": "false",
-            " provenanceIdentifier": '"com.34SNZ39Q48.loopkit.Loop"',
+            "syncIdentifier": "00AA0A 2596408",
+            "syncVersion": 1,
+            "startDate": "2019-01-28 15:16:20 +0000",
+            "quantity": "85 mg/dL",
+            "isDisplayOnly": False,
+            "provenanceIdentifier": "com.34SNZ39Q48.loopkit.Loop",
         },
     }
 
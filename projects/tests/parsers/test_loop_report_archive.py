@@ -0,0 +1,76 @@
+import projects.parsers.loop_report as loop_report
+import projects.parsers.loop_report_parser as plr
+import projects.parsers.loop_report_archive as lra
+import io
+import os
+import tarfile
+import zipfile
+import pytest
+
+FILE_NAMES = ["LoopReport.md", "LoopReport2.md"]
+
+
+@pytest.fixture
+def archives(tmp_path):
+    files = os.path.realpath("files")
+    zip_path = os.path.join(tmp_path, "reports.zip")
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for file_name in FILE_NAMES:
+            archive.write(os.path.join(files, file_name), "reports/" + file_name)
+        archive.writestr("reports/notes.txt", "not a report")
+
+    tar_path = os.path.join(tmp_path, "reports.tar.gz")
+    with tarfile.open(tar_path, "w:gz") as archive:
+        for file_name in FILE_NAMES:
+            archive.add(os.path.join(files, file_name), "reports/" + file_name)
+
+    return [zip_path, tar_path]
+
+
+def test_parse_loop_report_from_buffers():
+    files = os.path.realpath("files")
+    full_dict = plr.parse_loop_report(files, "LoopReport.md")
+    with open(os.path.join(files, "LoopReport.md"), "rb") as f:
+        data = f.read()
+
+    assert plr.parse_loop_report(data) == full_dict
+    assert plr.parse_loop_report(io.BytesIO(data)) == full_dict
+    assert plr.parse_loop_report(io.StringIO(data.decode())) == full_dict
+    assert plr.parse_loop_report(data.replace(b"\n", b"\r\n")) == full_dict
+    assert plr.parse_loop_report(
+        data, sections=[plr.Sections.LOOP_VERSION]
+    ) == {plr.Sections.LOOP_VERSION: full_dict[plr.Sections.LOOP_VERSION]}
+
+
+def test_parse_by_buffer():
+    lr = loop_report.LoopReport()
+    files = os.path.realpath("files")
+    with open(os.path.join(files, "LoopReport2.md"), "rb") as f:
+        loop_dict = lr.parse_by_buffer(f, "LoopReport2.md")
+
+    assert loop_dict == lr.parse_by_file(files, "LoopReport2.md")
+
+
+@pytest.mark.parametrize("workers", [None, 2])
+def test_iter_by_archive(archives, workers):
+    lr = loop_report.LoopReport()
+    files = os.path.realpath("files")
+    expected = [lr.parse_by_file(files, file_name) for file_name in FILE_NAMES]
+    for loop_dict in expected:
+        loop_dict["file_name"] = "reports/" + loop_dict["file_name"]
+
+    for archive_path in archives:
+        assert [
+            name for name, _ in lra.iter_members(archive_path)
+        ] == ["reports/" + file_name for file_name in FILE_NAMES]
+        assert (
+            list(lr.iter_by_archive(archive_path, workers=workers, ordered=True))
+            == expected
+        )
+
+
+def test_iter_by_archive_invalid():
+    with pytest.raises(RuntimeError):
+        loop_report.LoopReport().iter_by_archive(
+            os.path.join(os.path.realpath("files"), "LoopReport.md")
+        )
@@ -0,0 +1,83 @@
+import projects.parsers.loop_report as loop_report
+import projects.parsers.loop_report_cache as lrc
+import os
+import time
+import pytest
+
+
+def test_parse_by_file_with_cache(tmp_path, monkeypatch):
+    lr = loop_report.LoopReport(cache_dir=str(tmp_path))
+    full_dict = lr.parse_by_file(os.getcwd() + "/files", "LoopReport.md")
+    assert full_dict == loop_report.LoopReport().parse_by_file(
+        os.getcwd() + "/files", "LoopReport.md"
+    )
+    assert len(os.listdir(tmp_path)) == 1
+
+    def fail(self, dict, loop_report_dict, file_name):
+        raise AssertionError("the report was parsed again")
+
+    monkeypatch.setattr(loop_report.LoopReport, "_parse_loop_version", fail)
+    assert lr.parse_by_file(os.getcwd() + "/files", "LoopReport.md") == full_dict
+    assert lr.parse_by_directory(os.path.realpath("files"))[0]["loop_version"]
+
+
+def test_parse_cache_key():
+    report_path = os.path.join(os.getcwd(), "files", "LoopReport.md")
+    cache = lrc.ParseCache(os.getcwd(), "1")
+    other_version = lrc.ParseCache(os.getcwd(), "2")
+
+    assert cache.key(report_path) == cache.key(report_path)
+    assert cache.key(report_path) != other_version.key(report_path)
+    assert cache.key(report_path) != cache.key(report_path, ["dose_store"])
+
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    cache = lrc.ParseCache(str(tmp_path), "1", max_bytes=2500)
+    for key in ["a", "b"]:
+        cache.put(key, "x" * 1000)
+        time.sleep(0.01)
+    assert cache.get("a") == "x" * 1000
+
+    cache.put("c", "x" * 1000)
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+
+def test_parser_version_covers_handler_dependencies(tmp_path):
+    import projects.parsers.swift_structures as swift_structures
+
+    sources = [os.path.realpath(path) for path in loop_report.PARSER_SOURCES]
+    assert os.path.realpath(swift_structures.__file__) in sources
+    assert lrc.source_version(sources) == loop_report.PARSER_VERSION
+
+    # a change to a module the handlers parse with changes the version
+    changed = []
+    for path in sources:
+        copy_path = os.path.join(tmp_path, os.path.basename(path))
+        with open(path) as f, open(copy_path, "w") as copy:
+            copy.write(f.read())
+            if path == os.path.realpath(swift_structures.__file__):
+                copy.write("\n# changed\n")
+        changed.append(copy_path)
+    assert lrc.source_version(changed) != loop_report.PARSER_VERSION
+
+
+def test_parser_sources_cover_every_handler():
+    import sys
+
+    sources = [os.path.realpath(path) for path in loop_report.PARSER_SOURCES]
+    for handler_name, _ in loop_report.REPORT_SECTIONS:
+        handler = getattr(loop_report.LoopReport, handler_name)
+        module = sys.modules[handler.__module__]
+        assert os.path.realpath(module.__file__) in sources
+
+
+def test_module_sources_follows_imports():
+    import projects.parsers.loop_report_parser as loop_report_parser
+
+    sources = [
+        os.path.basename(path) for path in lrc.module_sources([loop_report_parser])
+    ]
+    # loop_report_parser imports SectionCounter from loop_report_profile
+    assert sources == ["loop_report_parser.py", "loop_report_profile.py"]
@@ -0,0 +1,73 @@
+import projects.parsers.loop_report as loop_report
+import projects.parsers.loop_report_dataset as lrd
+from projects.parsers.loop_report_parser import Sections
+import os
+import pytest
+
+pytest.importorskip("pyarrow")
+
+
+def test_export_dataset(tmp_path):
+    directory = os.path.realpath("files")
+    assert lrd.export_dataset(directory, str(tmp_path), batch_size=1) == 2
+
+    summary = lrd.read_table(str(tmp_path)).sort_values("file_name")
+    assert summary["file_name"].tolist() == ["LoopReport.md", "LoopReport2.md"]
+    assert summary["loop_version"].tolist() == ["Loop v1.9.3"] * 2
+    assert summary["pump_manager_type"].tolist() == ["minimed"] * 2
+    assert summary["pump_model"].tolist() == ["723", "722"]
+    assert str(summary["rileyLink_ble_firmware"].dtype) == "category"
+    assert summary["maximum_bolus"].tolist() == [10.0, 13.0]
+    assert summary["carb_ratio_timeZone"].tolist() == [-28800, -21600]
+    assert os.path.isdir(
+        os.path.join(
+            tmp_path,
+            lrd.SUMMARY_TABLE,
+            "loop_version=Loop%20v1.9.3",
+            "pump_manager_type=minimed",
+        )
+    )
+
+    lr = loop_report.LoopReport()
+    glucose = lrd.read_table(str(tmp_path), Sections.CACHED_GLUCOSE_SAMPLES)
+    assert len(glucose) == sum(
+        len(lr.parse_by_file(directory, file_name)["cached_glucose_samples"])
+        for file_name in ["LoopReport.md", "LoopReport2.md"]
+    )
+    assert set(glucose["report_id"]) == set(summary["report_id"])
+    assert str(glucose["startDate"].dtype) == "datetime64[ns, UTC]"
+
+    carb_effect = lrd.read_table(
+        str(tmp_path),
+        Sections.CARB_EFFECT,
+        filters=[("pump_manager_type", "=", "minimed")],
+    )
+    assert len(carb_effect) == 13
+
+
+def test_export_dataset_in_workers(tmp_path):
+    directory = os.path.realpath("files")
+    serial_path = str(tmp_path / "serial")
+    pool_path = str(tmp_path / "pool")
+    assert lrd.export_dataset(directory, serial_path) == 2
+    assert lrd.export_dataset(directory, pool_path, workers=2) == 2
+
+    serial = lrd.read_table(serial_path).sort_values("file_name")
+    pool = lrd.read_table(pool_path).sort_values("file_name")
+    assert pool["report_id"].tolist() == serial["report_id"].tolist()
+    assert len(lrd.read_table(pool_path, Sections.CACHED_GLUCOSE_SAMPLES)) == len(
+        lrd.read_table(serial_path, Sections.CACHED_GLUCOSE_SAMPLES)
+    )
+
+
+def test_dataset_writer_missing_partition(tmp_path):
+    directory = os.path.realpath("files")
+    loop_dict = loop_report.LoopReport().parse_by_file(directory, "LoopReport.md")
+    del loop_dict["pump_manager_type"]
+
+    with lrd.DatasetWriter(str(tmp_path)) as writer:
+        writer.add(directory, loop_dict)
+
+    summary = lrd.read_table(str(tmp_path))
+    assert summary["pump_manager_type"].isna().all()
+    assert len(lrd.read_table(str(tmp_path), Sections.CARB_EFFECT)) == 13
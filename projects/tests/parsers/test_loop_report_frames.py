@@ -0,0 +1,86 @@
+import projects.parsers.loop_report as loop_report
+import projects.parsers.loop_report_frames as lrf
+from projects.parsers.loop_report_parser import Sections
+import os
+import pytest
+
+
+def test_time_series_by_file():
+    lr = loop_report.LoopReport()
+    loop_dict = lr.parse_by_file(os.getcwd() + "/files", "LoopReport.md")
+    frames = lr.time_series_by_file(os.getcwd() + "/files", "LoopReport.md")
+
+    assert set(frames) == set(lrf.TIME_SERIES_SECTIONS)
+    carb_effect = frames[Sections.CARB_EFFECT]
+    assert list(carb_effect) == ["startDate", "quantity"]
+    assert str(carb_effect["startDate"].dtype) == "datetime64[ns, UTC]"
+    assert carb_effect["quantity"].dtype == "float64"
+    assert carb_effect["quantity"].tolist() == [
+        item["value"] for item in loop_dict["carb_effect"]
+    ]
+    assert len(frames[Sections.CACHED_GLUCOSE_SAMPLES]) == len(
+        loop_dict["cached_glucose_samples"]
+    )
+
+    doses = frames[Sections.GET_NORMALIZED_PUMP_EVENT_DOSE]
+    assert len(doses) == len(loop_dict["get_normalized_pump_event_dose"])
+    assert doses["scheduledBasalRate"].isna().any()
+    assert doses["scheduledBasalRate"].max() == 0.8
+
+
+def test_section_frame():
+    frame = lrf.section_frame(
+        Sections.INSULIN_COUNTERACTION_EFFECTS,
+        [
+            "GlucoseEffectVelocity(start, end, mg/dL/min)",
+            "2019-01-27 15:16:22 +0000, 2019-01-27 15:21:22 +0000, 0.5",
+            "2019-01-27 17:21:22 +0200, 2019-01-27 17:26:22 +0200, -1e-3",
+            "]",
+        ],
+    )
+
+    assert frame["quantity"].tolist() == [0.5, -0.001]
+    assert frame["startDate"].dt.hour.tolist() == [15, 15]
+    assert frame["endDate"].dt.minute.tolist() == [21, 26]
+    assert frame.attrs["units"] == "mg/dL/min"
+
+
+def test_time_series_by_file_unknown_section():
+    with pytest.raises(ValueError):
+        lrf.parse_time_series(os.getcwd() + "/files", "LoopReport.md", ["dose_store"])
+
+
+def test_events_by_file():
+    lr = loop_report.LoopReport()
+    frames = lr.events_by_file(os.getcwd() + "/files", "LoopReport.md")
+
+    messages = frames[Sections.MESSAGE_LOG]
+    assert len(messages) == 6
+    assert messages["direction"].tolist()[:2] == ["send", "receive"]
+    assert messages["payload"][0] == bytes.fromhex("1f0d624118030e01008179")
+    assert messages["address"].tolist() == [0x1F0D6241] * 6
+    assert messages["sequence"].tolist()[:3] == [6, 7, 8]
+    assert messages["message_type"][0] == 0x0E
+
+    events = frames[Sections.GET_PUMP_EVENT_VALUES]
+    assert len(events) == 19
+    assert str(events["date"].dtype) == "datetime64[ns, UTC]"
+    assert events["isUploaded"].dtype == "bool"
+    temp_basal = events[events["title"] == "TempBasalDurationPumpEvent"].iloc[0]
+    assert temp_basal["doseType"] == "tempBasal"
+    assert temp_basal["unit"] == "unitsPerHour"
+    assert temp_basal["type"] == "tempBasal"
+    assert temp_basal["rawLength"] == 7
+    assert events["doseType"].isna().any()
+
+
+def test_message_log_frame_short_messages():
+    frame = lrf.message_log_frame(
+        "2019-01-08 18:42:00 +0000 send 1f0d6241\n"
+        "2019-01-08 18:42:02 +0000 receive 1f0d62411c0a1d"
+    )
+
+    assert frame["address"].tolist() == [0x1F0D6241] * 2
+    assert frame["sequence"].isna().tolist() == [True, False]
+    assert frame["message_type"].isna().tolist() == [True, False]
+    assert frame["message_type"][1] == 0x1D
@@ -0,0 +1,42 @@
+import projects.parsers.loop_report_parser as plr
+import projects.parsers.loop_report_index as lri
+import projects.parsers.loop_report as loop_report
+import os
+import shutil
+import pytest
+
+
+@pytest.mark.parametrize("file_name", ["LoopReport.md", "LoopReport2.md"])
+def test_read_sections(tmp_path, file_name):
+    shutil.copy(os.path.join(os.getcwd(), "files", file_name), tmp_path)
+    file_path = os.path.join(tmp_path, file_name)
+    full_dict = plr.parse_loop_report(str(tmp_path), file_name)
+
+    assert lri.read_sections(file_path, list(full_dict)) == full_dict
+    assert os.path.isfile(file_path + lri.INDEX_FILE_EXTENSION)
+    assert (
+        lri.read_section(file_path, plr.Sections.LOOP_DATA_MANAGER)
+        == full_dict[plr.Sections.LOOP_DATA_MANAGER]
+    )
+    assert lri.read_section(file_path, "not_a_section") is None
+
+
+def test_load_index_rebuilds_stale_index(tmp_path):
+    file_path = os.path.join(tmp_path, "LoopReport.md")
+    shutil.copy(os.path.join(os.getcwd(), "files", "LoopReport.md"), file_path)
+    index = lri.load_index(file_path)
+    assert lri.load_index(file_path) == index
+
+    with open(file_path, "a") as f:
+        f.write("\n### MessageLog\n* one message\n")
+    assert lri.read_section(file_path, plr.Sections.MESSAGE_LOG) == ["one message"]
+
+
+def test_view_by_file_with_index(tmp_path):
+    shutil.copy(os.path.join(os.getcwd(), "files", "LoopReport.md"), tmp_path)
+    lr = loop_report.LoopReport()
+    full_dict = lr.parse_by_file(str(tmp_path), "LoopReport.md")
+    view = lr.view_by_file(str(tmp_path), "LoopReport.md", use_index=True)
+
+    assert view.dose_store["basal_rate_schedule"] == full_dict["basal_rate_schedule"]
+    assert view.to_dict() == full_dict
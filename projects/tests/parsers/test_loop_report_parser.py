@@ -346,3 +346,39 @@ def get_valid_dictionary():
             "lastBasalEndDate": " 2019-01-28 10:06:28 +0000",
         },
     }
+
+
+def test_parse_section_dispatch(tmp_path):
+    report = (
+        "Generated: 2019-01-28 15:20:13 +0000\n"
+        "Loop v1.9.3\n"
+        "\n"
+        "## RileyLinkDeviceManager\n"
+        "* central: <CBCentralManager>\n"
+        "## RileyLinkDevice\n"
+        "* name: RileyLink\n"
+        "\n"
+        "## LoopDataManager\n"
+        "settings: LoopSettings()\n"
+        "ignored: line\n"
+        "lastLoopCompleted: Optional(2019-01-28 15:17:21 +0000)\n"
+        "insulinEffect: [\n"
+        "* GlucoseEffect(startDate: 2019-01-28 15:15:00 +0000)\n"
+        "## UnknownSection\n"
+        "* GlucoseEffect(startDate: 2019-01-28 15:20:00 +0000)\n"
+    )
+    (tmp_path / "report.md").write_text(report)
+
+    sections = plr.parse_loop_report(str(tmp_path), "report.md")
+
+    assert sections["loop_version"] == {"loop_version": "Loop v1.9.3"}
+    assert sections["riley_link_device_manager"] == {"central": " <CBCentralManager>"}
+    assert sections["riley_link_device"] == {"name": " RileyLink"}
+    assert sections["loop_data_manager"] == {
+        "settings": " LoopSettings()",
+        "lastLoopCompleted": " Optional(2019-01-28 15:17:21 +0000)",
+    }
+    assert sections["insulin_effect"] == [
+        "GlucoseEffect(startDate: 2019-01-28 15:15:00 +0000)",
+        "GlucoseEffect(startDate: 2019-01-28 15:20:00 +0000)",
+    ]
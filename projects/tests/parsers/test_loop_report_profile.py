@@ -0,0 +1,48 @@
+from projects.parsers.loop_report import LoopReport
+from projects.parsers.loop_report_parser import parse_loop_report, Sections
+import projects.parsers.loop_report_profile as lrp
+import os
+
+
+def test_section_profile_covers_the_report():
+    path = os.path.realpath("files")
+    profile = lrp.ParseProfile()
+    parse_loop_report(path, "LoopReport2.md", profile=profile)
+
+    with open(os.path.join(path, "LoopReport2.md"), "rb") as f:
+        data = f.read()
+    rows = profile.rows(lrp.SECTION)
+    assert profile.reports == 1
+    assert sum(row[4] for row in rows) == len(data)
+    assert sum(row[5] for row in rows) == data.count(b"\n")
+    assert not profile.rows(lrp.HANDLER)
+
+
+def test_loop_report_profile():
+    path = os.path.realpath("files")
+    profile = lrp.ParseProfile()
+    loop_report_dict = LoopReport(profile=profile).parse_by_file(
+        path, "LoopReport.md"
+    )
+
+    assert loop_report_dict == LoopReport().parse_by_file(path, "LoopReport.md")
+    stats = profile.to_dict()
+    assert stats["reports"] == 1
+    assert stats[lrp.SECTION][Sections.CACHED_GLUCOSE_SAMPLES]["lines"] > 0
+    handler = stats[lrp.HANDLER]["_parse_cached_glucose_samples"]
+    assert handler["calls"] == 1
+    assert handler["bytes"] > 0 and handler["seconds"] >= 0
+    assert "_parse_cached_glucose_samples" in profile.format()
+
+
+def test_profile_is_aggregated_across_workers():
+    path = os.path.realpath("files")
+    serial = lrp.ParseProfile()
+    pooled = lrp.ParseProfile()
+    list(LoopReport(profile=serial).iter_by_directory(path))
+    list(LoopReport(profile=pooled).iter_by_directory(path, workers=2))
+
+    assert serial.reports == pooled.reports == 2
+    assert {key: stat[0] for key, stat in serial.stats.items()} == {
+        key: stat[0] for key, stat in pooled.stats.items()
+    }
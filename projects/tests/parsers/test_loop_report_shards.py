@@ -0,0 +1,72 @@
+import projects.parsers.loop_report_shards as lrs
+import projects.parsers.loop_report_writer as lrw
+import os
+import json
+import pytest
+
+
+def _report_files(path, names):
+    for name in names:
+        with open(os.path.join(path, name), "w") as f:
+            f.write("Loop Report\n")
+
+
+def test_shard_of():
+    names = [f"LoopReport{i}.md" for i in range(100)]
+    shards = [lrs.shard_of(name, 4) for name in names]
+    assert lrs.shard_of("LoopReport.md", 4) == 3
+    assert set(shards) == {0, 1, 2, 3}
+    assert shards == [lrs.shard_of(name, 4) for name in names]
+
+
+def test_parse_shard():
+    assert lrs.parse_shard("1/4") == (1, 4)
+    for text in ["4/4", "-1/4", "1", "a/b"]:
+        with pytest.raises(ValueError):
+            lrs.parse_shard(text)
+
+
+def test_shard_resume_and_merge(tmp_path):
+    reports_path = os.path.join(tmp_path, "reports")
+    os.makedirs(reports_path)
+    _report_files(reports_path, ["a.md", "b.md", "c.md"])
+    directory = lrs.shard_path(os.path.join(tmp_path, "output"), 0, 1)
+
+    with lrs.ShardWriter(directory, "jsonl", part_size=2) as writer:
+        for name in ["a.md", "b.md"]:
+            writer.write_prepared(
+                lrw.prepare_report({"file_name": name, "run": 1}, "jsonl"),
+                lrs.file_entry(reports_path, name),
+            )
+        writer.write_error(lrs.file_entry(reports_path, "c.md"), "ValueError()")
+
+    # b.md changes, and is parsed again by the next run of the shard
+    _report_files(reports_path, ["b.md"])
+    os.utime(os.path.join(reports_path, "b.md"), ns=(0, 0))
+    manifest = lrs.ShardManifest(directory)
+    entries = [lrs.file_entry(reports_path, name) for name in ["a.md", "b.md", "c.md"]]
+    assert [manifest.is_done(entry) for entry in entries] == [True, False, True]
+    with lrs.ShardWriter(directory, "jsonl", manifest) as writer:
+        writer.write_prepared(
+            lrw.prepare_report({"file_name": "b.md", "run": 2}, "jsonl"), entries[1]
+        )
+
+    output_path_name = os.path.join(tmp_path, "batch.jsonl")
+    assert lrs.merge_shards([directory], output_path_name) == 2
+    with open(output_path_name) as f:
+        assert [json.loads(line) for line in f] == [
+            {"file_name": "a.md", "run": 1},
+            {"file_name": "b.md", "run": 2},
+        ]
+
+
+def test_shard_writer_removes_incomplete_parts(tmp_path):
+    directory = lrs.shard_path(tmp_path, 0, 2)
+    os.makedirs(directory)
+    with open(os.path.join(directory, "part-0.csv.tmp"), "w") as f:
+        f.write("index,file_name\r\n0,a.md\r\n")
+
+    with lrs.ShardWriter(directory, "csv"):
+        pass
+    assert os.listdir(directory) == []
+    assert lrs.ShardManifest(directory).parts == []
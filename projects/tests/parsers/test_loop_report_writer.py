@@ -0,0 +1,113 @@
+import projects.parsers.loop_report_writer as lrw
+import os
+import csv
+import json
+import pytest
+
+REPORTS = [
+    {"file_name": "a.md", "maximum_bolus": 10, "carb_ratio_schedule": [{"value": 8}]},
+    {"file_name": "b.md", "maximum_bolus": 12.5, "loop_version": "Loop v1.9.3"},
+    {"file_name": "c.md", "pump_model": "723", "maximum_bolus": None},
+]
+
+
+def _write(output_path_name, output_format, **kwargs):
+    if output_format == "parquet":
+        writer = lrw.ParquetReportWriter(output_path_name, **kwargs)
+    else:
+        writer = lrw.report_writer(output_path_name, output_format)
+    with writer:
+        for report in REPORTS:
+            writer.write(report)
+    return writer
+
+
+def test_csv_report_writer_adds_columns(tmp_path):
+    output_path_name = os.path.join(tmp_path, "batch.csv")
+    writer = _write(output_path_name, "csv")
+
+    with open(output_path_name, newline="") as f:
+        rows = list(csv.reader(f))
+    assert writer.count == 3
+    assert rows[0] == [
+        "index",
+        "file_name",
+        "maximum_bolus",
+        "carb_ratio_schedule",
+        "loop_version",
+        "pump_model",
+    ]
+    assert rows[1] == ["0", "a.md", "10", "[{'value': 8}]", "", ""]
+    assert rows[3] == ["2", "c.md", "", "", "", "723"]
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def test_jsonl_report_writer(tmp_path):
+    output_path_name = os.path.join(tmp_path, "batch.jsonl")
+    _write(output_path_name, "jsonl")
+
+    with open(output_path_name) as f:
+        assert [json.loads(line) for line in f] == REPORTS
+
+
+@pytest.mark.parametrize("row_group_size", [1, 256])
+def test_parquet_report_writer(tmp_path, row_group_size):
+    pq = pytest.importorskip("pyarrow.parquet")
+    output_path_name = os.path.join(tmp_path, "batch.parquet")
+    _write(output_path_name, "parquet", row_group_size=row_group_size)
+
+    table = pq.read_table(output_path_name)
+    assert table.column_names == [
+        "file_name",
+        "maximum_bolus",
+        "carb_ratio_schedule",
+        "loop_version",
+        "pump_model",
+    ]
+    assert str(table.schema.field("maximum_bolus").type) == "double"
+    assert table["maximum_bolus"].to_pylist() == [10.0, 12.5, None]
+    assert table["pump_model"].to_pylist() == [None, None, "723"]
+    assert json.loads(table["carb_ratio_schedule"][0].as_py()) == [{"value": 8}]
+    assert os.listdir(tmp_path) == ["batch.parquet"]
+
+
+@pytest.mark.parametrize("output_format", lrw.FORMATS)
+def test_write_prepared(tmp_path, output_format):
+    pytest.importorskip("pyarrow")
+    written = os.path.join(tmp_path, "written." + output_format)
+    prepared = os.path.join(tmp_path, "prepared." + output_format)
+    _write(written, output_format)
+    with lrw.report_writer(prepared, output_format) as writer:
+        for report in REPORTS:
+            writer.write_prepared(lrw.prepare_report(report, output_format))
+
+    with open(written, "rb") as a, open(prepared, "rb") as b:
+        assert a.read() == b.read()
+
+
+@pytest.mark.parametrize("output_format", ["csv", "jsonl"])
+def test_read_prepared(tmp_path, output_format):
+    written = os.path.join(tmp_path, "written." + output_format)
+    copied = os.path.join(tmp_path, "copied." + output_format)
+    _write(written, output_format)
+    with lrw.report_writer(copied, output_format) as writer:
+        for row in lrw.read_prepared(written, output_format):
+            writer.write_prepared(row)
+
+    with open(written, "rb") as a, open(copied, "rb") as b:
+        assert a.read() == b.read()
+
+
+def test_report_writer_needs_write_and_read_prepared(tmp_path):
+    class WithoutReadPrepared(lrw._ReportWriter):
+        def write_prepared(self, row):
+            pass
+
+    class WithoutWritePrepared(lrw._ReportWriter):
+        @staticmethod
+        def read_prepared(output_path_name):
+            return iter([])
+
+    for writer_class in [WithoutReadPrepared, WithoutWritePrepared]:
+        with pytest.raises(TypeError):
+            writer_class(os.path.join(tmp_path, "batch.csv"))
@@ -0,0 +1,53 @@
+import projects.parsers.swift_structures as swift
+import pytest
+
+
+def test_parse_swift_dictionary():
+    value = swift.parse_swift(
+        ' ["timeZone": -28800, "unit": "g", "items": [["startTime": 0.0, "value": 10.0]]]'
+    )
+    assert value == {
+        "timeZone": -28800,
+        "unit": "g",
+        "items": [{"startTime": 0.0, "value": 10.0}],
+    }
+    assert swift.parse_swift("[:]") == {}
+    assert swift.parse_swift("[]") == []
+
+
+def test_parse_swift_objects():
+    value = swift.parse_swift(
+        "Optional(humalogNovologAdult(ExponentialInsulinModel(actionDuration: 21600.0, peakActivityTime: 4500.0))"
+    )
+    assert value.type_name == "humalogNovologAdult"
+    assert value.args[0].type_name == "ExponentialInsulinModel"
+    assert value.args[0] == {"actionDuration": 21600.0, "peakActivityTime": 4500.0}
+
+    value = swift.parse_swift(
+        "Optional(Loop.GlucoseThreshold(value: 85.0, unit: mg/dL)), extra: nil"
+    )
+    assert value == {"value": 85.0, "unit": "mg/dL"}
+
+    assert swift.parse_swift("(fast: 1800.0, medium: 10800.0)") == {
+        "fast": 1800.0,
+        "medium": 10800.0,
+    }
+    assert swift.parse_swift("nil") is None
+
+
+def test_parse_swift_scalars():
+    value = swift.parse_swift(
+        '(start: 2019-01-28 14:51:19 +0000, quantity: 89 mg/dL, ok: true, id: "a \\"b\\", c", n: 1)'
+    )
+    assert value == {
+        "start": "2019-01-28 14:51:19 +0000",
+        "quantity": "89 mg/dL",
+        "ok": True,
+        "id": 'a "b", c',
+        "n": 1,
+    }
+
+
+def test_parse_swift_invalid():
+    with pytest.raises(ValueError):
+        swift.parse_swift('["a": 1)')
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: benchmark tidals flatten_json on a large, generated Tidepool json
+    export against the original column-by-column implementation, and check
+    that the outputs match
+created: 2026-10-17
+license: BSD-2-Clause
+"""
+
+# %% REQUIRED LIBRARIES
+import os
+import sys
+import time
+import json
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+
+tidalsPath = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if tidalsPath not in sys.path:
+    sys.path.insert(0, tidalsPath)
+import tidals as td
+
+
+# %% USER INPUTS
+codeDescription = "benchmark tidals.clean.flatten_json"
+parser = argparse.ArgumentParser(description=codeDescription)
+parser.add_argument("-n",
+                    "--n-records",
+                    dest="nRecords",
+                    default=500000,
+                    type=int,
+                    help="number of records in the json export")
+parser.add_argument("--seed",
+                    dest="seed",
+                    default=0,
+                    type=int,
+                    help="random seed")
+parser.add_argument("--skip-original",
+                    dest="skipOriginal",
+                    action="store_true",
+                    help="only time the new implementation")
+
+
+# %% FUNCTIONS
+def original_remove_brackets(df, fieldName):
+    if fieldName in list(df):
+        df.loc[df[fieldName].notnull(), fieldName] = \
+            df.loc[df[fieldName].notnull(), fieldName].str[0]
+
+    return df
+
+
+def original_flatten_json(df):
+    # the column-by-column implementation that tidals.clean.flatten_json replaced
+    df = original_remove_brackets(df, "annotations")
+
+    newDataFrame = pd.DataFrame()
+
+    for colHead in list(df):
+        if any(isinstance(item, dict) for item in df[colHead]):
+            jsonBlob = df[colHead][df[colHead].astype(str).str[0] == "{"]
+
+            df.loc[jsonBlob.index, colHead] = np.nan
+
+            newDataFrame = pd.concat([newDataFrame, pd.DataFrame(jsonBlob.tolist(),
+                                      index=jsonBlob.index).add_prefix(colHead + '.')], axis=1)
+
+    df = pd.concat([df, newDataFrame], axis=1)
+
+    return df
+
+
+def make_json_export(nRecords, seed, outputPath):
+    # a mix of cgm, basal, bolus, wizard and deviceEvent records, where the
+    # non-cgm records contain embedded json
+    rng = np.random.RandomState(seed)
+    records = []
+    for i, recordType in enumerate(rng.choice(
+            ["cbg", "basal", "bolus", "wizard", "deviceEvent"],
+            nRecords, p=[0.7, 0.12, 0.08, 0.06, 0.04])):
+        record = {"id": "%08x" % i,
+                  "type": recordType,
+                  "time": "2018-01-01T00:00:00.000Z",
+                  "deviceId": "DexG5MobRec_SM12345678",
+                  "uploadId": "upid_%d" % (i // 10000),
+                  "origin": {"id": "%d" % i, "name": "com.dexcom.G5"}}
+        if recordType == "cbg":
+            record["value"] = rng.uniform(2.2, 22.2)
+        elif recordType == "basal":
+            record["deliveryType"] = "temp"
+            record["rate"] = 0.5
+            record["suppressed"] = {"type": "basal", "deliveryType": "scheduled",
+                                    "rate": 0.8,
+                                    "annotations": [{"code": "basal/unknown-duration"}]}
+        elif recordType == "bolus":
+            record["subType"] = "normal"
+            record["normal"] = 1.5
+        elif recordType == "wizard":
+            record["bolus"] = "%08x" % (i - 1)
+            record["recommended"] = {"carb": 2.0, "correction": 0.5, "net": 2.5}
+            record["bgTarget"] = {"low": 5.0, "high": 7.0}
+            record["carbInput"] = 30
+        else:
+            record["subType"] = "calibration"
+            record["payload"] = {"calibration_reading": 110}
+            record["annotations"] = [{"code": "tandem/calibration"}]
+        records.append(record)
+
+    with open(outputPath, "w") as f:
+        json.dump(records, f)
+
+    return
+
+
+def time_it(func, df, nRepeats):
+    best = np.inf
+    for _ in range(nRepeats):
+        inputDf = df.copy()
+        startTime = time.time()
+        output = func(inputDf)
+        best = min(best, time.time() - startTime)
+    return output, best
+
+
+# %% RUN BENCHMARK
+if __name__ == "__main__":
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tempFolder:
+        jsonPath = os.path.join(tempFolder, "PHI-benchmark.json")
+        make_json_export(args.nRecords, args.seed, jsonPath)
+        data = td.load.load_json(jsonPath)
+    print("flattening", len(data), "records with", len(list(data)), "fields")
+
+    flattened, newTime = time_it(td.clean.flatten_json, data, 3)
+    print("flatten_json took", round(newTime, 2), "seconds")
+
+    if not args.skipOriginal:
+        original, originalTime = time_it(original_flatten_json, data, 1)
+        print("original flatten_json took", round(originalTime, 2), "seconds")
+        pd.testing.assert_frame_equal(original, flattened)
+        print("outputs are identical, speedup: {0}x".format(
+            round(originalTime / newTime, 1)))
+
+    nested, nestedTime = time_it(
+        lambda df: td.clean.flatten_json(df, maxDepth=3, unwrapLists=True), data, 3)
+    print("flatten_json with maxDepth=3 took", round(nestedTime, 2), "seconds",
+          "and returned", len(list(nested)), "fields")
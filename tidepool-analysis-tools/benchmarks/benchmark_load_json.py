@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: compare the time and peak memory of loading a large, generated
+    Tidepool json export all at once vs. streaming it in chunks
+created: 2026-10-17
+license: BSD-2-Clause
+"""
+
+# %% REQUIRED LIBRARIES
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+tidalsPath = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if tidalsPath not in sys.path:
+    sys.path.insert(0, tidalsPath)
+import tidals as td
+from benchmark_flatten_json import make_json_export
+
+
+# %% USER INPUTS
+codeDescription = "benchmark streaming tidals.load.load_json"
+parser = argparse.ArgumentParser(description=codeDescription)
+parser.add_argument("-n",
+                    "--n-records",
+                    dest="nRecords",
+                    default=500000,
+                    type=int,
+                    help="number of records in the json export")
+parser.add_argument("-c",
+                    "--chunksize",
+                    dest="chunksize",
+                    default=50000,
+                    type=int,
+                    help="number of records per chunk")
+
+
+# %% FUNCTIONS
+def count_cbg_all_at_once(jsonPath):
+    data = td.load.load_json(jsonPath)
+    return (data["type"] == "cbg").sum()
+
+
+def count_cbg_in_chunks(jsonPath, chunksize):
+    nCbg = 0
+    for chunk in td.load.load_json(jsonPath, chunksize=chunksize, byType=True):
+        if "cbg" in chunk:
+            nCbg = nCbg + len(chunk["cbg"])
+    return nCbg
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    startTime = time.time()
+    output = func(*args)
+    elapsedTime = time.time() - startTime
+    _, peakMemory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return output, elapsedTime, peakMemory / 2**20
+
+
+# %% RUN BENCHMARK
+if __name__ == "__main__":
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tempFolder:
+        jsonPath = os.path.join(tempFolder, "PHI-benchmark.json")
+        make_json_export(args.nRecords, 0, jsonPath)
+        print("json export is", round(os.stat(jsonPath).st_size / 2**20, 1), "MB")
+
+        nAll, allTime, allMemory = measure(count_cbg_all_at_once, jsonPath)
+        print("load all at once: {0} cbg records, {1} seconds, {2} MB peak".format(
+            nAll, round(allTime, 2), round(allMemory, 1)))
+
+        nChunks, chunkTime, chunkMemory = measure(
+            count_cbg_in_chunks, jsonPath, args.chunksize)
+        print("load in chunks of {0}: {1} cbg records, {2} seconds, {3} MB peak".format(
+            args.chunksize, nChunks, round(chunkTime, 2), round(chunkMemory, 1)))
+
+        assert nAll == nChunks
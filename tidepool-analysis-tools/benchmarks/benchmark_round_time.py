@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: benchmark the vectorized tidals round_time and round_time_array
+    against the original chunk-by-chunk (df.loc) implementations in tidals and
+    qualify-data, and check that the outputs match
+created: 2026-10-17
+license: BSD-2-Clause
+"""
+
+# %% REQUIRED LIBRARIES
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+tidalsPath = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if tidalsPath not in sys.path:
+    sys.path.insert(0, tidalsPath)
+import tidals as td
+
+
+# %% USER INPUTS
+codeDescription = "benchmark tidals.clean.round_time"
+parser = argparse.ArgumentParser(description=codeDescription)
+parser.add_argument("-n",
+                    "--n-records",
+                    dest="nRecords",
+                    default=1000000,
+                    type=int,
+                    help="number of cgm records to round")
+parser.add_argument("-g",
+                    "--n-gaps",
+                    dest="nGaps",
+                    default=5000,
+                    type=int,
+                    help="number of sensor gaps (> 5 minutes) in the data")
+parser.add_argument("--seed",
+                    dest="seed",
+                    default=0,
+                    type=int,
+                    help="random seed")
+parser.add_argument("--skip-original",
+                    dest="skipOriginal",
+                    action="store_true",
+                    help="only time the vectorized implementation")
+
+
+# %% FUNCTIONS
+def original_round_time(df, timeIntervalMinutes=5, timeField="time",
+                        roundedTimeFieldName="roundedTime", verbose=False):
+    # the chunk-by-chunk implementation that tidals.clean.round_time replaced
+    df.sort_values(by=timeField, ascending=True, inplace=True)
+    df.reset_index(drop=True, inplace=True)
+
+    t = pd.to_datetime(df.time)
+    t_shift = pd.to_datetime(df.time.shift(1))
+    df["TIB"] = round((t - t_shift).dt.days*(86400/(60 * timeIntervalMinutes)) +
+                      (t - t_shift).dt.seconds/(60 * timeIntervalMinutes)) * timeIntervalMinutes
+
+    largeGaps = list(df.query("TIB > " + str(timeIntervalMinutes)).index)
+    largeGaps.insert(0, 0)
+    largeGaps.append(len(df))
+
+    for gIndex in range(0, len(largeGaps) - 1):
+
+        df.loc[largeGaps[gIndex], "TIB"] = 0
+
+        df.loc[largeGaps[gIndex]:(largeGaps[gIndex + 1] - 1), "TIB_cumsum"] = \
+            df.loc[largeGaps[gIndex]:(largeGaps[gIndex + 1] - 1), "TIB"].cumsum()
+
+        df.loc[largeGaps[gIndex]:(largeGaps[gIndex + 1] - 1), roundedTimeFieldName] = \
+            pd.to_datetime(df.loc[largeGaps[gIndex], timeField]).round(str(timeIntervalMinutes) + "min") + \
+            pd.to_timedelta(df.loc[largeGaps[gIndex]:(largeGaps[gIndex + 1] - 1), "TIB_cumsum"], unit="m")
+
+    df.sort_values(by=timeField, ascending=False, inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    if verbose is False:
+        df.drop(columns=["TIB", "TIB_cumsum"], inplace=True)
+
+    return df
+
+
+def original_qualify_round_time(df, timeIntervalMinutes=5, timeField="time",
+                                roundedTimeFieldName="roundedTime",
+                                startWithFirstRecord=True, verbose=False):
+    # the chunk-by-chunk implementation that qualify-data used before
+    # tidals.clean.round_time_array(..., method="fromFirstRecord")
+    df.sort_values(by=timeField, ascending=startWithFirstRecord, inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    t = pd.to_datetime(df[timeField].astype('datetime64[ns]'))
+    t_shift = pd.to_datetime(df[timeField].astype('datetime64[ns]').shift(1))
+
+    df["timeBetweenRecords"] = \
+        round((t - t_shift).dt.days*(86400/(60 * timeIntervalMinutes)) +
+              (t - t_shift).dt.seconds/(60 * timeIntervalMinutes)) * timeIntervalMinutes
+
+    largeGaps = list(df.query("abs(timeBetweenRecords) > " + str(timeIntervalMinutes * 2)).index)
+    largeGaps.insert(0, 0)
+    largeGaps.append(len(df))
+
+    for gIndex in range(0, len(largeGaps) - 1):
+
+        chunk = t[largeGaps[gIndex]:largeGaps[gIndex+1]]
+        firstRecordChunk = t[largeGaps[gIndex]]
+        df.loc[largeGaps[gIndex]:largeGaps[gIndex+1], "minutesFromFirstRecord"] = \
+            (chunk - firstRecordChunk).dt.days*(86400/(60)) + (chunk - firstRecordChunk).dt.seconds/(60)
+
+        df.loc[largeGaps[gIndex]:largeGaps[gIndex+1], "roundedMinutesFromFirstRecord"] = \
+            round((df.loc[largeGaps[gIndex]:largeGaps[gIndex+1],
+                          "minutesFromFirstRecord"] / timeIntervalMinutes) + 0.000001) * (timeIntervalMinutes)
+
+        roundedFirstRecord = (firstRecordChunk + pd.Timedelta("1microseconds")).round(str(timeIntervalMinutes) + "min")
+
+        df.loc[largeGaps[gIndex]:largeGaps[gIndex+1], roundedTimeFieldName] = \
+            roundedFirstRecord + \
+            pd.to_timedelta(df.loc[largeGaps[gIndex]:largeGaps[gIndex+1],
+                                   "roundedMinutesFromFirstRecord"], unit="m")
+
+    df.sort_values(by=timeField, ascending=startWithFirstRecord, inplace=True)
+    df.reset_index(drop=True, inplace=True)
+    if verbose is False:
+        df.drop(columns=["timeBetweenRecords",
+                         "minutesFromFirstRecord",
+                         "roundedMinutesFromFirstRecord"], inplace=True)
+    return df
+
+
+def make_cgm_data(nRecords, nGaps, seed):
+    # cgm records every ~5 minutes (with jitter), broken up by random gaps
+    rng = np.random.RandomState(seed)
+    step = 300 + rng.randint(-20, 21, nRecords)
+    gapIndex = rng.choice(np.arange(1, nRecords), nGaps, replace=False)
+    step[gapIndex] += rng.randint(600, 86400 * 3, nGaps)
+    seconds = np.cumsum(step)
+    times = pd.Timestamp("2010-01-01") + pd.to_timedelta(seconds, unit="s")
+    cgm = pd.DataFrame({
+        "time": times.strftime("%Y-%m-%dT%H:%M:%S.000Z"),
+        "value": rng.uniform(2.2, 22.2, nRecords)
+    })
+
+    # the api does not return data in order
+    return cgm.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def qualify_round_time(df):
+    # how qualify-data rounds the cgm data with the shared rounding engine
+    df = df.sort_values(by="time").reset_index(drop=True)
+    df["roundedTime"] = td.clean.round_time_array(
+        df["time"], timeIntervalMinutes=5, method="fromFirstRecord")
+    return df
+
+
+def time_it(func, df, nRepeats):
+    best = np.inf
+    for _ in range(nRepeats):
+        startTime = time.time()
+        output = func(df.copy())
+        best = min(best, time.time() - startTime)
+    return output, best
+
+
+# %% RUN BENCHMARK
+if __name__ == "__main__":
+    args = parser.parse_args()
+    cgm = make_cgm_data(args.nRecords, args.nGaps, args.seed)
+    print("rounding", len(cgm), "records with", args.nGaps, "gaps")
+
+    vectorized, vectorizedTime = time_it(td.clean.round_time, cgm, 3)
+    print("vectorized round_time took", round(vectorizedTime, 2), "seconds")
+
+    if not args.skipOriginal:
+        original, originalTime = time_it(original_round_time, cgm, 1)
+        print("original round_time took", round(originalTime, 2), "seconds")
+        pd.testing.assert_frame_equal(original, vectorized)
+        print("outputs are identical, speedup: {0}x".format(
+            round(originalTime / vectorizedTime, 1)))
+
+    # the qualify-data method expects naive utc times
+    cgm["time"] = pd.to_datetime(cgm["time"]).dt.tz_localize(None)
+    vectorized, vectorizedTime = time_it(qualify_round_time, cgm, 3)
+    print("fromFirstRecord round_time_array took",
+          round(vectorizedTime, 2), "seconds")
+
+    if not args.skipOriginal:
+        original, originalTime = time_it(original_qualify_round_time, cgm, 1)
+        print("original qualify-data round_time took",
+              round(originalTime, 2), "seconds")
+        pd.testing.assert_frame_equal(original, vectorized)
+        print("outputs are identical, speedup: {0}x".format(
+            round(originalTime / vectorizedTime, 1)))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: write a synthetic (PHI free) Tidepool dataset, for running the
+    benchmarks and the pipeline at scale without donor data
+created: 2026-10-17
+license: BSD-2-Clause
+"""
+
+# %% REQUIRED LIBRARIES
+import os
+import sys
+import time
+import argparse
+
+tidalsPath = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if tidalsPath not in sys.path:
+    sys.path.insert(0, tidalsPath)
+import tidals as td
+
+
+# %% USER INPUTS
+codeDescription = "make a synthetic Tidepool dataset with tidals.synthetic"
+parser = argparse.ArgumentParser(description=codeDescription)
+parser.add_argument("-o",
+                    "--output-folder",
+                    dest="outputFolder",
+                    default=os.path.join(".", "PHI-synthetic-csvData"),
+                    help="folder where the PHI-<userid> files are written")
+parser.add_argument("-n",
+                    "--n-donors",
+                    dest="nDonors",
+                    default=1,
+                    type=int,
+                    help="number of donors")
+parser.add_argument("-d",
+                    "--n-days",
+                    dest="nDays",
+                    default=90,
+                    type=int,
+                    help="days of data per donor (3650 for 10 years)")
+parser.add_argument("-f",
+                    "--file-format",
+                    dest="fileFormat",
+                    default="csv",
+                    choices=["csv", "json", "xlsx"],
+                    help="file format of the donor files")
+parser.add_argument("-s",
+                    "--seed",
+                    dest="seed",
+                    default=0,
+                    type=int,
+                    help="random seed (the same seed gives the same dataset)")
+
+
+# %% MAKE DATASET
+if __name__ == "__main__":
+    args = parser.parse_args()
+    startTime = time.time()
+    donorFiles = td.synthetic.make_dataset(args.outputFolder,
+                                           nDonors=args.nDonors,
+                                           nDays=args.nDays,
+                                           seed=args.seed,
+                                           fileFormat=args.fileFormat)
+    print("wrote {0} donor files to {1} in {2} seconds".format(
+        len(donorFiles), args.outputFolder, round(time.time() - startTime, 1)))
@@ -1,5 +1,6 @@
 
-from tidals.clean.clean import remove_duplicates, round_time
+from tidals.clean.clean import remove_duplicates, round_time, round_time_array, flatten_json
+import numpy as np
 import pandas as pd
 from pandas.util import testing as tm
 import pytest
@@ -35,3 +36,63 @@ def test_round_time(valid_df):
     rounded_df = round_time(raw_df)
     tm.assert_frame_equal(valid_df, rounded_df)
 
+
+
+def test_round_time_restarts_after_large_gaps():
+    raw_data = [["2018-11-19T23:40:00.000Z"],
+                ["2018-11-19T23:02:00.000Z"],
+                ["2018-11-19T23:07:29.000Z"],
+                ["2018-11-19T23:12:31.000Z"]]
+
+    raw_df = pd.DataFrame(raw_data, columns=["time"])
+    rounded_df = round_time(raw_df, verbose=True)
+
+    assert list(rounded_df["time"]) == ["2018-11-19T23:40:00.000Z",
+                                        "2018-11-19T23:12:31.000Z",
+                                        "2018-11-19T23:07:29.000Z",
+                                        "2018-11-19T23:02:00.000Z"]
+    assert list(rounded_df["TIB"]) == [0, 5, 5, 0]
+    assert list(rounded_df["TIB_cumsum"]) == [0, 10, 5, 0]
+    assert list(rounded_df["roundedTime"]) == list(pd.to_datetime(
+        ["2018-11-19 23:40:00", "2018-11-19 23:10:00",
+         "2018-11-19 23:05:00", "2018-11-19 23:00:00"], utc=True))
+
+
+def test_round_time_array_keeps_input_order():
+    times = np.array(["2018-11-19T23:12:30", "2018-11-19T23:02:30",
+                      "2018-11-19T23:40:00", "2018-11-19T23:07:29"],
+                     dtype="datetime64[ns]")
+
+    cumulative = round_time_array(times)
+    from_first_record = round_time_array(times, method="fromFirstRecord")
+
+    assert list(cumulative) == list(np.array(
+        ["2018-11-19T23:10:00", "2018-11-19T23:00:00",
+         "2018-11-19T23:40:00", "2018-11-19T23:05:00"], dtype="datetime64[ns]"))
+    # multiples of 2:30 always round up
+    assert list(from_first_record) == list(np.array(
+        ["2018-11-19T23:15:00", "2018-11-19T23:05:00",
+         "2018-11-19T23:40:00", "2018-11-19T23:10:00"], dtype="datetime64[ns]"))
+    assert times[0] == np.datetime64("2018-11-19T23:12:30")
+
+
+def test_flatten_json():
+    raw_df = pd.DataFrame({
+        "type": ["cbg", "basal", "deviceEvent"],
+        "suppressed": [np.nan, {"rate": 0.8, "origin": {"name": "pump"}}, np.nan],
+        "bgTargets": [np.nan, {"low": 5}, np.nan],
+        "annotations": [np.nan, np.nan, [{"code": "tandem/calibration"}]]
+    })
+
+    flat_df = flatten_json(raw_df, doNotFlattenList=["bgTargets"], maxDepth=2)
+
+    assert list(flat_df) == ["type", "suppressed", "bgTargets", "annotations",
+                             "suppressed.rate", "suppressed.origin",
+                             "suppressed.origin.name", "annotations.code"]
+    assert flat_df.loc[1, "suppressed.rate"] == 0.8
+    assert flat_df.loc[1, "suppressed.origin.name"] == "pump"
+    assert flat_df.loc[2, "annotations.code"] == "tandem/calibration"
+    assert flat_df["suppressed"].isnull().all()
+    assert flat_df.loc[1, "bgTargets"] == {"low": 5}
+    # the input data is not changed
+    assert raw_df.loc[1, "suppressed"]["rate"] == 0.8
@@ -0,0 +1,194 @@
+from tidals.load.load import load_json, load_csv, iter_json_records
+import json
+import pandas as pd
+from pandas.util import testing as tm
+import pytest
+
+
+@pytest.fixture()
+def json_file(tmp_path):
+    records = [{"type": "cbg", "time": "2018-11-19T23:20:01.000Z", "value": 5.5},
+               {"type": "basal", "time": "2018-11-19T23:21:00.000Z", "rate": 0.8,
+                "suppressed": {"rate": 1.0}},
+               {"type": "cbg", "time": "2018-11-19T23:25:01.000Z", "value": 5.8}]
+    file_path = tmp_path / "PHI-test.json"
+    file_path.write_text(json.dumps(records, indent=2))
+
+    return str(file_path), records
+
+
+def test_iter_json_records(json_file):
+    file_path, records = json_file
+
+    assert list(iter_json_records(file_path, bufferSize=7)) == records
+
+
+def test_load_json_in_chunks(json_file):
+    file_path, records = json_file
+
+    chunks = list(load_json(file_path, chunksize=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    tm.assert_frame_equal(pd.concat(chunks, sort=False), pd.DataFrame(records))
+
+
+def test_load_json_in_chunks_by_type(json_file):
+    file_path, _ = json_file
+
+    chunks = list(load_json(file_path, chunksize=3, byType=True))
+
+    assert len(chunks) == 1
+    assert list(chunks[0]["cbg"].index) == [0, 2]
+    assert list(chunks[0]["cbg"]) == ["type", "time", "value"]
+    assert list(chunks[0]["basal"].index) == [1]
+
+
+def test_load_data_with_cache(json_file, tmp_path):
+    pytest.importorskip("pyarrow")
+    from tidals.load.load import load_data
+    import os
+    file_path, records = json_file
+    cache_path = str(tmp_path / "cache")
+
+    data, file_name = load_data(file_path, cachePath=cache_path)
+    cached_data, _ = load_data(file_path, cachePath=cache_path)
+
+    assert file_name == "test"
+    assert len(os.listdir(cache_path)) == 1
+    tm.assert_frame_equal(data, cached_data)
+    assert cached_data.loc[1, "suppressed"] == {"rate": 1.0}
+
+    # a changed source file replaces the stale cache file
+    with open(file_path, "w") as f:
+        json.dump(records[:2], f)
+    changed_data, _ = load_data(file_path, cachePath=cache_path)
+
+    assert len(changed_data) == 2
+    assert len(os.listdir(cache_path)) == 1
+
+
+def test_write_cache_of_mixed_column_that_is_not_json(tmp_path):
+    pytest.importorskip("pyarrow")
+    from tidals.load.cache import write_cache
+    from datetime import datetime
+    import os
+    cache_path = str(tmp_path / "cache")
+    df = pd.DataFrame({"a": [datetime(2020, 1, 1), "x", 1]})
+
+    with pytest.warns(UserWarning, match="could not be cached"):
+        assert not write_cache(df, str(tmp_path / "PHI-test.xlsx"), cache_path)
+    assert os.listdir(cache_path) == []
+
+
+def test_evict_cache(tmp_path):
+    from tidals.load.cache import evict_cache
+    import os
+    for i, file_name in enumerate(["a.parquet", "b.parquet", "c.parquet"]):
+        file_path = tmp_path / file_name
+        file_path.write_bytes(b"0" * 2**19)
+        os.utime(str(file_path), (i, i))
+
+    n_evicted = evict_cache(str(tmp_path), maxCacheSizeMB=1)
+
+    assert n_evicted == 1
+    assert sorted(os.listdir(str(tmp_path))) == ["b.parquet", "c.parquet"]
+
+
+def test_load_columns_and_types(json_file, tmp_path):
+    file_path, records = json_file
+    csv_path = str(tmp_path / "PHI-test.csv")
+    pd.DataFrame(records).to_csv(csv_path, index=False)
+
+    json_data = load_json(file_path, columns=["time", "value"], types=["cbg"])
+    csv_data = load_csv(csv_path, columns=["time", "value"], types=["cbg"], chunksize=1)
+
+    for data in [json_data, csv_data]:
+        assert list(data) == ["time", "value"]
+        assert list(data.index) == [0, 2]
+        assert list(data["value"]) == [5.5, 5.8]
+
+
+def test_load_columns_and_types_of_header_only_csv(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "PHI-empty.csv")
+    with open(csv_path, "w") as f:
+        f.write("time,type,value\n")
+
+    data = load_csv(csv_path, columns=["time", "value"], types=["cbg"], chunksize=1)
+    assert list(data) == ["time", "value"]
+    assert len(data) == 0
+
+    # (as read by the versions of pandas that yield no chunks for it)
+    read_csv = pd.read_csv
+
+    def read_csv_without_chunks(*args, **kwargs):
+        if kwargs.get("chunksize") is not None:
+            return iter([])
+        return read_csv(*args, **kwargs)
+
+    monkeypatch.setattr(pd, "read_csv", read_csv_without_chunks)
+    data = load_csv(csv_path, columns=["time", "value"], types=["cbg"], chunksize=1)
+    assert list(data) == ["time", "value"]
+    assert len(data) == 0
+
+
+def test_load_data_with_compact_dtypes(json_file):
+    from tidals.load.load import load_data
+    from tidals.load.schema import apply_schema
+    file_path, _ = json_file
+
+    data, _ = load_data(file_path, compactDtypes=True)
+
+    assert str(data["type"].dtype) == "category"
+    assert str(data["value"].dtype) == "float32"
+    assert str(data["time"].dtype) == "datetime64[ns, UTC]"
+    assert isinstance(data.loc[1, "suppressed"], dict)
+
+    _, memory_report = apply_schema(load_json(file_path), report=True)
+    assert memory_report.loc["type", "dtypeAfter"] == "category"
+    assert memory_report.loc["total", "bytesAfter"] < memory_report.loc["total", "bytesBefore"]
+
+
+def test_load_by_type(json_file, tmp_path):
+    from tidals.load.load import load_by_type
+    file_path, records = json_file
+    csv_path = str(tmp_path / "PHI-test.csv")
+    pd.DataFrame(records).drop(columns="suppressed").to_csv(csv_path, index=False)
+
+    for path in [file_path, csv_path]:
+        data = load_by_type(path, chunksize=2)
+
+        assert sorted(data) == ["basal", "cbg"]
+        assert sorted(data["cbg"]) == ["time", "type", "value"]
+        assert list(data["cbg"].index) == [0, 2]
+        assert "value" not in list(data["basal"])
+
+    data = load_by_type(csv_path, columns=["time", "value"], types=["cbg"])
+    assert list(data) == ["cbg"]
+    assert list(data["cbg"]) == ["time", "value"]
+
+
+def test_open_dataset(tmp_path):
+    from tidals.load.load import open_dataset
+    pd.DataFrame({"type": ["cbg", "cbg", "bolus"],
+                  "time": ["2018-01-01T00:00:00Z", "2018-01-02T00:00:00Z", "2018-01-02T01:00:00Z"],
+                  "value": [5.5, 6.0, None]}).to_csv(str(tmp_path / "PHI-a.csv"))
+    pd.DataFrame({"type": ["basal"],
+                  "time": ["2019-06-01T00:00:00Z"]}).to_csv(str(tmp_path / "PHI-b.csv"))
+
+    dataset = open_dataset(str(tmp_path))
+    assert len(dataset) == 2
+    assert len(dataset.filter(types=["cbg"])) == 1
+    assert len(dataset.filter(startDate="2019-01-01")) == 1
+    assert list(dataset.catalog.loc["a", ["nRows", "types"]]) == [3, "bolus|cbg"]
+
+    cbg = dataset.filter(types=["cbg"], startDate="2018-01-02", columns=["time", "value"])
+    donors = list(cbg.iter_donors())
+    assert [userid for userid, _ in donors] == ["a"]
+    assert list(donors[0][1]) == ["time", "value"]
+    assert list(donors[0][1]["value"]) == [6.0]
+
+    counts = dataset.aggregate(len)
+    assert counts.to_dict() == {"a": 3, "b": 1}
+
+    # the saved catalog is reused
+    assert open_dataset(str(tmp_path)).catalog["nRows"].to_dict() == {"a": 3, "b": 1}
@@ -0,0 +1,40 @@
+from tidals.synthetic.synthetic import make_donor_data, make_dataset
+from tidals.load.load import load_json, load_csv
+import pandas as pd
+from pandas.util import testing as tm
+
+
+def test_make_donor_data_is_deterministic():
+    df = make_donor_data(nDays=3, seed=7)
+
+    tm.assert_frame_equal(df, make_donor_data(nDays=3, seed=7))
+    assert not df.equals(make_donor_data(nDays=3, seed=8))
+
+
+def test_make_donor_data():
+    df = make_donor_data(nDays=30, seed=1, homeTimezone="US/Pacific",
+                         startDate="2018-03-01", duplicateUploadRate=1)
+
+    assert set(df["type"]) == {"cbg", "basal", "bolus", "wizard", "upload"}
+    assert {"scheduled", "temp"} <= set(df["deliveryType"].dropna())
+    # daylight saving time starts on 2018-03-11
+    assert {-480, -420} <= set(df["timezoneOffset"])
+    # every record is uploaded twice
+    assert df.duplicated(["deviceId", "type", "time"]).sum() * 2 == (df["type"] != "upload").sum()
+    # wizards point to a bolus in the same upload
+    bolusUploads = df[df["type"] == "bolus"].set_index("id")["uploadId"]
+    wizard = df[df["type"] == "wizard"]
+    assert (bolusUploads.loc[wizard["bolus"]].values == wizard["uploadId"].values).all()
+
+
+def test_make_dataset(tmp_path):
+    jsonFiles = make_dataset(str(tmp_path / "json"), nDonors=2, nDays=2, fileFormat="json")
+    csvFiles = make_dataset(str(tmp_path / "csv"), nDonors=2, nDays=2, fileFormat="csv")
+
+    assert list(jsonFiles) == list(csvFiles)
+    for userid in jsonFiles:
+        jsonData = load_json(jsonFiles[userid])
+        csvData = load_csv(csvFiles[userid])
+        assert len(jsonData) == len(csvData)
+        assert "suppressed" in list(jsonData)
+        tm.assert_series_equal(jsonData["time"], csvData["time"])
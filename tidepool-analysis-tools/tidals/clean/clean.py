@@ -16,8 +16,151 @@ def remove_duplicates(df, criteriaDF):
     return df, nDuplicatesRemoved
 
 
+def _time_between_records(tSorted, timeIntervalMinutes):
+    import numpy as np
+    # time between consecutive records of an int64 (epoch ns) array, rounded
+    # to the nearest <timeIntervalMinutes> minutes, using the same
+    # days/seconds arithmetic as pandas' timedelta components
+    dayNs = np.int64(86400 * 10**9)
+    secondNs = np.int64(10**9)
+
+    tDiff = np.diff(tSorted)
+    days = tDiff // dayNs
+    seconds = (tDiff % dayNs) // secondNs
+    timeBetweenRecords = np.empty(len(tSorted), dtype="float64")
+    timeBetweenRecords[:1] = np.nan
+    timeBetweenRecords[1:] = \
+        np.round(days * (86400 / (60 * timeIntervalMinutes)) +
+                 seconds / (60 * timeIntervalMinutes)) * timeIntervalMinutes
+
+    return timeBetweenRecords
+
+
+def _round_chunk_start(chunkStartNs, timeIntervalMinutes, tz, nudgeNs=0):
+    import pandas as pd
+    # round the first record of each chunk (in the wall time of tz)
+    chunkStartTime = pd.DatetimeIndex((chunkStartNs + nudgeNs).view("datetime64[ns]"))
+    if tz is not None:
+        chunkStartTime = chunkStartTime.tz_localize("UTC").tz_convert(tz)
+
+    return chunkStartTime.round(str(timeIntervalMinutes) + "min").asi8
+
+
+def _round_time_engine(times, timeIntervalMinutes, method, startWithFirstRecord):
+    import numpy as np
+    import pandas as pd
+    # the shared engine behind round_time and round_time_array
+    # OUTPUTS:
+    #   * sortOrder, the positions of the records in time order
+    #     (ascending if startWithFirstRecord, otherwise descending, and with
+    #     missing times last)
+    #   * nValid, the number of records that have a time
+    #   * the rounded epoch ns of the records in sortOrder
+    #   * the intermediate (sorted) columns of the chosen method
+    #   * the time zone of times
+    if method not in ["cumulative", "fromFirstRecord"]:
+        raise ValueError("method must be 'cumulative' or 'fromFirstRecord'")
+
+    t = pd.DatetimeIndex(pd.to_datetime(times))
+    tNs = t.asi8
+    isValid = ~t.isna()
+    nValid = int(isValid.sum())
+
+    ascOrder = np.argsort(np.where(isValid, tNs, np.iinfo(np.int64).max),
+                          kind="mergesort")
+    if startWithFirstRecord:
+        sortOrder = ascOrder
+    else:
+        sortOrder = np.concatenate([ascOrder[:nValid][::-1], ascOrder[nValid:]])
+
+    tSorted = tNs[sortOrder]
+    timeBetweenRecords = _time_between_records(tSorted, timeIntervalMinutes)
+    # missing times never match the previous record
+    timeBetweenRecords[nValid:] = np.nan
+    isMissing = np.isnan(timeBetweenRecords)
+
+    # the rounding process starts over at the first record, and after each
+    # gap that is greater than the gap threshold of the method
+    if method == "cumulative":
+        gapThreshold = timeIntervalMinutes
+    else:
+        gapThreshold = timeIntervalMinutes * 2
+    isChunkStart = np.abs(timeBetweenRecords) > gapThreshold
+    isChunkStart[:1] = True
+    chunkStartIndex = np.flatnonzero(isChunkStart)
+    chunkId = np.cumsum(isChunkStart) - 1
+
+    if method == "cumulative":
+        # rounded first record + cumulative sum of the rounded time between records
+        timeBetweenRecords[isChunkStart] = 0
+        isMissing[:1] = False
+        cumulativeMinutes = np.cumsum(np.where(isMissing, 0, timeBetweenRecords))
+        cumulativeMinutes = cumulativeMinutes - cumulativeMinutes[chunkStartIndex][chunkId]
+        cumulativeMinutes[isMissing] = np.nan
+        roundedChunkStart = _round_chunk_start(
+            tSorted[chunkStartIndex], timeIntervalMinutes, t.tz)
+        roundedMinutes = cumulativeMinutes
+        intermediates = {"TIB": timeBetweenRecords,
+                         "TIB_cumsum": cumulativeMinutes}
+    else:
+        # rounded first record + time from the first record, rounded
+        # NOTE: the ".000001" and the 1 microsecond nudge ensure that
+        # mulitples of 2:30 always round up.
+        fromFirstRecord = tSorted - tSorted[chunkStartIndex][chunkId]
+        minutesFromFirstRecord = \
+            (fromFirstRecord // np.int64(86400 * 10**9)) * (86400 / 60) + \
+            ((fromFirstRecord % np.int64(86400 * 10**9)) // np.int64(10**9)) / 60
+        minutesFromFirstRecord[nValid:] = np.nan
+        roundedMinutes = np.round(
+            (minutesFromFirstRecord / timeIntervalMinutes) + 0.000001) * timeIntervalMinutes
+        roundedChunkStart = _round_chunk_start(
+            tSorted[chunkStartIndex], timeIntervalMinutes, t.tz, nudgeNs=1000)
+        intermediates = {"timeBetweenRecords": timeBetweenRecords,
+                         "minutesFromFirstRecord": minutesFromFirstRecord,
+                         "roundedMinutesFromFirstRecord": roundedMinutes}
+
+    isRoundedMissing = np.isnan(roundedMinutes)
+    roundedNs = roundedChunkStart[chunkId] + \
+        (np.where(isRoundedMissing, 0, roundedMinutes) * 60 * 10**9).astype("int64")
+    roundedNs[isRoundedMissing] = np.iinfo(np.int64).min
+
+    return sortOrder, nValid, roundedNs, intermediates, t.tz
+
+
+def round_time_array(times, timeIntervalMinutes=5, method="cumulative",
+                     startWithFirstRecord=True):
+    import numpy as np
+    # Round an array of times to the nearest <timeIntervalMinutes> minutes,
+    # without sorting or modifying the caller's data
+    # INPUTS:
+    #   * times, a numpy datetime64 array (or anything pd.to_datetime accepts,
+    #     e.g., a column of a dataframe), in any order
+    #   * timeIntervalMinutes defaults to 5 minutes given that most cgms output every 5 minutes
+    #   * method specifies how each record is rounded within a chunk of data:
+    #       "cumulative" (tidals round_time): the first record is rounded, and the
+    #           rounded time between records is added up. Chunks start over after
+    #           gaps greater than <timeIntervalMinutes> minutes.
+    #       "fromFirstRecord" (qualify-data round_time): the time from the first
+    #           record is rounded, and multiples of half the interval always
+    #           round up. Chunks start over after gaps greater than 2 times
+    #           <timeIntervalMinutes> minutes.
+    #   * startWithFirstRecord starts the rounding with the first record if True,
+    #     and the last record if False (defaults to True)
+    # OUTPUT:
+    #   * a datetime64[ns] (UTC if times is timezone aware) array of the rounded
+    #     times, in the same order as times
+    sortOrder, _, roundedNs, _, _ = _round_time_engine(
+        times, timeIntervalMinutes, method, startWithFirstRecord)
+
+    rounded = np.empty(len(roundedNs), dtype="int64")
+    rounded[sortOrder] = roundedNs
+
+    return rounded.view("datetime64[ns]")
+
+
 def round_time(df, timeIntervalMinutes=5, timeField="time",
                roundedTimeFieldName="roundedTime", verbose=False):
+    import numpy as np
     import pandas as pd
     # A general purpose round time function that rounds the
     # "time" field to nearest <timeIntervalMinutes> minutes
@@ -26,39 +169,30 @@ def round_time(df, timeIntervalMinutes=5, timeField="time",
     #   * timeIntervalMinutes defaults to 5 minutes given that most cgms output every 5 minutes
     #   * timeField defaults to UTC time "time"
     #   * verbose specifies whether the "TIB" and "TIB_cumsum" columns are returned
+    # OUTPUT:
+    #   * a copy of df sorted descendingly by time, with the rounded time field
+    # NOTE: the rounding process starts over after each gap that is greater
+    # than <timeIntervalMinutes> minutes (see the "cumulative" method of
+    # round_time_array). All chunks are processed at once on int64 nanosecond
+    # arrays, so the time field is only parsed and sorted once.
 
-    df.sort_values(by=timeField, ascending=True, inplace=True)
-    df.reset_index(drop=True, inplace=True)
-
-    # calculate the time-in-between (TIB) consecutive records
-    t = pd.to_datetime(df.time)
-    t_shift = pd.to_datetime(df.time.shift(1))
-    df["TIB"] = round((t - t_shift).dt.days*(86400/(60 * timeIntervalMinutes)) +
-                      (t - t_shift).dt.seconds/(60 * timeIntervalMinutes)) * timeIntervalMinutes
+    sortOrder, nValid, roundedNs, intermediates, tz = _round_time_engine(
+        df[timeField], timeIntervalMinutes, "cumulative", True)
 
-    # separate the data into chunks if TIB is greater than <timeIntervalMinutes> minutes
-    # so that rounding process can start over
-    largeGaps = list(df.query("TIB > " + str(timeIntervalMinutes)).index)
-    largeGaps.insert(0, 0)
-    largeGaps.append(len(df))
+    # the output is sorted descendingly by time (missing times still last)
+    descPosition = np.concatenate([np.arange(nValid - 1, -1, -1),
+                                   np.arange(nValid, len(df))])
 
-    # loop through each chunk to get the cumulative sum and the rounded time
-    for gIndex in range(0, len(largeGaps) - 1):
+    df = df.take(sortOrder[descPosition]).reset_index(drop=True)
 
-        df.loc[largeGaps[gIndex], "TIB"] = 0
+    roundedTime = pd.DatetimeIndex(roundedNs[descPosition].view("datetime64[ns]"))
+    if tz is not None:
+        roundedTime = roundedTime.tz_localize("UTC").tz_convert(tz)
 
-        df.loc[largeGaps[gIndex]:(largeGaps[gIndex + 1] - 1), "TIB_cumsum"] = \
-            df.loc[largeGaps[gIndex]:(largeGaps[gIndex + 1] - 1), "TIB"].cumsum()
-
-        df.loc[largeGaps[gIndex]:(largeGaps[gIndex + 1] - 1), roundedTimeFieldName] = \
-            pd.to_datetime(df.loc[largeGaps[gIndex], timeField]).round(str(timeIntervalMinutes) + "min") + \
-            pd.to_timedelta(df.loc[largeGaps[gIndex]:(largeGaps[gIndex + 1] - 1), "TIB_cumsum"], unit="m")
-
-    # sort descendingly by time and drop fieldsfields
-    df.sort_values(by=timeField, ascending=False, inplace=True)
-    df.reset_index(drop=True, inplace=True)
-    if verbose is False:
-        df.drop(columns=["TIB", "TIB_cumsum"], inplace=True)
+    if verbose:
+        df["TIB"] = intermediates["TIB"][descPosition]
+        df["TIB_cumsum"] = intermediates["TIB_cumsum"][descPosition]
+    df[roundedTimeFieldName] = roundedTime
 
     return df
 
@@ -71,28 +205,100 @@ def remove_brackets(df, fieldName):
     return df
 
 
-def flatten_json(df):
-    import pandas as pd
+def _flatten_columns(df, doNotFlattenList, maxDepth, unwrapLists, depth):
     import numpy as np
-    # remove [] from annotations field
-    df = remove_brackets(df, "annotations")
+    import pandas as pd
+    from itertools import repeat
+    # flatten the embedded json (dicts) of each column of df, recursively
+    # OUTPUTS:
+    #   * df with the embedded json replaced with nan
+    #   * a list of the new (flattened) dataframes
+    newDataFrames = []
+    newColumns = {}
+    for colHead in list(df):
+        if colHead in doNotFlattenList:
+            continue
 
-    # loop through each columnHeading
-    newDataFrame = pd.DataFrame()
+        # only object columns with mixed types can contain json, which
+        # can be checked without looping in python
+        colValues = df[colHead].values
+        if ((colValues.dtype != object) or
+           (pd.api.types.infer_dtype(colValues, skipna=True) not in ["mixed", "mixed-integer"])):
+            continue
 
-    for colHead in list(df):
-        # if the df field has embedded json
-        if any(isinstance(item, dict) for item in df[colHead]):
-            # grab the data that is in brackets
-            jsonBlob = df[colHead][df[colHead].astype(str).str[0] == "{"]
+        # a single pass to get the type of each item (0: other, 1: list, 2: dict)
+        itemTypes = np.fromiter(
+            map({list: 1, dict: 2}.get, map(type, colValues), repeat(0)),
+            dtype=np.int8, count=len(colValues))
+        isList = itemTypes == 1
+        isDict = itemTypes == 2
+
+        # replace lists with their first item (which can be a dict)
+        if isList.any() and ((unwrapLists is True) or (colHead in unwrapLists)):
+            colValues = colValues.copy()
+            firstItems = [item[0] if len(item) > 0 else np.nan
+                          for item in colValues[isList]]
+            colValues[isList] = pd.Series(firstItems, dtype=object).values
+            isDict[isList] = [isinstance(item, dict) for item in firstItems]
+            newColumns[colHead] = colValues
+
+        if isDict.any():
+            # turn the json to a dataframe
+            jsonBlob = pd.DataFrame(list(colValues[isDict]),
+                                    index=df.index[isDict]).add_prefix(colHead + ".")
 
             # replace those values with nan
-            df.loc[jsonBlob.index, colHead] = np.nan
+            colValues = colValues.copy()
+            colValues[isDict] = np.nan
+            newColumns[colHead] = colValues
+
+            if depth < maxDepth:
+                jsonBlob, nestedDataFrames = _flatten_columns(
+                    jsonBlob, doNotFlattenList, maxDepth, unwrapLists, depth + 1)
+                newDataFrames = newDataFrames + [jsonBlob] + nestedDataFrames
+            else:
+                newDataFrames.append(jsonBlob)
+
+    if len(newColumns) > 0:
+        # new arrays replace the columns, so the caller's data is not changed
+        df = df.copy(deep=False)
+        for colHead, colValues in newColumns.items():
+            df[colHead] = colValues
+
+    return df, newDataFrames
+
+
+def flatten_json(df, doNotFlattenList=None, maxDepth=1, unwrapLists=None,
+                 flattenedFieldsToKeep=None):
+    import pandas as pd
+    # flatten embedded json (dicts) into new "<field>.<key>" columns
+    # INPUTS:
+    #   * a dataframe (df)
+    #   * doNotFlattenList, fields that are left as they are (e.g., schedules),
+    #     defaults to none
+    #   * maxDepth, the number of nested levels of json to flatten (defaults to 1)
+    #   * unwrapLists, the fields whose lists are replaced with their first
+    #     item, or True for all fields (defaults to removing the [] from annotations)
+    #   * flattenedFieldsToKeep, if given, only these new fields are returned
+    # OUTPUT:
+    #   * df, with the embedded json replaced with nan, and the new fields
+    #     added at the end
+    # NOTE: each column is checked for json once, and all of the new fields
+    # are added with a single concat
+    if doNotFlattenList is None:
+        doNotFlattenList = []
+    if unwrapLists is None:
+        unwrapLists = ["annotations"]
+
+    df, newDataFrames = _flatten_columns(df, doNotFlattenList, maxDepth,
+                                         unwrapLists, depth=1)
 
-            # turn jsonBlob to dataframe
-            newDataFrame = pd.concat([newDataFrame, pd.DataFrame(jsonBlob.tolist(),
-                                      index=jsonBlob.index).add_prefix(colHead + '.')], axis=1)
+    if flattenedFieldsToKeep is not None:
+        newDataFrames = [newDataFrame[[col for col in list(newDataFrame)
+                                       if col in flattenedFieldsToKeep]]
+                         for newDataFrame in newDataFrames]
 
-    df = pd.concat([df, newDataFrame], axis=1)
+    if len(newDataFrames) > 0:
+        df = pd.concat([df] + newDataFrames, axis=1)
 
     return df
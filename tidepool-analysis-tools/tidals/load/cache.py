@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: columnar (parquet) sidecar cache for data loaded with tidals
+    (tidepool data analytics tools)
+created: 2026-10-17
+license: BSD-2-Clause
+dependencies:
+    * pyarrow
+"""
+
+CACHE_FILE_EXTENSION = ".parquet"
+JSON_COLUMNS_METADATA_KEY = b"tidals.jsonColumns"
+
+
+def cache_file_name(inputFile):
+    import os
+    import hashlib
+    # the cache file is keyed by the source path, size and modified time,
+    # so a changed source file never matches an old cache file
+    fileStats = os.stat(inputFile)
+    pathHash = hashlib.sha256(os.path.abspath(inputFile).encode()).hexdigest()[0:16]
+    fileName = "{0}-{1}-{2}{3}".format(pathHash, fileStats.st_size,
+                                       fileStats.st_mtime_ns, CACHE_FILE_EXTENSION)
+
+    return pathHash, fileName
+
+
+def read_cache(inputFile, cachePath, columns=None, types=None):
+    import os
+    import json
+    import numpy as np
+    # return the cached data of inputFile, or None if it is not cached
+    # if columns and/or types are given, only those fields and the records
+    # of those types are read from the cache file
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+
+    _, fileName = cache_file_name(inputFile)
+    cacheFile = os.path.join(cachePath, fileName)
+    if not os.path.isfile(cacheFile):
+        return None
+
+    schemaNames = pq.read_schema(cacheFile, memory_map=True).names
+    readColumns = None
+    if columns is not None:
+        readColumns = [col for col in schemaNames
+                       if (col in columns) or (col == "type" and types is not None)]
+    filters = None
+    if types is not None:
+        if "type" not in schemaNames:
+            readColumns, filters = [], None
+        else:
+            filters = [("type", "in", list(types))]
+
+    table = pq.read_table(cacheFile, columns=readColumns, filters=filters,
+                          memory_map=True, use_pandas_metadata=True)
+    df = table.to_pandas()
+    if (types is not None) and ("type" not in schemaNames):
+        df = df.iloc[0:0]
+    if (columns is not None) and ("type" in list(df)) and ("type" not in columns):
+        df = df.drop(columns="type")
+
+    # decode the columns that were stored as json strings
+    metadata = table.schema.metadata or {}
+    jsonColumns = json.loads(metadata.get(JSON_COLUMNS_METADATA_KEY, b"[]"))
+    for colHead in [col for col in jsonColumns if col in list(df)]:
+        colValues = np.full(len(df), np.nan, dtype=object)
+        encodedValues = df[colHead].values
+        for i in np.flatnonzero(df[colHead].notnull().values):
+            colValues[i] = json.loads(encodedValues[i])
+        df[colHead] = colValues
+
+    # mark the cache file as recently used (for the lru eviction)
+    os.utime(cacheFile)
+
+    return df
+
+
+def write_cache(df, inputFile, cachePath, maxCacheSizeMB=10240):
+    import os
+    import glob
+    import json
+    import warnings
+    import pandas as pd
+    # write df to the cache, remove stale cache files of inputFile, and
+    # evict the least recently used cache files if the cache is too big
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        warnings.warn("pyarrow is not installed, so the data is not cached")
+        return False
+
+    if not os.path.exists(cachePath):
+        os.makedirs(cachePath)
+
+    # columns that mix nested json, strings and numbers are stored as json strings
+    jsonColumns = []
+    encodedColumns = {}
+    for colHead in list(df):
+        colValues = df[colHead].values
+        if ((colValues.dtype == object) and
+           (pd.api.types.infer_dtype(colValues, skipna=True) in ["mixed", "mixed-integer"])):
+            notNull = df[colHead].notnull().values
+            encodedValues = colValues.copy()
+            try:
+                encodedValues[notNull] = [json.dumps(item) for item in colValues[notNull]]
+            except (TypeError, ValueError) as e:
+                # e.g. a column that mixes dates and strings
+                warnings.warn("{0} could not be cached: {1}".format(inputFile, e))
+                return False
+            encodedValues[~notNull] = None
+            encodedColumns[colHead] = encodedValues
+            jsonColumns.append(colHead)
+
+    if len(encodedColumns) > 0:
+        df = df.copy(deep=False)
+        for colHead, encodedValues in encodedColumns.items():
+            df[colHead] = encodedValues
+
+    pathHash, fileName = cache_file_name(inputFile)
+    cacheFile = os.path.join(cachePath, fileName)
+    try:
+        # the index is always stored as a column, so that it is kept when
+        # records are filtered by type on read
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        metadata = dict(table.schema.metadata or {})
+        metadata[JSON_COLUMNS_METADATA_KEY] = json.dumps(jsonColumns).encode()
+        table = table.replace_schema_metadata(metadata)
+        # write to a temporary file first, so readers never see a partial file
+        pq.write_table(table, cacheFile + ".tmp", compression="zstd")
+        os.replace(cacheFile + ".tmp", cacheFile)
+    except (pa.ArrowException, TypeError, ValueError) as e:
+        warnings.warn("{0} could not be cached: {1}".format(inputFile, e))
+        if os.path.exists(cacheFile + ".tmp"):
+            os.remove(cacheFile + ".tmp")
+        return False
+
+    # remove stale cache files of the same source file
+    for staleFile in glob.glob(os.path.join(cachePath, pathHash + "-*" + CACHE_FILE_EXTENSION)):
+        if staleFile != cacheFile:
+            os.remove(staleFile)
+
+    evict_cache(cachePath, maxCacheSizeMB)
+
+    return True
+
+
+def evict_cache(cachePath, maxCacheSizeMB):
+    import os
+    import glob
+    # delete the least recently used cache files until the cache fits in
+    # maxCacheSizeMB
+    cacheFiles = glob.glob(os.path.join(cachePath, "*" + CACHE_FILE_EXTENSION))
+    cacheFileStats = sorted([(os.stat(f).st_mtime, os.stat(f).st_size, f) for f in cacheFiles])
+    cacheSize = sum([fileSize for _, fileSize, _ in cacheFileStats])
+
+    nEvicted = 0
+    for _, fileSize, cacheFile in cacheFileStats:
+        if cacheSize <= maxCacheSizeMB * 2**20:
+            break
+        os.remove(cacheFile)
+        cacheSize = cacheSize - fileSize
+        nEvicted = nEvicted + 1
+
+    return nEvicted
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: a lazy handle over a folder of donor csv files (PHI-<userid>.csv),
+    for tidals (tidepool data analytics tools)
+created: 2026-10-17
+license: BSD-2-Clause
+"""
+
+CATALOG_FILE_NAME = "tidals-catalog.csv"
+CATALOG_COLUMNS = ["userid", "fileName", "fileSize", "mtimeNs",
+                   "nRows", "minTime", "maxTime", "types"]
+
+
+def _userid_from_file_name(fileName):
+    # PHI-<userid>.csv -> <userid>
+    return fileName[4:-4]
+
+
+def list_donor_files(folder):
+    import os
+    # the donor csv files in folder, as a dict of {userid: path}
+    donorFiles = {}
+    for fileName in sorted(os.listdir(folder)):
+        if fileName.startswith("PHI-") and fileName.endswith(".csv"):
+            donorFiles[_userid_from_file_name(fileName)] = os.path.join(folder, fileName)
+
+    return donorFiles
+
+
+def catalog_file(dataPathAndName, chunksize=100000):
+    import os
+    import pandas as pd
+    # summarize a donor csv file (the row count, the first and last time,
+    # and the types of records), reading only the type and time fields
+    # OUTPUT:
+    #   * a dict with the fields of CATALOG_COLUMNS
+    fileStats = os.stat(dataPathAndName)
+    nRows = 0
+    minTime = None
+    maxTime = None
+    types = set()
+    for chunk in pd.read_csv(dataPathAndName, low_memory=False,
+                             usecols=lambda col: col in ["type", "time"],
+                             chunksize=chunksize):
+        nRows = nRows + len(chunk)
+        if "type" in list(chunk):
+            types.update(chunk["type"].dropna().unique())
+        if "time" in list(chunk):
+            times = pd.to_datetime(chunk["time"], utc=True, errors="coerce").dropna()
+            if len(times) > 0:
+                minTime = times.min() if minTime is None else min(minTime, times.min())
+                maxTime = times.max() if maxTime is None else max(maxTime, times.max())
+
+    fileName = os.path.split(dataPathAndName)[-1]
+    return {"userid": _userid_from_file_name(fileName),
+            "fileName": fileName,
+            "fileSize": fileStats.st_size,
+            "mtimeNs": fileStats.st_mtime_ns,
+            "nRows": nRows,
+            "minTime": minTime,
+            "maxTime": maxTime,
+            "types": "|".join(sorted(types))}
+
+
+def load_catalog(folder, catalogPath=None):
+    import os
+    import pandas as pd
+    # load the catalog of the donor files in folder, and (re)catalog the files
+    # that are new or have changed since the catalog was saved
+    # INPUTS:
+    #   * folder, the folder of PHI-<userid>.csv files
+    #   * catalogPath (optional), where the catalog is saved (defaults to
+    #     tidals-catalog.csv in folder)
+    # OUTPUT:
+    #   * a dataframe of CATALOG_COLUMNS, indexed by userid
+    if catalogPath is None:
+        catalogPath = os.path.join(folder, CATALOG_FILE_NAME)
+
+    if os.path.isfile(catalogPath):
+        savedCatalog = pd.read_csv(catalogPath, dtype={"userid": str, "types": str},
+                                   keep_default_na=False, na_values={"minTime": "", "maxTime": ""})
+        savedCatalog = savedCatalog.set_index("userid", drop=False)
+    else:
+        savedCatalog = pd.DataFrame(columns=CATALOG_COLUMNS).set_index("userid", drop=False)
+
+    entries = []
+    changed = False
+    for userid, dataPathAndName in list_donor_files(folder).items():
+        fileStats = os.stat(dataPathAndName)
+        if ((userid in savedCatalog.index)
+                and (savedCatalog.loc[userid, "fileSize"] == fileStats.st_size)
+                and (savedCatalog.loc[userid, "mtimeNs"] == fileStats.st_mtime_ns)):
+            entries.append(savedCatalog.loc[userid, CATALOG_COLUMNS].to_dict())
+        else:
+            entries.append(catalog_file(dataPathAndName))
+            changed = True
+    changed = changed or (len(entries) != len(savedCatalog))
+
+    catalog = pd.DataFrame(entries, columns=CATALOG_COLUMNS)
+    catalog["minTime"] = pd.to_datetime(catalog["minTime"], utc=True)
+    catalog["maxTime"] = pd.to_datetime(catalog["maxTime"], utc=True)
+    catalog = catalog.set_index("userid", drop=False)
+
+    if changed:
+        try:
+            catalog.to_csv(catalogPath, index=False)
+        except OSError:
+            # the catalog is only an optimization
+            pass
+
+    return catalog
+
+
+class Dataset:
+    # a lazy handle over a folder of donor csv files
+    # filters only narrow down what will be read; no data is loaded until
+    # the donors are iterated over (see iter_donors and aggregate)
+    def __init__(self, folder, catalogPath=None, userids=None,
+                 startDate=None, endDate=None, types=None, columns=None):
+        self.folder = folder
+        self.catalogPath = catalogPath
+        self.userids = None if userids is None else list(userids)
+        self.startDate = startDate
+        self.endDate = endDate
+        self.types = None if types is None else list(types)
+        self.columns = None if columns is None else list(columns)
+        self._catalog = None
+
+    def filter(self, userids=None, startDate=None, endDate=None, types=None, columns=None):
+        # a new handle with the (additional) filters
+        # INPUTS:
+        #   * userids, the only donors to keep
+        #   * startDate and endDate, the first and last time of the records
+        #     to keep (inclusive)
+        #   * types, the only types of records to keep
+        #   * columns, the only fields to load
+        newDataset = Dataset(
+            self.folder,
+            catalogPath=self.catalogPath,
+            userids=_intersect(self.userids, userids),
+            startDate=_later(self.startDate, startDate),
+            endDate=_earlier(self.endDate, endDate),
+            types=_intersect(self.types, types),
+            columns=_intersect(self.columns, columns),
+        )
+        newDataset._catalog = self._catalog
+        return newDataset
+
+    @property
+    def catalog(self):
+        # the catalog of all of the donor files (built on first use)
+        if self._catalog is None:
+            self._catalog = load_catalog(self.folder, self.catalogPath)
+        return self._catalog
+
+    def files(self):
+        # the files that can have records that pass the filters, as a dict
+        # of {userid: path}
+        donorFiles = list_donor_files(self.folder)
+        if self.userids is not None:
+            userids = set(self.userids)
+            donorFiles = {k: v for k, v in donorFiles.items() if k in userids}
+
+        # the catalog is only needed to prune by date or type
+        if (self.startDate is None) and (self.endDate is None) and (self.types is None):
+            return donorFiles
+
+        catalog = self.catalog.loc[[u for u in donorFiles if u in self.catalog.index]]
+        keep = catalog["nRows"] > 0
+        if self.startDate is not None:
+            keep = keep & (catalog["maxTime"] >= _to_utc(self.startDate))
+        if self.endDate is not None:
+            keep = keep & (catalog["minTime"] <= _to_utc(self.endDate))
+        if self.types is not None:
+            types = set(self.types)
+            keep = keep & catalog["types"].apply(
+                lambda fileTypes: len(types.intersection(str(fileTypes).split("|"))) > 0)
+        keep = keep.fillna(False)
+
+        return {userid: donorFiles[userid] for userid in catalog.index[keep.values]}
+
+    def __len__(self):
+        return len(self.files())
+
+    def load_donor(self, userid):
+        import pandas as pd
+        from .load import load_csv, _read_columns
+        # load the (filtered) records of one donor
+        dataPathAndName = list_donor_files(self.folder)[userid]
+        readColumns = _read_columns(self.columns, self.types)
+        if (readColumns is not None) and (self._has_date_filter()) and ("time" not in readColumns):
+            readColumns = list(readColumns) + ["time"]
+        df = load_csv(dataPathAndName, columns=readColumns, types=self.types)
+
+        if self._has_date_filter() and ("time" in list(df)):
+            times = pd.to_datetime(df["time"], utc=True, errors="coerce")
+            keep = times.notnull()
+            if self.startDate is not None:
+                keep = keep & (times >= _to_utc(self.startDate))
+            if self.endDate is not None:
+                keep = keep & (times <= _to_utc(self.endDate))
+            df = df[keep]
+
+        if self.columns is not None:
+            df = df[[col for col in list(df) if col in self.columns]]
+
+        return df
+
+    def iter_donors(self):
+        # yield (userid, dataframe) for each donor, one donor in memory at a time
+        for userid in self.files():
+            yield userid, self.load_donor(userid)
+
+    def aggregate(self, function):
+        import pandas as pd
+        # apply function to the records of each donor, and combine the results
+        # OUTPUT:
+        #   * the results concatenated with a userid level (if they are
+        #     dataframes or series), or a series of results indexed by userid
+        # NOTE: only one donor is held in memory at a time, so function should
+        # return a summary of the donor's data
+        results = {userid: function(df) for userid, df in self.iter_donors()}
+        if (len(results) > 0) and all(isinstance(r, (pd.DataFrame, pd.Series)) for r in results.values()):
+            return pd.concat(results, names=["userid"], sort=False)
+
+        return pd.Series(results, dtype=object).rename_axis("userid")
+
+    def to_frame(self):
+        import pandas as pd
+        # load all of the (filtered) records, with a userid field
+        frames = [df.assign(userid=userid) for userid, df in self.iter_donors()]
+        if len(frames) == 0:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(frames, ignore_index=True, sort=False)
+
+    def _has_date_filter(self):
+        return (self.startDate is not None) or (self.endDate is not None)
+
+
+def _to_utc(dateTime):
+    import pandas as pd
+    dateTime = pd.Timestamp(dateTime)
+    if dateTime.tzinfo is None:
+        return dateTime.tz_localize("UTC")
+    return dateTime.tz_convert("UTC")
+
+
+def _intersect(oldValues, newValues):
+    if newValues is None:
+        return oldValues
+    if oldValues is None:
+        return list(newValues)
+    return [v for v in oldValues if v in set(newValues)]
+
+
+def _later(oldDate, newDate):
+    if (oldDate is None) or (newDate is None):
+        return newDate if oldDate is None else oldDate
+    return max(_to_utc(oldDate), _to_utc(newDate))
+
+
+def _earlier(oldDate, newDate):
+    if (oldDate is None) or (newDate is None):
+        return newDate if oldDate is None else oldDate
+    return min(_to_utc(oldDate), _to_utc(newDate))
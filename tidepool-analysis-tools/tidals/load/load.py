@@ -7,48 +7,329 @@ author: Ed Nykaza
 license: BSD-2-Clause
 """
 
-def load_json(dataPathAndName):
+def iter_json_records(dataPathAndName, bufferSize=1048576):
+    import re
+    import json
+    # incrementally parse a json file that contains a top-level array of
+    # records, and yield one record (dict) at a time
+    # INPUTS:
+    #   * dataPathAndName, the path to the json file
+    #   * bufferSize, the number of characters read from the file at a time
+    # NOTE: only the current buffer is held in memory, so memory does not
+    # grow with the size of the file
+    decoder = json.JSONDecoder()
+    separators = re.compile(r"[\s,]*")
+    with open(dataPathAndName, "r") as f:
+        buffer = f.read(bufferSize)
+        pos = separators.match(buffer).end()
+        if buffer[pos:pos + 1] != "[":
+            raise ValueError("{0} is not a json array of records".format(dataPathAndName))
+        pos = pos + 1
+
+        while True:
+            pos = separators.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                record, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # the record is cut off at the end of the buffer, so read more
+                moreData = f.read(bufferSize)
+                if not moreData:
+                    raise
+                buffer = buffer[pos:] + moreData
+                pos = 0
+                continue
+            yield record
+
+
+def select_columns_and_types(df, columns=None, types=None):
+    # keep only the <columns> fields (that exist) and the records of <types>
+    if types is not None:
+        if "type" in list(df):
+            df = df[df["type"].isin(types)]
+        else:
+            df = df.iloc[0:0]
+    if columns is not None:
+        df = df[[col for col in list(df) if col in columns]]
+
+    return df
+
+
+def _read_columns(columns, types):
+    # the fields that need to be read to select <columns> of <types>
+    if (columns is not None) and (types is not None) and ("type" not in columns):
+        return list(columns) + ["type"]
+    return columns
+
+
+def iter_json_chunks(dataPathAndName, chunksize, byType=False, columns=None, types=None):
+    # yield the records of a json file as dataframes of <chunksize> records
+    # INPUTS:
+    #   * dataPathAndName, the path to the json file
+    #   * chunksize, the number of records in each chunk (None for one chunk)
+    #   * byType, if True, each chunk is a dict of {type: dataframe}, where
+    #     each dataframe only has the fields used by that type
+    #   * columns (optional), the only fields to keep
+    #   * types (optional), the only types of records to keep
+    # OUTPUT:
+    #   * a generator of dataframes (or dicts of dataframes), indexed by the
+    #     row number of the records in the file
+    # NOTE: records and fields are filtered as they are parsed, so the ones
+    # that are not needed are never put in a dataframe
+    if columns is not None:
+        columns = set(columns)
+    if types is not None:
+        types = set(types)
+
+    records = []
+    rowNumbers = []
+    for rowNumber, record in enumerate(iter_json_records(dataPathAndName)):
+        if (types is not None) and (record.get("type") not in types):
+            continue
+        if columns is not None:
+            if byType:
+                record = {k: v for k, v in record.items() if (k in columns) or (k == "type")}
+            else:
+                record = {k: v for k, v in record.items() if k in columns}
+        records.append(record)
+        rowNumbers.append(rowNumber)
+        if len(records) == chunksize:
+            yield _records_to_chunk(records, rowNumbers, byType, columns)
+            records = []
+            rowNumbers = []
+
+    if len(records) > 0:
+        yield _records_to_chunk(records, rowNumbers, byType, columns)
+
+
+def _records_to_chunk(records, rowNumbers, byType, columns=None):
+    import pandas as pd
+    if not byType:
+        return pd.DataFrame(records, index=rowNumbers)
+
+    recordsByType = {}
+    rowNumbersByType = {}
+    for rowNumber, record in zip(rowNumbers, records):
+        dataType = record.get("type")
+        if dataType not in recordsByType:
+            recordsByType[dataType] = []
+            rowNumbersByType[dataType] = []
+        recordsByType[dataType].append(record)
+        rowNumbersByType[dataType].append(rowNumber)
+
+    chunk = {}
+    for dataType in recordsByType:
+        chunk[dataType] = pd.DataFrame(recordsByType[dataType],
+                                       index=rowNumbersByType[dataType])
+        if (columns is not None) and ("type" not in columns):
+            chunk[dataType] = chunk[dataType].drop(columns="type")
+
+    return chunk
+
+
+def load_json(dataPathAndName, chunksize=None, byType=False, columns=None, types=None):
     import pandas as pd
-    df = pd.read_json(dataPathAndName, orient="records")
+    # load a json file of records
+    # if chunksize is given, a generator of dataframes is returned instead
+    # (see iter_json_chunks), so that memory scales with the chunksize and not
+    # the size of the file
+    # if columns and/or types are given, only those fields and types of
+    # records are loaded
+    if chunksize is not None:
+        return iter_json_chunks(dataPathAndName, chunksize, byType=byType,
+                                columns=columns, types=types)
+
+    if (columns is None) and (types is None):
+        df = pd.read_json(dataPathAndName, orient="records")
+    else:
+        chunks = list(iter_json_chunks(dataPathAndName, None, columns=columns, types=types))
+        if len(chunks) > 0:
+            df = chunks[0]
+        else:
+            df = pd.DataFrame(columns=columns)
+
     return df
 
 
-def load_csv(dataPathAndName):
+def load_csv(dataPathAndName, columns=None, types=None, chunksize=100000):
     import pandas as pd
-    df = pd.read_csv(dataPathAndName, low_memory=False)
+    # load a csv file
+    # if columns and/or types are given, only those fields are parsed, and
+    # the file is read in chunks of <chunksize> rows so that only the records
+    # of <types> are kept in memory
+    readColumns = _read_columns(columns, types)
+    if readColumns is None:
+        usecols = None
+    else:
+        readColumns = set(readColumns)
+        usecols = lambda col: col in readColumns
+
+    if types is None:
+        df = pd.read_csv(dataPathAndName, low_memory=False, usecols=usecols)
+    else:
+        chunks = [select_columns_and_types(chunk, types=types)
+                  for chunk in pd.read_csv(dataPathAndName, low_memory=False,
+                                           usecols=usecols, chunksize=chunksize)]
+        if not chunks:
+            # a file with a header but no rows (which some versions of pandas
+            # read as no chunks at all)
+            chunks = [select_columns_and_types(
+                pd.read_csv(dataPathAndName, usecols=usecols, nrows=0),
+                types=types)]
+        df = pd.concat(chunks, sort=False)
+        df = select_columns_and_types(df, columns=columns)
+
     return df
 
 
-def load_xlsx(dataPathAndName):
+def load_xlsx(dataPathAndName, columns=None, types=None):
     # load xlsx
     import pandas as pd
     df = pd.read_excel(dataPathAndName, sheet_name=None, ignore_index=True)
     cdf = pd.concat(df.values(), ignore_index=True)
     cdf = cdf.set_index('jsonRowIndex')
+    cdf = select_columns_and_types(cdf, columns=columns, types=types)
     return cdf
 
 
-def load_data(inputFile):
+def load_by_type(dataPathAndName, columns=None, types=None, chunksize=100000):
+    import pandas as pd
+    # load a json, csv, or xlsx file of Tidepool data, split by type
+    # INPUTS:
+    #   * dataPathAndName, the path to the data file
+    #   * columns (optional), the only fields to load
+    #   * types (optional), the only types of records to load
+    #   * chunksize, the number of records parsed at a time
+    # OUTPUT:
+    #   * a dict of {type: dataframe}, where each dataframe only has the
+    #     fields used by that type (records without a type are under None),
+    #     indexed by the row number of the records in the file
+    # NOTE: the records are split as the file is parsed, so there is no need
+    # to filter a wide (and mostly empty) dataframe of all types
+    if dataPathAndName[-4:] == "json":
+        chunks = iter_json_chunks(dataPathAndName, chunksize, byType=True,
+                                  columns=columns, types=types)
+    else:
+        # the type field is always needed to split the records
+        readColumns = None if columns is None else list(columns) + ["type"]
+        if dataPathAndName[-4:] == "xlsx":
+            dataChunks = [load_xlsx(dataPathAndName, columns=readColumns, types=types)]
+        else:
+            dataChunks = _iter_csv_chunks(dataPathAndName, chunksize,
+                                          columns=readColumns, types=types)
+        chunks = (_split_by_type(chunk, columns) for chunk in dataChunks)
+
+    framesByType = {}
+    for chunk in chunks:
+        for dataType, df in chunk.items():
+            framesByType.setdefault(dataType, []).append(df)
+
+    return {dataType: frames[0] if len(frames) == 1 else pd.concat(frames, sort=False)
+            for dataType, frames in framesByType.items()}
+
+
+def _iter_csv_chunks(dataPathAndName, chunksize, columns=None, types=None):
+    import pandas as pd
+    # yield the rows of a csv file (with only <columns> and <types>) in chunks
+    # of <chunksize> rows, indexed by the row number in the file
+    if columns is None:
+        usecols = None
+    else:
+        columns = set(columns)
+        usecols = lambda col: col in columns
+    for chunk in pd.read_csv(dataPathAndName, low_memory=False,
+                             usecols=usecols, chunksize=chunksize):
+        yield select_columns_and_types(chunk, types=types)
+
+
+def _split_by_type(df, columns=None):
+    import pandas as pd
+    # split a dataframe into a dict of {type: dataframe}, dropping the fields
+    # that are empty for each type
+    if "type" not in list(df):
+        return {None: df} if len(df) > 0 else {}
+    chunk = {}
+    for dataType, group in df.groupby("type", dropna=False, sort=False):
+        if pd.isnull(dataType):
+            dataType = None
+        group = group.dropna(axis=1, how="all")
+        if (columns is not None) and ("type" not in columns):
+            group = group.drop(columns="type", errors="ignore")
+        chunk[dataType] = group
+
+    return chunk
+
+
+def open_dataset(folder, catalogPath=None):
+    from .dataset import Dataset
+    # open a lazy handle over a folder of PHI-<userid>.csv files
+    # (e.g., PHI-<date>-donor-data/PHI-<date>-csvData)
+    # see tidals.load.dataset.Dataset (filter, iter_donors, and aggregate)
+    return Dataset(folder, catalogPath=catalogPath)
+
+
+def load_data(inputFile, cachePath=None, maxCacheSizeMB=10240, columns=None, types=None,
+              compactDtypes=False, verbose=False):
     import os
     import sys
+    # load a json, xlsx, or csv file of Tidepool data
+    # INPUTS:
+    #   * inputFile, the path to the data file
+    #   * cachePath (optional), a folder for a parquet copy of each loaded file
+    #     (see tidals.load.cache). The copy is read instead of the source file
+    #     until the source file changes.
+    #   * maxCacheSizeMB, the least recently used files are removed from the
+    #     cache when it is bigger than this
+    #   * columns (optional), the only fields to load
+    #   * types (optional), the only types of records to load
+    #   * compactDtypes, if True, the known Tidepool fields are converted to the
+    #     compact dtypes of tidals.load.schema.TIDEPOOL_SCHEMA
+    #   * verbose, if True (and compactDtypes), the memory used before and after
+    #     the conversion is printed
+    # OUTPUTS:
+    #   * the data, and the file name (without PHI-) of inputFile
     if os.path.isfile(inputFile):
         if os.stat(inputFile).st_size > 2:
             if inputFile[-4:] == "json":
-                inputData = load_json(inputFile)
+                loadFunction = load_json
                 fileName = os.path.split(inputFile)[-1][:-5]
             elif inputFile[-4:] == "xlsx":
-                inputData = load_xlsx(inputFile)
+                loadFunction = load_xlsx
                 fileName = os.path.split(inputFile)[-1][:-5]
             elif inputFile[-3:] == "csv":
-                inputData = load_csv(inputFile)
+                loadFunction = load_csv
                 fileName = os.path.split(inputFile)[-1][:-4]
             else:
                 sys.exit("{0} is not a json, xlsx, or csv".format(inputFile))
+
+            if cachePath is None:
+                inputData = loadFunction(inputFile, columns=columns, types=types)
+            else:
+                # the cache holds all of the data, and is read with the
+                # columns and types pushed down to the parquet reader
+                from .cache import read_cache, write_cache
+                inputData = read_cache(inputFile, cachePath, columns=columns, types=types)
+                if inputData is None:
+                    inputData = loadFunction(inputFile)
+                    write_cache(inputData, inputFile, cachePath, maxCacheSizeMB)
+                    inputData = select_columns_and_types(inputData, columns, types)
         else:
             sys.exit("{0} contains too little data".format(inputFile))
     else:
         sys.exit("{0} does not exist".format(inputFile))
 
+    if compactDtypes:
+        from .schema import apply_schema
+        if verbose:
+            inputData, memoryReport = apply_schema(inputData, report=True)
+            print("{0}: {1:.1f} MB before, {2:.1f} MB after compact dtypes".format(
+                fileName,
+                memoryReport.loc["total", "bytesBefore"] / 2**20,
+                memoryReport.loc["total", "bytesAfter"] / 2**20))
+        else:
+            inputData = apply_schema(inputData)
+
     # if fileName has PHI in it, remove PHI to get userID
     if "PHI" in fileName.upper():
         fileName = fileName[4:]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: registry of compact dtypes for known Tidepool data fields, for
+    tidals (tidepool data analytics tools)
+created: 2026-10-17
+license: BSD-2-Clause
+"""
+
+# categoricals for enums and ids, float32 for glucose values, and
+# datetime64[ns, UTC] (int64 epoch ns) for the utc times (deviceTime, the
+# local time of the device, is a naive datetime64[ns])
+TIDEPOOL_SCHEMA = {
+    # enums and ids
+    "type": "category",
+    "subType": "category",
+    "deliveryType": "category",
+    "deviceId": "category",
+    "uploadId": "category",
+    "timezone": "category",
+    "units": "category",
+    "scheduleName": "category",
+    "timeProcessing": "category",
+    "_state": "category",
+    "_dataState": "category",
+    # glucose values
+    "value": "float32",
+    "bgInput": "float32",
+    "bgTarget.low": "float32",
+    "bgTarget.high": "float32",
+    "bgTarget.target": "float32",
+    "timezoneOffset": "float32",
+    # times
+    "time": "datetime64[ns, UTC]",
+    "createdTime": "datetime64[ns, UTC]",
+    "modifiedTime": "datetime64[ns, UTC]",
+    "deviceTime": "datetime64[ns]",
+}
+
+
+def apply_schema(df, schema=None, report=False):
+    import pandas as pd
+    # convert the fields of df to the compact dtypes of the schema
+    # INPUTS:
+    #   * a dataframe (df)
+    #   * schema, a dict of {field: dtype} (defaults to TIDEPOOL_SCHEMA)
+    #   * report, if True, a memory report is also returned
+    # OUTPUTS:
+    #   * df with the converted fields. A field is left as it is if it can
+    #     not be converted (e.g., a field with nested json, or a numeric field
+    #     that was loaded as text)
+    #   * (if report) a dataframe of the dtype and bytes of each field before
+    #     and after, with a "total" row
+    if schema is None:
+        schema = TIDEPOOL_SCHEMA
+
+    newColumns = {}
+    for colHead, dtype in schema.items():
+        if colHead not in df.columns:
+            continue
+        colValues = df[colHead]
+        if str(colValues.dtype) == dtype:
+            continue
+        try:
+            if dtype == "category":
+                newColumns[colHead] = colValues.astype("category")
+            elif dtype.startswith("float"):
+                if pd.api.types.is_numeric_dtype(colValues):
+                    newColumns[colHead] = colValues.astype(dtype)
+            elif dtype.startswith("datetime64"):
+                newValues = pd.to_datetime(colValues, utc=("UTC" in dtype))
+                if str(newValues.dtype) == dtype:
+                    newColumns[colHead] = newValues
+        except (TypeError, ValueError, OverflowError):
+            continue
+
+    if report:
+        memoryReport = pd.DataFrame({"dtypeBefore": df.dtypes.astype(str),
+                                     "bytesBefore": df.memory_usage(deep=True, index=False)})
+
+    if len(newColumns) > 0:
+        df = df.copy(deep=False)
+        for colHead, newValues in newColumns.items():
+            df[colHead] = newValues
+
+    if not report:
+        return df
+
+    memoryReport["dtypeAfter"] = df.dtypes.astype(str)
+    memoryReport["bytesAfter"] = df.memory_usage(deep=True, index=False)
+    memoryReport.loc["total", ["bytesBefore", "bytesAfter"]] = \
+        memoryReport[["bytesBefore", "bytesAfter"]].sum()
+    memoryReport = memoryReport[["dtypeBefore", "dtypeAfter", "bytesBefore", "bytesAfter"]]
+
+    return df, memoryReport
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: initialize the tidepool data analytics tools (tidals) python pacakge
+version: 0.0.1
+created: 2018-07-21
+author: Ed Nykaza
+license: BSD-2-Clause
+"""
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+description: generate synthetic (PHI free) Tidepool data, for tidals
+    (tidepool data analytics tools)
+created: 2026-10-17
+license: BSD-2-Clause
+"""
+
+MGDL_PER_MMOLL = 18.01559
+
+HOME_TIMEZONES = ["US/Pacific", "US/Mountain", "US/Central", "US/Eastern"]
+TRAVEL_TIMEZONES = ["US/Hawaii", "America/Sao_Paulo", "Europe/London",
+                    "Europe/Berlin", "Asia/Tokyo", "Australia/Sydney"]
+
+# (deviceId prefix, manufacturer, model, deviceTags)
+PUMPS = [("InsOmn-", "Insulet", "OmniPod", ["insulin-pump", "bgm"]),
+         ("MedT-1780-", "Medtronic", "1780", ["insulin-pump", "cgm"]),
+         ("tandemCIQ", "Tandem", "t:slim X2", ["insulin-pump"])]
+CGMS = [("DexG5MobRec_SM", "Dexcom", "G5 Mobile Receiver", ["cgm"]),
+        ("DexG6MobRec_SM", "Dexcom", "G6 Mobile Receiver", ["cgm"]),
+        ("AbbottFreeStyleLibre-JKGX", "Abbott", "FreeStyle Libre", ["bgm", "cgm"])]
+
+
+def make_donor_data(nDays=14, seed=0, startDate="2018-01-01",
+                    homeTimezone=None, travel=True, tripsPerYear=4,
+                    bolusesPerDay=5, tempBasalsPerDay=2,
+                    uploadEveryDays=14, duplicateUploadRate=0.1):
+    import numpy as np
+    import pandas as pd
+    # make a realistic Tidepool dataset for one (synthetic) donor
+    # INPUTS:
+    #   * nDays, the number of days of data
+    #   * seed, the same seed (and inputs) always gives the same data
+    #   * startDate, the (local) date of the first day of data
+    #   * homeTimezone (optional), picked at random from HOME_TIMEZONES
+    #   * travel, if True, the donor takes <tripsPerYear> trips to another
+    #     time zone (deviceTime and timezoneOffset follow the local time,
+    #     including daylight saving time changes)
+    #   * bolusesPerDay, the average number of boluses per day (about 70% of
+    #     which come with a wizard record)
+    #   * tempBasalsPerDay, the average number of temp basals per day (use a
+    #     large number, e.g. 100, for a closed loop donor)
+    #   * uploadEveryDays, the days of data in each upload
+    #   * duplicateUploadRate, the fraction of uploads that are uploaded twice
+    # OUTPUT:
+    #   * a dataframe of cbg, basal (scheduled, temp and suspend), bolus
+    #     (normal and dual/square), wizard and upload records, with the
+    #     embedded json fields (e.g., suppressed, recommended, bgTarget) as
+    #     dicts, sorted by time (most recent first)
+    rng = np.random.RandomState(seed)
+    if homeTimezone is None:
+        homeTimezone = HOME_TIMEZONES[rng.randint(len(HOME_TIMEZONES))]
+    pump = PUMPS[rng.randint(len(PUMPS))]
+    cgm = CGMS[rng.randint(len(CGMS))]
+    pumpId = pump[0] + "%09d" % rng.randint(10**9)
+    cgmId = cgm[0] + "%08d" % rng.randint(10**8)
+
+    startTime = pd.Timestamp(startDate).tz_localize(homeTimezone).tz_convert("UTC")
+    endTime = startTime + pd.Timedelta(days=nDays)
+    timezoneSegments = _timezone_segments(rng, startTime, endTime, homeTimezone,
+                                          travel, tripsPerYear)
+
+    cgmData = _make_cbg(rng, startTime, endTime)
+    cgmData["deviceId"] = cgmId
+
+    pumpData = pd.concat([_make_basal(rng, startTime, nDays, homeTimezone, tempBasalsPerDay),
+                          _make_bolus_and_wizard(rng, startTime, endTime, bolusesPerDay)],
+                         ignore_index=True, sort=False)
+    pumpData = pumpData[(pumpData["time"] >= startTime) & (pumpData["time"] < endTime)]
+    pumpData["deviceId"] = pumpId
+
+    allData = []
+    for deviceData, device, deviceId in [(cgmData, cgm, cgmId), (pumpData, pump, pumpId)]:
+        allData.append(_add_uploads(rng, deviceData, device, deviceId, startTime, endTime,
+                                    uploadEveryDays, duplicateUploadRate, timezoneSegments))
+    df = pd.concat(allData, ignore_index=True, sort=False)
+
+    # local times
+    utcTimes = pd.DatetimeIndex(df["time"])
+    deviceTimes, timezoneOffsets, timezones = _local_times(utcTimes, timezoneSegments)
+    isUpload = (df["type"] == "upload").values
+    df["deviceTime"] = np.where(isUpload, None, _format_times(deviceTimes))
+    df["computerTime"] = np.where(isUpload, _format_times(deviceTimes), None)
+    df["timezone"] = np.where(isUpload, timezones, None)
+    df["timezoneOffset"] = timezoneOffsets
+    df["conversionOffset"] = 0
+    df["clockDriftOffset"] = np.where(isUpload, np.nan, 0.0)
+    df["time"] = _format_times(utcTimes.tz_localize(None), suffix=".000Z")
+    df["id"] = _random_ids(rng, len(df))
+
+    # the wizard records point to the id of their bolus (in the same upload)
+    isWizard = (df["type"] == "wizard").values
+    if isWizard.any():
+        bolusKeys = df["uploadId"] + ":" + df["_bolusKey"].astype(str)
+        isBolus = (df["type"] == "bolus").values
+        bolusIds = pd.Series(df["id"].values[isBolus], index=bolusKeys.values[isBolus])
+        df.loc[isWizard, "bolus"] = bolusIds.reindex(bolusKeys.values[isWizard]).values
+    df = df.drop(columns=["_bolusKey"])
+
+    df = df.sort_values("time", ascending=False, kind="mergesort").reset_index(drop=True)
+
+    return df
+
+
+def write_donor_data(df, outputPathAndName):
+    import json
+    import numpy as np
+    import pandas as pd
+    # write the data in the format of its file extension
+    #   * json, a list of records that only have the fields they use (like the
+    #     Tidepool api)
+    #   * csv, the dataframe as it is saved by get_single_tidepool_dataset
+    #   * xlsx, one sheet per type, with a jsonRowIndex field
+    if outputPathAndName[-4:] == "json":
+        records = [{k: v for k, v in record.items() if not _is_null(v)}
+                   for record in df.to_dict("records")]
+        with open(outputPathAndName, "w") as f:
+            json.dump(records, f, default=_json_default)
+    elif outputPathAndName[-3:] == "csv":
+        df.to_csv(outputPathAndName)
+    elif outputPathAndName[-4:] == "xlsx":
+        xlsxData = df.copy()
+        xlsxData["jsonRowIndex"] = np.arange(len(xlsxData))
+        for colHead in list(xlsxData):
+            isNested = xlsxData[colHead].map(lambda v: isinstance(v, (dict, list)))
+            if isNested.any():
+                xlsxData.loc[isNested, colHead] = \
+                    xlsxData.loc[isNested, colHead].map(json.dumps)
+        with pd.ExcelWriter(outputPathAndName) as writer:
+            for dataType, typeData in xlsxData.groupby("type"):
+                typeData.dropna(axis=1, how="all").to_excel(
+                    writer, sheet_name=dataType, index=False)
+    else:
+        raise ValueError("{0} is not a json, csv, or xlsx".format(outputPathAndName))
+
+    return
+
+
+def make_dataset(outputFolder, nDonors=1, nDays=14, seed=0, fileFormat="csv", **kwargs):
+    import os
+    import numpy as np
+    # make and write a dataset of <nDonors> synthetic donors
+    # INPUTS:
+    #   * outputFolder, where the PHI-<userid>.<fileFormat> files are written
+    #   * nDonors, nDays, and seed (see make_donor_data)
+    #   * fileFormat, "json", "csv", or "xlsx"
+    #   * kwargs, passed on to make_donor_data
+    # OUTPUT:
+    #   * a dict of {userid: path}
+    rng = np.random.RandomState(seed)
+    donorSeeds = rng.randint(0, 2**31 - 1, size=nDonors)
+    userids = _random_ids(rng, nDonors, nChars=10)
+    if not os.path.exists(outputFolder):
+        os.makedirs(outputFolder)
+
+    donorFiles = {}
+    for userid, donorSeed in zip(userids, donorSeeds):
+        df = make_donor_data(nDays=nDays, seed=donorSeed, **kwargs)
+        outputPathAndName = os.path.join(outputFolder, "PHI-" + userid + "." + fileFormat)
+        write_donor_data(df, outputPathAndName)
+        donorFiles[userid] = outputPathAndName
+
+    return donorFiles
+
+
+def _make_cbg(rng, startTime, endTime):
+    import numpy as np
+    import pandas as pd
+    # a cgm reading every 5 minutes, with sensor gaps, a daily pattern, and
+    # slowly varying noise
+    nPoints = int((endTime - startTime) / pd.Timedelta(minutes=5))
+    offsets = np.arange(nPoints) * 300 + rng.randint(0, 300) + rng.randint(-2, 3, size=nPoints)
+    keep = np.ones(nPoints, dtype=bool)
+    nDays = nPoints / 288
+    for _ in range(rng.poisson(nDays / 10)):
+        gapStart = rng.randint(nPoints)
+        keep[gapStart:gapStart + rng.randint(12, 144)] = False
+
+    smoothing = np.exp(-np.arange(36) / 12)
+    noise = np.convolve(rng.normal(size=nPoints + len(smoothing)), smoothing, mode="valid")[:nPoints]
+    noise = noise / noise.std() if nPoints > 1 else noise
+    dailyPattern = np.sin(2 * np.pi * np.arange(nPoints) / 288 + rng.uniform(0, 2 * np.pi))
+    mgdl = np.clip(150 + 40 * dailyPattern + 55 * noise, 39, 401)
+
+    return pd.DataFrame({
+        "type": "cbg",
+        "time": startTime + pd.to_timedelta(offsets[keep], unit="s"),
+        "value": np.round(mgdl[keep]) / MGDL_PER_MMOLL,
+        "units": "mmol/L",
+    })
+
+
+def _make_basal(rng, startTime, nDays, homeTimezone, tempBasalsPerDay):
+    import numpy as np
+    import pandas as pd
+    # scheduled basals from a (home time zone) schedule, temp basals that
+    # suppress the scheduled rate, and a few suspends
+    scheduleName = "basal %d" % rng.randint(1, 4)
+    segmentStarts = np.array([0, 3, 7, 12, 18, 22])
+    segmentRates = np.round(rng.uniform(0.4, 1.6, size=len(segmentStarts)) / 0.05) * 0.05
+    segmentDurations = np.diff(np.append(segmentStarts, 24))
+
+    localStart = startTime.tz_convert(homeTimezone).tz_localize(None).normalize()
+    days = np.repeat(np.arange(nDays + 1), len(segmentStarts))
+    segment = np.tile(np.arange(len(segmentStarts)), nDays + 1)
+    localTimes = localStart + pd.to_timedelta(days, unit="D") + \
+        pd.to_timedelta(segmentStarts[segment], unit="h")
+    times = localTimes.tz_localize(homeTimezone, ambiguous="NaT",
+                                   nonexistent="shift_forward").tz_convert("UTC")
+    scheduled = pd.DataFrame({
+        "type": "basal",
+        "deliveryType": "scheduled",
+        "time": times,
+        "rate": segmentRates[segment],
+        "duration": segmentDurations[segment] * 3600000.0,
+        "scheduleName": scheduleName,
+    })
+    scheduled = scheduled[scheduled["time"].notnull()]
+
+    nTemp = rng.poisson(tempBasalsPerDay * nDays)
+    tempTimes = startTime + pd.to_timedelta(np.sort(rng.randint(0, nDays * 86400, size=nTemp)), unit="s")
+    tempSegment = np.searchsorted(scheduled["time"].values.astype(np.int64),
+                                  tempTimes.asi8, side="right") - 1
+    tempSegment = np.clip(tempSegment, 0, len(scheduled) - 1)
+    scheduledRates = scheduled["rate"].values[tempSegment]
+    temp = pd.DataFrame({
+        "type": "basal",
+        "deliveryType": "temp",
+        "time": tempTimes,
+        "rate": np.round(scheduledRates * rng.choice([0, 0.5, 1.5, 2], size=nTemp) / 0.05) * 0.05,
+        "duration": rng.choice([30, 60, 120], size=nTemp) * 60000.0,
+        "suppressed": [{"type": "basal", "deliveryType": "scheduled",
+                        "rate": rate, "scheduleName": scheduleName}
+                       for rate in scheduledRates],
+    })
+    temp["percent"] = temp["rate"] / np.where(scheduledRates > 0, scheduledRates, 1)
+    temp["expectedDuration"] = temp["duration"]
+
+    nSuspend = rng.poisson(0.05 * nDays)
+    suspend = pd.DataFrame({
+        "type": "basal",
+        "deliveryType": "suspend",
+        "time": startTime + pd.to_timedelta(rng.randint(0, nDays * 86400, size=nSuspend), unit="s"),
+        "rate": 0.0,
+        "duration": rng.randint(60, 7200, size=nSuspend) * 1000.0,
+    })
+
+    return pd.concat([scheduled, temp, suspend], ignore_index=True, sort=False)
+
+
+def _make_bolus_and_wizard(rng, startTime, endTime, bolusesPerDay):
+    import numpy as np
+    import pandas as pd
+    # normal and dual/square boluses, most of them with a wizard record
+    nDays = (endTime - startTime) / pd.Timedelta(days=1)
+    nBolus = rng.poisson(bolusesPerDay * nDays)
+    times = startTime + pd.to_timedelta(rng.randint(0, int(nDays * 86400), size=nBolus), unit="s")
+    normal = np.round(rng.gamma(2, 1.5, size=nBolus) / 0.05) * 0.05
+    isSquare = rng.uniform(size=nBolus) < 0.1
+    bolus = pd.DataFrame({
+        "type": "bolus",
+        "subType": np.where(isSquare, "dual/square", "normal"),
+        "time": times,
+        "normal": normal,
+        "extended": np.where(isSquare, np.round(rng.uniform(0.5, 4, size=nBolus), 1), np.nan),
+        "duration": np.where(isSquare, rng.choice([30, 60, 90, 120], size=nBolus) * 60000.0, np.nan),
+        "_bolusKey": np.arange(nBolus, dtype=float),
+    })
+
+    hasWizard = rng.uniform(size=nBolus) < 0.7
+    nWizard = hasWizard.sum()
+    carbRatio = float(rng.randint(8, 20))
+    sensitivity = rng.randint(30, 80) / MGDL_PER_MMOLL
+    targetLow = rng.choice([90, 100, 110]) / MGDL_PER_MMOLL
+    targetHigh = targetLow + 20 / MGDL_PER_MMOLL
+    bgInput = np.round(rng.uniform(60, 300, size=nWizard)) / MGDL_PER_MMOLL
+    carbInput = rng.choice([0, 15, 30, 45, 60, 90], size=nWizard)
+    carb = np.round(carbInput / carbRatio, 2)
+    correction = np.round(np.maximum(bgInput - targetHigh, 0) / sensitivity, 2)
+    wizard = pd.DataFrame({
+        "type": "wizard",
+        "time": times[hasWizard],
+        "bgInput": bgInput,
+        "carbInput": carbInput,
+        "insulinCarbRatio": carbRatio,
+        "insulinSensitivity": sensitivity,
+        "units": "mmol/L",
+        "bgTarget": [{"low": targetLow, "high": targetHigh}] * nWizard,
+        "recommended": [{"carb": c, "correction": k, "net": round(c + k, 2)}
+                        for c, k in zip(carb, correction)],
+        "_bolusKey": bolus["_bolusKey"].values[hasWizard],
+    })
+
+    return pd.concat([bolus, wizard], ignore_index=True, sort=False)
+
+
+def _add_uploads(rng, df, device, deviceId, startTime, endTime,
+                 uploadEveryDays, duplicateUploadRate, timezoneSegments):
+    import numpy as np
+    import pandas as pd
+    # split a device's records into uploads (of <uploadEveryDays> days), add
+    # an upload record for each, and upload some of them twice
+    windowEnds = pd.date_range(startTime + pd.Timedelta(days=uploadEveryDays),
+                               endTime + pd.Timedelta(days=uploadEveryDays),
+                               freq=pd.Timedelta(days=uploadEveryDays))
+    windowEnds = windowEnds[:np.searchsorted(windowEnds.asi8, endTime.value) + 1]
+    nUploads = len(windowEnds)
+    uploadIds = np.char.add("upid_", _random_ids(rng, nUploads, nChars=12))
+
+    window = np.searchsorted(windowEnds.asi8, pd.DatetimeIndex(df["time"]).asi8, side="right")
+    df = df.assign(uploadId=uploadIds[window])
+
+    uploadTimes = np.minimum(windowEnds.asi8, endTime.value - 1) + \
+        rng.randint(0, 3600, size=nUploads) * 10**9
+    uploads = _upload_records(device, deviceId, uploadIds, uploadTimes)
+
+    # duplicate uploads, one day later
+    isDuplicated = rng.uniform(size=nUploads) < duplicateUploadRate
+    duplicates = []
+    if isDuplicated.any():
+        duplicateIds = np.char.add("upid_", _random_ids(rng, isDuplicated.sum(), nChars=12))
+        duplicateOf = dict(zip(uploadIds[isDuplicated], duplicateIds))
+        duplicateData = df[df["uploadId"].isin(duplicateOf)].copy()
+        duplicateData["uploadId"] = duplicateData["uploadId"].map(duplicateOf)
+        duplicates.append(duplicateData)
+        duplicates.append(_upload_records(device, deviceId, duplicateIds,
+                                          uploadTimes[isDuplicated] + 86400 * 10**9))
+
+    return pd.concat([df, uploads] + duplicates, ignore_index=True, sort=False)
+
+
+def _upload_records(device, deviceId, uploadIds, uploadTimes):
+    import pandas as pd
+    nUploads = len(uploadIds)
+    return pd.DataFrame({
+        "type": "upload",
+        "time": pd.to_datetime(uploadTimes, utc=True),
+        "uploadId": uploadIds,
+        "deviceId": deviceId,
+        "deviceManufacturers": [[device[1]]] * nUploads,
+        "deviceModel": device[2],
+        "deviceSerialNumber": deviceId[len(device[0]):],
+        "deviceTags": [device[3]] * nUploads,
+        "timeProcessing": "utc-bootstrapping",
+        "version": "2.4.0",
+    })
+
+
+def _timezone_segments(rng, startTime, endTime, homeTimezone, travel, tripsPerYear):
+    import pandas as pd
+    # the time zone the donor is in, as a list of (utc start time, timezone)
+    segments = [(startTime, homeTimezone)]
+    if not travel or tripsPerYear <= 0:
+        return segments
+    segmentStart = startTime
+    while True:
+        tripStart = segmentStart + pd.Timedelta(days=rng.exponential(365 / tripsPerYear))
+        tripEnd = tripStart + pd.Timedelta(days=rng.randint(3, 15))
+        if tripStart >= endTime:
+            return segments
+        segments.append((tripStart, TRAVEL_TIMEZONES[rng.randint(len(TRAVEL_TIMEZONES))]))
+        segments.append((tripEnd, homeTimezone))
+        segmentStart = tripEnd
+
+
+def _local_times(utcTimes, timezoneSegments):
+    import numpy as np
+    import pandas as pd
+    # the local (device) time, timezone offset (minutes) and time zone name of
+    # each utc time
+    utcNaive = utcTimes.tz_convert("UTC").tz_localize(None)
+    offsets = np.zeros(len(utcTimes), dtype=np.int64)
+    timezones = np.empty(len(utcTimes), dtype=object)
+    segmentStarts = [segmentStart.value for segmentStart, _ in timezoneSegments]
+    segment = np.searchsorted(segmentStarts, utcTimes.asi8, side="right") - 1
+    segment = np.maximum(segment, 0)
+    for i, (_, timezone) in enumerate(timezoneSegments):
+        inSegment = segment == i
+        if inSegment.any():
+            localTimes = utcTimes[inSegment].tz_convert(timezone).tz_localize(None)
+            offsets[inSegment] = (localTimes - utcNaive[inSegment]) // pd.Timedelta(minutes=1)
+            timezones[inSegment] = timezone
+    deviceTimes = utcNaive + pd.to_timedelta(offsets, unit="m")
+
+    return deviceTimes, offsets, timezones
+
+
+def _format_times(naiveTimes, suffix=""):
+    import numpy as np
+    # ISO 8601 strings (to the second), e.g. 2018-01-01T00:00:00
+    strings = np.datetime_as_string(naiveTimes.values.astype("datetime64[s]"), unit="s")
+    if suffix:
+        strings = np.char.add(strings, suffix)
+    return strings.astype(object)
+
+
+def _random_ids(rng, n, nChars=32):
+    import numpy as np
+    # n random lowercase hex strings
+    hexChars = np.array(list("0123456789abcdef"))
+    digits = hexChars[rng.randint(0, 16, size=(n, nChars))]
+    return np.ascontiguousarray(digits).view("<U%d" % nChars).ravel()
+
+
+def _is_null(value):
+    return (value is None) or (isinstance(value, float) and value != value)
+
+
+def _json_default(value):
+    import numpy as np
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError("{0} is not json serializable".format(type(value)))